@@ -0,0 +1,140 @@
+"""
+Small local HTTP admin API (JSON in, JSON out) that runs beside the jackpot socket servers.
+
+Routes are plain functions registered by the server that owns the state:
+
+    api = AdminServer("127.0.0.1:8765", token=None)
+    api.route("GET", "/status", lambda body: (200, status_snapshot()))
+    api.route("POST", "/roll", start_roll_from_request)
+    api.start()
+
+Each request gets its own thread (ThreadingHTTPServer), so slow clients never hold up
+each other or the REPL. Bind to "unix:/path/to.sock" instead of host:port to serve on a
+Unix domain socket (POSIX only; `curl --unix-socket /path/to.sock http://x/status`).
+POST routes change state, so they need a token: requests must send it as the
+X-Admin-Token header, and without a token configured the server is read-only (POSTs get 403).
+"""
+
+import hmac
+import json
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+Handler = Callable[[dict], Tuple[int, object]]  # request JSON body -> (status, JSON-able reply)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "JackpotAdmin/1.0"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _reply(self, status: int, obj, content_type: str = "application/json") -> None:
+        body = obj.encode() if isinstance(obj, str) else (json.dumps(obj, default=str) + "\n").encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method: str) -> None:
+        admin: "AdminServer" = self.server.admin
+        path = self.path.split("?")[0].rstrip("/") or "/"
+        fn = admin.routes.get((method, path))
+        if fn is None:
+            self._reply(404, {"error": f"no route {method} {path}", "routes": admin.describe()})
+            return
+        if method == "POST":
+            if not admin.token:
+                self._reply(403, {"error": "read-only: no admin token configured"})
+                return
+            if not hmac.compare_digest(self.headers.get("X-Admin-Token", "").encode(), admin.token.encode()):
+                self._reply(403, {"error": "bad or missing X-Admin-Token"})
+                return
+        body = {}
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._reply(400, {"error": "bad Content-Length"})
+            return
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._reply(400, {"error": "body must be JSON"})
+                return
+        try:
+            status, reply = fn(body if isinstance(body, dict) else {"value": body})
+        except Exception as e:
+            status, reply = 500, {"error": f"{type(e).__name__}: {e}"}
+        if isinstance(reply, str):
+            self._reply(status, reply, "text/plain; version=0.0.4")
+        else:
+            self._reply(status, reply)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+class _TCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64  # the default of 5 makes a burst of pollers wait out a 1 s SYN retry
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+        request_queue_size = 64
+
+        def get_request(self):
+            conn, _ = super().get_request()
+            return conn, ("unix", 0)  # BaseHTTPRequestHandler expects a (host, port) pair
+else:  # pragma: no cover - Windows
+    _UnixHTTPServer = None
+
+
+class AdminServer:
+    def __init__(self, address: str = "127.0.0.1:8765", token: Optional[str] = None):
+        self.address = address
+        self.token = token
+        self.routes: Dict[Tuple[str, str], Handler] = {}
+        self._httpd = None
+
+    def route(self, method: str, path: str, fn: Handler) -> None:
+        self.routes[(method.upper(), path)] = fn
+
+    def describe(self) -> list:
+        return sorted(f"{m} {p}" for m, p in self.routes)
+
+    def start(self) -> "AdminServer":
+        if self.address.startswith("unix:"):
+            if _UnixHTTPServer is None:
+                raise RuntimeError("Unix domain sockets are not available on this platform")
+            path = self.address[5:]
+            if os.path.exists(path):
+                os.remove(path)
+            self._httpd = _UnixHTTPServer(path, _Handler)
+        else:
+            host, _, port = self.address.rpartition(":")
+            self._httpd = _TCPHTTPServer((host or "127.0.0.1", int(port)), _Handler)
+        self._httpd.admin = self
+        threading.Thread(target=self._httpd.serve_forever, name="admin-api", daemon=True).start()
+        mode = "" if self.token else ", read-only: set a token to enable POSTs"
+        print(f"[ADMIN] API on {self.address} ({', '.join(self.describe())}{mode})")
+        return self
+
+    def close(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            if self.address.startswith("unix:") and os.path.exists(self.address[5:]):
+                os.remove(self.address[5:])
+            self._httpd = None
@@ -0,0 +1,263 @@
+"""
+Connection supervision shared by the jackpot server and the payment gateway.
+
+- Backoff: exponential reconnect delays with jitter, so a host that is down costs a
+  sleep instead of a spinning core, and clients of a restarted host don't all retry at
+  the same instant.
+- Liveness: last-heard bookkeeping for any number of peers. One thread pings every peer
+  that has been quiet for `interval` seconds and declares it dead (calls its on_dead,
+  normally a socket shutdown) once nothing at all has been heard for `timeout` seconds.
+  A peer that is known to be busy and unable to answer (a reel mid-spin) is given a grace
+  period with hold().
+- Link: a client connection (gateway -> jackpot, gateway -> turret) that connects in the
+  background with Backoff, hands each received line to a callback, heartbeats with
+  PING/PONG and reconnects whenever the peer goes away or stops answering.
+
+Text channels use a bare "PING" / "PONG" token. The servers answer in newline-terminated
+lines, which Link splits. The gateway's own messages may arrive unframed, so on the
+server side a heartbeat can be glued to a real message; strip_token() removes it either way.
+"""
+
+import random
+import socket
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import instrument
+
+PING = "PING"
+PONG = "PONG"
+
+
+def strip_token(text: str, token: str) -> Tuple[str, int]:
+    """Remove every `token` from `text`; returns (rest, how many were removed)."""
+    count = text.count(token)
+    if count:
+        text = text.replace(token, "")
+    return text.strip(), count
+
+
+class Backoff:
+    """Exponential delays (base, base*factor, ... up to cap), each jittered to 50-100%."""
+
+    def __init__(self, base: float = 0.5, cap: float = 30.0, factor: float = 2.0):
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+        self.attempts = 0
+
+    def next(self) -> float:
+        delay = min(self.cap, self.base * self.factor ** self.attempts)
+        self.attempts += 1
+        return delay * (0.5 + random.random() * 0.5)
+
+    def reset(self) -> None:
+        self.attempts = 0
+
+
+class _Peer:
+    __slots__ = ("ping", "on_dead", "heard", "pinged", "hold_until")
+
+    def __init__(self, ping: Callable[[], None], on_dead: Callable[[], None], now: float):
+        self.ping = ping
+        self.on_dead = on_dead
+        self.heard = now
+        self.pinged = 0.0
+        self.hold_until = 0.0
+
+
+class Liveness:
+    def __init__(self, interval: float = 1.0, timeout: float = 4.0, name: str = "liveness"):
+        self.interval = interval
+        self.timeout = timeout
+        self._peers: Dict[Hashable, _Peer] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def add(self, key: Hashable, ping: Callable[[], None], on_dead: Callable[[], None]) -> None:
+        """Start watching `key` (replacing any previous entry); it counts as just heard."""
+        with self._lock:
+            self._peers[key] = _Peer(ping, on_dead, time.monotonic())
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            self._peers.pop(key, None)
+
+    def heard(self, key: Hashable) -> None:
+        """Anything at all arrived from `key`."""
+        peer = self._peers.get(key)
+        if peer is not None:
+            peer.heard = time.monotonic()
+
+    def hold(self, key: Hashable, seconds: float) -> None:
+        """`key` is busy for up to `seconds`: don't ping it or time it out before then."""
+        peer = self._peers.get(key)
+        if peer is not None:
+            peer.hold_until = max(peer.hold_until, time.monotonic() + seconds)
+
+    def responsive(self, key: Hashable) -> bool:
+        """False once `key` has missed about two pings, well before timeout declares it dead."""
+        peer = self._peers.get(key)
+        if peer is None:
+            return False
+        now = time.monotonic()
+        return now < peer.hold_until or now - max(peer.heard, peer.hold_until) < 2.5 * self.interval
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        tick = min(self.interval, self.timeout) / 4.0
+        while not self._stop.wait(tick):
+            now = time.monotonic()
+            to_ping, dead = [], []
+            with self._lock:
+                for key, peer in list(self._peers.items()):
+                    if now < peer.hold_until:
+                        continue
+                    quiet = now - max(peer.heard, peer.hold_until)
+                    if quiet >= self.timeout:
+                        del self._peers[key]
+                        dead.append((key, peer, quiet))
+                    elif quiet >= self.interval and now - peer.pinged >= self.interval:
+                        peer.pinged = now
+                        to_ping.append((key, peer))
+            for key, peer in to_ping:
+                try:
+                    peer.ping()
+                except OSError:
+                    with self._lock:
+                        if self._peers.get(key) is peer:
+                            del self._peers[key]
+                    dead.append((key, peer, now - peer.heard))
+            for key, peer, quiet in dead:
+                print(f"[LIVENESS] {key} silent for {quiet:.1f}s, dropping")
+                try:
+                    peer.on_dead()
+                except Exception as e:
+                    print(f"[LIVENESS] on_dead for {key} failed: {e}")
+
+
+def shutdown_quietly(sock: socket.socket) -> None:
+    """Wake any thread blocked in recv() on `sock` and close it."""
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    try:
+        sock.close()
+    except OSError:
+        pass
+
+
+class Link:
+    """
+    Supervised client connection. send() returns False while the link is down; the
+    background thread keeps reconnecting with Backoff.
+    """
+
+    def __init__(self, host: str, port: int, name: str, on_message: Callable[[str], None],
+                 heartbeat: float = 2.0, timeout: float = 6.0, connect_timeout: float = 3.0,
+                 backoff: Optional[Backoff] = None):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.on_message = on_message
+        self.connect_timeout = connect_timeout
+        self.backoff = backoff or Backoff()
+        self.liveness = Liveness(heartbeat, timeout, name=f"link-{name}-liveness")
+        self._sock: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._up = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"link-{name}", daemon=True)
+
+    @property
+    def connected(self) -> bool:
+        return self._up.is_set()
+
+    def start(self) -> "Link":
+        self._thread.start()
+        return self
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        return self._up.wait(timeout)
+
+    def send(self, data: bytes) -> bool:
+        sock = self._sock
+        if sock is None or not self._up.is_set():
+            return False
+        try:
+            with self._send_lock:
+                sock.sendall(data)
+            return True
+        except OSError as e:
+            print(f"[LINK] {self.name}: send failed ({e}), reconnecting")
+            shutdown_quietly(sock)
+            return False
+
+    def hold(self, seconds: float) -> None:
+        """The peer is about to be busy (e.g. running a round) and may not answer pings."""
+        self.liveness.hold(self.name, seconds)
+
+    def close(self) -> None:
+        self._stop.set()
+        self.liveness.close()
+        if self._sock is not None:
+            shutdown_quietly(self._sock)
+
+    def _ping(self) -> None:
+        with self._send_lock:
+            self._sock.sendall((PING + "\n").encode())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+            except OSError as e:
+                delay = self.backoff.next()
+                print(f"[LINK] {self.name} {self.host}:{self.port} unreachable ({e}), retrying in {delay:.1f}s")
+                self._stop.wait(delay)
+                continue
+            sock.settimeout(None)
+            self._sock = sock
+            self.backoff.reset()
+            self.liveness.add(self.name, self._ping, lambda: shutdown_quietly(sock))
+            self._up.set()
+            print(f"[LINK] {self.name} connected to {self.host}:{self.port}")
+            self._read(sock)
+            self._up.clear()
+            self.liveness.remove(self.name)
+            shutdown_quietly(sock)
+            if self._stop.is_set():
+                break
+            instrument.inc("link_reconnects_total", peer=self.name)
+            delay = self.backoff.next()
+            print(f"[LINK] {self.name} connection lost, reconnecting in {delay:.1f}s")
+            self._stop.wait(delay)
+
+    def _read(self, sock: socket.socket) -> None:
+        buf = ""
+        while True:
+            try:
+                data = sock.recv(1024)
+            except OSError:
+                return
+            if not data:
+                return
+            self.liveness.heard(self.name)
+            buf += data.decode(errors="ignore")
+            *lines, buf = buf.split("\n")
+            if len(buf) > 4096:  # a peer that never sends a newline
+                lines, buf = lines + [buf], ""
+            for line in lines:
+                line = line.strip()
+                if not line or line == PONG:
+                    continue
+                try:
+                    self.on_message(line)
+                except Exception as e:
+                    print(f"[LINK] {self.name}: message handler failed: {e}")
@@ -2,9 +2,13 @@ import serial
 import requests
 import re
 import time
-import socket
 import threading
 import json
+import os
+
+import instrument
+import spin_profile
+from conn_supervisor import Link
 
 # --- Settings ---
 SERIAL_PORT = "COM5"
@@ -17,14 +21,52 @@ PORT = 5000
 
 HOST2 = "10.102.150.134"
 PORT2 = 9000
-
-# Global variable for server response
-server_response = None
-response_lock = threading.Lock()
-response_received = threading.Event()
+REPLY_TIMEOUT = 30.0  # wait for a payout when the jackpot gives no queue estimate
+REPLY_SLACK = 5.0     # on top of the jackpot's "QUEUED <eta>" estimate
+OPEN_TAPS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "open_taps.json")
+OPEN_TAP_MAX_AGE = 7 * 24 * 3600  # forget taps (and paid refunds) older than this on start-up
+
+# Jackpot replies are lines tagged with the tap's correlation id: "QUEUED <eta> #<cid>" once the
+# tap is on the jackpot's round queue, then "<payout> #<cid>" when its round is over.
+# A round the jackpot lost to a crash comes back as "REFUND <bet> #<cid>" once it restarts;
+# the gateway credits the card and answers "REFUNDED #<cid>" so the jackpot can close it.
+reply_cond = threading.Condition()
+replies = {}        # cid -> payout reply for the tap main() is waiting on
+queued_eta = {}     # cid -> seconds the jackpot expects that tap to wait
+waiting_cid = None  # tap main() is waiting for, if any
+open_taps = {}      # cid -> {"rfid", "at", "refunded"} for charged taps not settled yet; kept on disk
+jackpot_link = None
+
+
+def load_open_taps():
+    """Charged taps from before a restart, so a refund for one of them can still find its card."""
+    try:
+        with open(OPEN_TAPS_PATH) as f:
+            taps = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Couldn't read {OPEN_TAPS_PATH}: {e}")
+        return
+    cutoff = time.time() - OPEN_TAP_MAX_AGE
+    with reply_cond:
+        open_taps.update({cid: t for cid, t in taps.items() if t.get("at", 0) >= cutoff})
+        save_open_taps()
+    print(f"[TAPS] {len(open_taps)} open tap(s) from the last run")
+
+
+def save_open_taps():
+    """Write open_taps atomically. Call with reply_cond held."""
+    tmp = OPEN_TAPS_PATH + ".tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(open_taps, f)
+        os.replace(tmp, OPEN_TAPS_PATH)
+    except OSError as e:
+        print(f"[WARN] Couldn't save open taps: {e}")
 
 
-def send_rfid_post(rfid_id, ser):
+def send_rfid_post(rfid_id, ser, cid=None):
     payload = {
         "rfid_id": rfid_id,
         "amount": str(DEDUCT_AMOUNT)
@@ -33,7 +75,9 @@ def send_rfid_post(rfid_id, ser):
     remaining_credits = None  # Initialize variable
 
     try:
-        res = requests.post(BASE_URL, json={"rfid_id": rfid_id})
+        with instrument.span("deduct", cid=cid) as sp:
+            res = requests.post(BASE_URL, json={"rfid_id": rfid_id})
+            sp.set(status=res.status_code)
         print("Sent POST:", payload)
 
         print("Response:", res.text[:200])  # show first 200 chars
@@ -44,6 +88,7 @@ def send_rfid_post(rfid_id, ser):
 
     except Exception as e:
         print("❌ FAIL (error:", e, ")")
+        instrument.inc("deduct_failures_total")
         return "FAILED"
     finally:
         # ✅ Tell Arduino it's safe to scan again
@@ -65,129 +110,233 @@ def parse_rfid_line(line):
     return None
 
 
-def handle_server_messages(sock):
-    """Thread function to read messages from server."""
-    global server_response
-    while True:
+def handle_jackpot_message(line):
+    """Link callback for one line from the jackpot (heartbeat replies are already dropped)."""
+    print("[SERVER] Received:", line)
+    message, cid = instrument.untag(line)
+    if message.startswith("REFUND") and cid:
+        threading.Thread(target=pay_refund, args=(cid, message), daemon=True).start()
+        return
+    if message.startswith("QUEUED"):
         try:
-            data = sock.recv(1024)
-            if not data:
-                print("[SERVER] Connection closed")
-                break
+            eta = float(message.split()[1])
+        except (IndexError, ValueError):
+            return
+        with reply_cond:
+            queued_eta[cid] = eta
+            reply_cond.notify_all()
+        return
+    with reply_cond:
+        cid = cid or waiting_cid  # a jackpot without correlation ids answers the tap in flight
+        if cid is not None and cid == waiting_cid:
+            replies[cid] = message
+            reply_cond.notify_all()
+            return
+        late = cid in open_taps and not open_taps[cid].get("refunded")
+    if late:
+        # main() gave up waiting on this tap; credit it now rather than lose the payout.
+        threading.Thread(target=settle_tap, args=(cid, message), daemon=True).start()
+    else:
+        print(f"[WARN] Reply for unknown tap {cid}: {message}")
 
-            message = data.decode().strip()
-            print("[SERVER] Received:", message)
 
-            # Store the response and notify main thread
-            with response_lock:
-                server_response = message
-            response_received.set()
+def handle_turret_message(line):
+    print("[TURRET] Received:", line)
 
-        except Exception as e:
-            print("[SERVER] Error:", e)
-            break
 
+def connect_to_server(hostaddr, hostport, name, on_message):
+    """
+    Supervised connection: connects in the background, reconnects with backoff and heartbeats
+    until the process exits. Doesn't wait for the first connect, so a host that is down
+    never stops the gateway from reading cards.
+    """
+    return Link(hostaddr, hostport, name, on_message).start()
 
-def connect_to_server(hostaddr, hostport):
-    while True:
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.connect((hostaddr, hostport))
-            print(f"[SERVER] Connected to {hostaddr}:{hostport}")
-            threading.Thread(target=handle_server_messages,
-                             args=(sock,), daemon=True).start()
-            return sock
-        except Exception as e:
-            print(f"[ERROR] Failed to connect to {hostaddr}:{hostport} - {e}")
-
-
-def wait_for_server_response(timeout=3):
-    """Wait for server response with timeout"""
-    global server_response
-    print("Waiting for server response...")
 
-    if response_received.wait(timeout=timeout):
-        with response_lock:
-            response = server_response
-            server_response = None  # Reset for next use
-        response_received.clear()
-        return response
-    else:
-        print("❌ Timeout waiting for server response")
+def wait_for_server_response(cid):
+    """
+    Wait for the payout of tap `cid`. The jackpot's QUEUED estimate replaces REPLY_TIMEOUT,
+    so a tap queued behind other rounds isn't given up on. Returns None on timeout.
+    """
+    global waiting_cid
+    print("Waiting for server response...")
+    deadline = time.monotonic() + REPLY_TIMEOUT
+    with reply_cond:
+        waiting_cid = cid
+        try:
+            while cid not in replies:
+                eta = queued_eta.pop(cid, None)
+                if eta is not None:
+                    deadline = time.monotonic() + eta + REPLY_SLACK
+                    print(f"Tap queued on the jackpot, waiting up to {eta + REPLY_SLACK:.0f}s")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print("❌ Timeout waiting for server response")
+                    return None
+                reply_cond.wait(remaining)
+            return replies.pop(cid)
+        finally:
+            waiting_cid = None
+            queued_eta.pop(cid, None)
+
+
+def settle_tap(cid, reply):
+    """Credit a tap's payout to its card (once); returns the payout, or None if it can't be read."""
+    with reply_cond:
+        tap = open_taps.get(cid)
+        if tap is None or tap.get("refunded"):
+            return None
+        del open_taps[cid]
+        save_open_taps()
+    rfid_id = tap["rfid"]
+    try:
+        payout_value = int(reply)
+    except (ValueError, TypeError) as e:
+        print(f"Error converting server response to integer: {e}")
+        print(f"Server sent: '{reply}'")
         return None
+    if payout_value == 0:
+        print(f"Payout: 0")
+    elif payout_value > 0:
+        print(f"Payout: {payout_value}")
+        update_server_rfid(rfid_id, payout_value, cid)
+    else:
+        print(f"Unexpected payout value: {payout_value}")
+    return payout_value
 
 
-def update_server_rfid(rfid_id, payout):
-    payload = {"rfid_id": rfid_id, "amount": payout}
+def pay_refund(cid, message):
+    """
+    Credit the bet of a tap whose round the jackpot lost, then acknowledge it. Taps from other
+    gateways are ignored. A refund already paid (the ack got lost) is only acknowledged again.
+    """
     try:
-        res = requests.post(BASE_URL_2, json=payload, timeout=5)
-        print(f"Status: {res.status_code}")
-        print("Response:", res.json())
-    except requests.exceptions.RequestException as e:
-        print("Request failed:", e)
+        amount = int(message.split()[1])
+    except (IndexError, ValueError):
+        print(f"[WARN] Bad refund request: {message}")
+        return
+    with reply_cond:
+        tap = open_taps.get(cid)
+    if tap is None:
+        return
+    if not tap.get("refunded"):
+        print(f"Refunding {amount} to {tap['rfid']} for a round the jackpot lost")
+        if not update_server_rfid(tap["rfid"], amount, cid):
+            return  # stays open; the jackpot asks again next time we connect
+        instrument.inc("crash_refunds_total")
+        with reply_cond:
+            tap["refunded"] = True
+            save_open_taps()
+    if jackpot_link is not None:
+        jackpot_link.send((instrument.tag("REFUNDED", cid) + "\n").encode())
+
+
+def update_server_rfid(rfid_id, payout, cid=None):
+    """Add `payout` to the card's credits; True if the credit service took it."""
+    payload = {"rfid_id": rfid_id, "amount": payout}
+    with instrument.span("credit_add", cid=cid, points=payout) as sp:
+        try:
+            res = requests.post(BASE_URL_2, json=payload, timeout=5)
+            sp.set(status=res.status_code)
+            print(f"Status: {res.status_code}")
+            print("Response:", res.text[:200])
+            return res.ok
+        except requests.exceptions.RequestException as e:
+            sp.fail(str(e))
+            print("Request failed:", e)
+            return False
 
 
 def main():
-    global server_response
+    global jackpot_link
+    instrument.configure_from_env("gateway")
+    spin_profile.configure_from_env("gateway")
+
+    load_open_taps()
+    jackpot_link = connect_to_server(HOST, PORT, "jackpot", handle_jackpot_message)
+    turret_link = connect_to_server(HOST2, PORT2, "turret", handle_turret_message)
 
     print(f"Opening serial port {SERIAL_PORT}...")
     with serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1) as ser:
         time.sleep(5)
         print("Listening for RFID scans...\n")
 
-    while True:
-        try:
-            jackpot_server_sock = connect_to_server(HOST, PORT)
-            turret_server_sock = connect_to_server(HOST2, PORT2)
-            break  # Break out of the loop only when both connections are successful
-        except Exception as e:
-            print(f"[ERROR] One or both connections failed, retrying both...")
-
         while True:
             line = ser.readline().decode(errors="ignore").strip()
             if not line:
                 continue
+            line_at, line_perf = time.time(), time.perf_counter()
 
             print("Serial:", line)
             rfid_id = parse_rfid_line(line)
             if rfid_id:
+                # One correlation id per tap; it rides along as " #<id>" so jackpot/turret spans join up.
+                cid = instrument.new_id()
+                instrument.event("rfid_read", cid)
+                instrument.inc("taps_total")
+                wf = spin_profile.start(cid, line_at, line_perf)
+                wf.mark("serial_parse")
+
+                if not jackpot_link.connected:
+                    # Don't charge a card for a spin that can't run; the link keeps reconnecting.
+                    print("[ERROR] Jackpot server unreachable, ignoring tap")
+                    ser.write(b"DONE\n")
+                    ser.flush()
+                    wf.finish(result="JACKPOT DOWN")
+                    continue
+
                 # Send RFID data to HTTP server
-                return_message = send_rfid_post(rfid_id, ser)
+                return_message = send_rfid_post(rfid_id, ser, cid)
+                wf.mark("deduct")
+                tagged = instrument.tag(return_message, cid)
 
                 # Send result to socket server
-                jackpot_server_sock.sendall(return_message.encode())
+                if return_message == "SUCCESS":
+                    with reply_cond:
+                        open_taps[cid] = {"rfid": rfid_id, "at": time.time()}
+                        save_open_taps()
+                if not jackpot_link.send((tagged + "\n").encode()):
+                    print("[ERROR] Lost the jackpot server while sending")
+                    if return_message == "SUCCESS":
+                        # The card was charged for a spin that will never run: give the bet back.
+                        with reply_cond:
+                            open_taps.pop(cid, None)
+                            save_open_taps()
+                        print(f"Refunding {-DEDUCT_AMOUNT} to {rfid_id}")
+                        update_server_rfid(rfid_id, -DEDUCT_AMOUNT, cid)
+                        wf.mark("credit_add")
+                        wf.finish(result="JACKPOT LOST")
+                        continue
                 print(
                     f"Sent '{return_message}' to server, waiting for response...")
 
                 if return_message == "NO CREDS":
                     print(f"Send message to turret_server {return_message}")
-                    turret_server_sock.sendall(
-                        (return_message + "\n").encode())
+                    if not turret_link.send((tagged + "\n").encode()):
+                        print("[ERROR] Turret host unreachable, NO CREDS not delivered")
+                wf.mark("socket_send")
+
+                if return_message != "SUCCESS":
+                    # The jackpot only answers rounds; don't sit out REPLY_TIMEOUT for nothing.
+                    wf.finish(result=return_message)
+                    continue
 
                 # Wait for server response before continuing
-                server_response = wait_for_server_response()
+                with instrument.span("jackpot_reply", cid=cid) as sp:
+                    server_response = wait_for_server_response(cid)
+                    if server_response is None:
+                        sp.fail("timeout")
+                wf.mark("jackpot_reply")
 
                 print(f"Raw server response: {server_response}")
 
                 # Handle the server response safely
                 if server_response is not None:
-                    try:
-                        payout_value = int(server_response)
-
-                        if payout_value == 0:
-                            print(f"Payout: 0")
-                        elif payout_value > 0:
-                            print(f"Payout: {payout_value}")
-                            update_server_rfid(rfid_id, payout_value)
-                        else:
-                            print(f"Unexpected payout value: {payout_value}")
-
-                    except (ValueError, TypeError) as e:
-                        print(
-                            f"Error converting server response to integer: {e}")
-                        print(f"Server sent: '{server_response}'")
+                    if settle_tap(cid, server_response):
+                        wf.mark("credit_add")
                 else:
-                    print("No response from server, continuing anyway...")
+                    print("No response from server yet; its payout is credited if it arrives later")
+                wf.finish(result=return_message, reply=server_response)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+"""
+Shared counters, latency histograms and spans for the RFID gateway, jackpot server and turret host.
+
+The turret host loads this same file by path (stepper_cli.py, SMG_INSTRUMENT) without
+putting the rest of the gateway on its import path.
+
+Every card tap gets a correlation id (new_id()) that travels with the gateway's messages
+("SUCCESS #<id>", "NO CREDS #<id>"), so spans from all three processes can be joined:
+
+    with instrument.span("deduct", cid=cid):
+        ...
+    instrument.inc("rolls_total", outcome="win")
+    instrument.observe("reel_report_seconds", 0.42, dev=3)
+    instrument.gauge("round_queue_depth", 2)
+
+Output, configured per process with configure() or environment variables:
+  SMG_METRICS_JSONL=path   append one JSON object per span/event (for offline analysis)
+  SMG_METRICS_PORT=9101    serve counters and histograms in Prometheus text format on /metrics
+
+Until one of those is set, everything is disabled: span() hands back a shared no-op object
+and inc()/observe()/event() return on the first line, so instrumented code pays roughly one
+function call per site.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Histogram bucket upper bounds, seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_enabled = False
+_service = "app"
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_histograms: Dict[str, Dict[LabelKey, List[float]]] = {}  # bucket counts..., +Inf count, sum
+_gauges: Dict[str, Dict[LabelKey, float]] = {}
+_jsonl = None
+_http: Optional[ThreadingHTTPServer] = None
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def configure(service: str, jsonl: Optional[str] = None, port: Optional[int] = None,
+              host: str = "127.0.0.1") -> None:
+    """Turn instrumentation on for this process if a JSONL path and/or metrics port is given."""
+    global _enabled, _service, _jsonl, _http
+    _service = service
+    if jsonl:
+        _jsonl = open(jsonl, "a", buffering=1)  # line-buffered: each record lands whole
+    if port:
+        _http = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_http.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"[METRICS] Prometheus metrics on http://{host}:{port}/metrics")
+    _enabled = bool(_jsonl or _http)
+
+
+def configure_from_env(service: str) -> None:
+    port = os.environ.get("SMG_METRICS_PORT")
+    configure(service, jsonl=os.environ.get("SMG_METRICS_JSONL") or None, port=int(port) if port else None,
+              host=os.environ.get("SMG_METRICS_HOST", "127.0.0.1"))
+
+
+def new_id() -> str:
+    """Short correlation id for one card tap / spin."""
+    return uuid.uuid4().hex[:10]
+
+
+def tag(message: str, cid: Optional[str]) -> str:
+    """Append a correlation id to a text protocol message ("SUCCESS" -> "SUCCESS #ab12...")."""
+    return f"{message} #{cid}" if cid else message
+
+
+def untag(message: str) -> Tuple[str, Optional[str]]:
+    """Split "SUCCESS #ab12" into ("SUCCESS", "ab12"); untagged messages give (message, None)."""
+    body, sep, cid = message.rpartition(" #")
+    if not sep or not cid or " " in cid:
+        return message, None
+    return body, cid
+
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    if not _enabled:
+        return
+    key = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+
+def gauge(name: str, value: float, **labels) -> None:
+    """Set the current value of gauge `name`."""
+    if not _enabled:
+        return
+    key = _key(labels)
+    with _lock:
+        _gauges.setdefault(name, {})[key] = value
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Add one latency sample to histogram `name`."""
+    if not _enabled:
+        return
+    key = _key(labels)
+    with _lock:
+        h = _histograms.setdefault(name, {}).get(key)
+        if h is None:
+            h = _histograms[name][key] = [0.0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+                break
+        else:
+            h[len(BUCKETS)] += 1
+        h[-1] += seconds
+
+
+def event(name: str, cid: Optional[str] = None, **attrs) -> None:
+    """A point-in-time record in the JSONL stream (no metric)."""
+    if not _enabled:
+        return
+    _write({"ts": time.time(), "service": _service, "kind": "event", "name": name, "cid": cid, **attrs})
+
+
+def _write(record: dict) -> None:
+    if _jsonl is None:
+        return
+    line = json.dumps(record, default=str)
+    with _lock:
+        _jsonl.write(line + "\n")
+
+
+class Span:
+    """Times a block; on exit records `<name>_seconds` and writes a span record with start, duration and cid."""
+
+    __slots__ = ("name", "cid", "attrs", "ok", "start", "_t0")
+
+    def __init__(self, name: str, cid: Optional[str], attrs: dict):
+        self.name = name
+        self.cid = cid
+        self.attrs = attrs
+        self.ok = True
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def fail(self, reason: Optional[str] = None) -> None:
+        self.ok = False
+        if reason:
+            self.attrs["error"] = reason
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        dur = time.perf_counter() - self._t0
+        if exc_type is not None:
+            self.fail(f"{exc_type.__name__}: {exc}")
+        observe(f"{self.name}_seconds", dur)
+        if not self.ok:
+            inc(f"{self.name}_errors_total")
+        _write({"ts": self.start, "service": _service, "kind": "span", "name": self.name, "cid": self.cid,
+                "ms": round(dur * 1000.0, 3), "ok": self.ok, **self.attrs})
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def fail(self, reason: Optional[str] = None) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, cid: Optional[str] = None, **attrs):
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, cid, attrs)
+
+
+def _fmt_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render_prometheus() -> str:
+    lines = []
+    with _lock:
+        counters = {n: dict(s) for n, s in _counters.items()}
+        histograms = {n: {k: list(v) for k, v in s.items()} for n, s in _histograms.items()}
+        gauges = {n: dict(s) for n, s in _gauges.items()}
+    for kind, metrics in (("counter", counters), ("gauge", gauges)):
+        for name, series in sorted(metrics.items()):
+            metric = f"smg_{name}"
+            lines.append(f"# TYPE {metric} {kind}")
+            for key, value in series.items():
+                lines.append(f"{metric}{_fmt_labels(key + (('service', _service),))} {value:g}")
+    for name, series in sorted(histograms.items()):
+        metric = f"smg_{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for key, h in series.items():
+            key = key + (("service", _service),)
+            running = 0.0
+            for bound, count in zip(BUCKETS, h):
+                running += count
+                lines.append(f"{metric}_bucket{_fmt_labels(key, (('le', f'{bound:g}'),))} {running:g}")
+            running += h[len(BUCKETS)]
+            lines.append(f"{metric}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {running:g}")
+            lines.append(f"{metric}_sum{_fmt_labels(key)} {h[-1]:.6f}")
+            lines.append(f"{metric}_count{_fmt_labels(key)} {running:g}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -1,4 +1,3 @@
-
 # jackpot_server.py (cleaned)
 # Python server for TinyScreen slot clients (devNum 2,3,4)
 # Protocol:
@@ -6,17 +5,56 @@
 #  - Server sends a single byte target (0..5) to command the middle symbol
 #  - Client replies after spin with 4 bytes: devNum, top, mid, bottom
 
+import os
 import socket
 import threading
 import time
 import random
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
+
+import instrument
+import spin_profile
+from spin_journal import KIND_CONSOLE, KIND_SLOT, CREDITS, SpinJournal
+import spin_history
+from reel_monitor import ReelMonitor
+from admin_api import AdminServer
+from conn_supervisor import PING, PONG, Liveness, shutdown_quietly, strip_token
+from round_deadline import ReportLatency
+from round_scheduler import RoundJob, RoundScheduler
 
 HOST = "0.0.0.0"
 PORT = 5000
 BET = 10
 EXPECTED_DEVICES = [2, 3, 4]  # devices map to columns 0,1,2
-ROLL_RESPONSE_TIMEOUT = 10.0   # seconds to wait for client results after a roll
+ROLL_RESPONSE_TIMEOUT = 10.0   # longest wait for client results after a roll; usually report_latency decides
+# A reel with no result by the deadline: "void" refunds the bet; "default" shows DEFAULT_SYMBOL in its
+# column, and any line through that column can't win.
+LATE_POLICY = os.environ.get("SMG_LATE_POLICY", "void")
+DEFAULT_SYMBOL = 0  # lemon
+JOURNAL_PATH = os.environ.get("SMG_JOURNAL", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "spin_journal.bin"))
+JOURNAL_COMMIT_INTERVAL = 0.05  # seconds; journal fsyncs are batched at most this often
+HISTORY_DIR = os.environ.get("SMG_HISTORY", spin_history.DEFAULT_DIR)
+CABINET_ID = int(os.environ.get("SMG_CABINET", "1"))
+ADMIN_ADDR = os.environ.get("SMG_ADMIN", "127.0.0.1:8765")  # host:port, unix:/path, or "off"
+ADMIN_TOKEN = os.environ.get("SMG_ADMIN_TOKEN")             # required on POSTs; unset = read-only API
+
+# Reel heartbeats: an idle reel is pinged with 0xFE (it answers 0xFF) and dropped once it has
+# been silent for HEARTBEAT_TIMEOUT. A reel can't answer while it spins, flashes or shows a
+# payout, so each of those commands buys it a grace period first.
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 4.0
+PING_BYTE, PONG_BYTE = 0xFE, 0xFF
+SPIN_GRACE = 9.0      # longest spin (dev 4: 13 rounds x 3 steps x 175 ms) plus slack
+FLASH_GRACE = 4.0
+PAYOUT_GRACE = 5.0
+GATEWAY_IDLE_TIMEOUT = 30.0  # the gateway pings every 2 s; drop its socket after this much silence
+# How long a reel really stays busy after a command, from slots/jackpot_extra3x1.ino: a win
+# flashes 9 x 2 colours x 150 ms, a payout is a 2 s wait for the amount then 2 s on screen.
+FLASH_SECONDS = 2.8
+PAYOUT_SECONDS = 4.3
+ROUND_QUEUE = int(os.environ.get("SMG_ROUND_QUEUE", "3"))  # rounds allowed to wait behind the running one
+ROUND_OVERHEAD = FLASH_SECONDS + PAYOUT_SECONDS + 0.5  # a round's worst case beyond its report deadline
 
 # multipliers per symbol index (0=lemon,1=cherry,2=clover,3=bell,4=diamond,5=seven)
 MULTIPLIERS = [2, 4, 8, 12, 20, 25]
@@ -32,12 +70,28 @@ latest_results: Dict[int, List[int]] = {}
 credits_lock = threading.Lock()
 credits = 0
 payout = 0
+journal: Optional[SpinJournal] = None   # opened by main(); rounds run without one when imported
+history: Optional[spin_history.HistoryWriter] = None
+# cid -> card-tap round a crash left open; offered to every gateway that connects until one pays it
+owed_refunds: Dict[str, dict] = {}
+reel_monitor = ReelMonitor(EXPECTED_DEVICES)
+reel_liveness = Liveness(HEARTBEAT_INTERVAL, HEARTBEAT_TIMEOUT, name="reel-liveness")
 
 # round control
 round_lock = threading.Lock()
 round_in_progress = False
 pending_reports = set()   # devices we are still waiting for this round
 current_targets: Dict[int, int] = {}
+round_cid: Optional[str] = None   # correlation id of the tap that started the round
+round_started = 0.0               # perf_counter() when the targets went out
+round_profile = spin_profile.NULL  # waterfall of the round in progress (no-op unless SMG_PROFILE is set)
+reel_busy_until: Dict[int, float] = {}  # devNum -> perf_counter() when it finishes its flash/payout display
+round_reported = set()            # devices whose report for this round arrived in time
+round_deadline = 0.0              # seconds this round waits for reports (from report_latency)
+round_done = threading.Event()    # set once every pending device has reported or dropped out
+# device that missed a deadline -> (round_started, target) of that round, until its report shows up
+late_reels: Dict[int, Tuple[float, Optional[int]]] = {}
+report_latency = ReportLatency(ceiling=ROLL_RESPONSE_TIMEOUT)
 
 # Winning lines
 # LINES = [
@@ -80,14 +134,18 @@ def recv_exact(conn: socket.socket, n: int, timeout: float = 2.0) -> bytes:
     return data
 
 
-def calculate_payout_from_grid(grid: List[List[int]]) -> int:
+def calculate_payout_from_grid(grid: List[List[int]], missing: List[int] = ()) -> int:
     """
     grid: 3x3 list of symbol indices (0..5)
     Returns payout in points (multipliers * BET summed over each winning line).
     Counts each winning line once. Overlaps are allowed (center can be in multiple wins).
+    Lines through the column of a device in `missing` never win.
     """
+    dead_cols = {EXPECTED_DEVICES.index(d) for d in missing}
     total_multiplier = 0
     for line in LINES:
+        if any(c in dead_cols for _, c in line):
+            continue
         symbols = [grid[r][c] for (r, c) in line]
         if symbols[0] == symbols[1] == symbols[2]:
             sym = symbols[0]
@@ -96,20 +154,17 @@ def calculate_payout_from_grid(grid: List[List[int]]) -> int:
     return total_multiplier * BET
 
 
-def build_grid_from_results() -> List[List[int]]:
+def build_grid_from_results(missing: List[int] = ()) -> List[List[int]]:
     """
     Build 3x3 grid where columns = devices (dev 2 -> col0, dev3 -> col1, dev4 -> col2)
     rows = top(0), mid(1), bottom(2).
-    If a device hasn't reported, default symbol 0 (lemon).
+    Devices in `missing`, or with no result at all, show DEFAULT_SYMBOL (lemon) on every row.
     """
+    blank = [DEFAULT_SYMBOL] * 3
     with latest_results_lock:
-        snapshot = {dev: latest_results.get(
-            dev, [0, 0, 0]) for dev in EXPECTED_DEVICES}
-
-    all_devs = [2, 3, 4]
-    for dev in all_devs:
-        if dev not in snapshot:
-            snapshot[dev] = [0, 0, 0]
+        snapshot = {dev: latest_results.get(dev) or blank for dev in EXPECTED_DEVICES}
+    for dev in missing:
+        snapshot[dev] = blank
 
     # Columns are devices, rows are top/mid/bottom
     grid = [
@@ -140,16 +195,26 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]):
             return
 
         with clients_lock:
+            stale = clients.get(dev_num)
             clients[dev_num] = (conn, addr)
+        if stale is not None:
+            # The reel rebooted or lost Wi-Fi and came back before its old socket timed out.
+            print(f"[REGISTER] devNum {dev_num} reconnected, dropping old connection {stale[1]}")
+            shutdown_quietly(stale[0])
+        reel_liveness.add(dev_num, lambda: conn.sendall(bytes([PING_BYTE])),
+                          lambda: _drop_dead_reel(dev_num, conn))
         print(f"[REGISTER] devNum {dev_num} from {addr}")
 
-        # read loop for reports (each report is 4 bytes)
+        # read loop: 4-byte reports (first byte is the devNum) and 1-byte heartbeat replies
         while True:
-            # block until 4 bytes or closed
-            data = recv_exact(conn, 4, timeout=None)
-            if not data or len(data) < 4:
+            first = recv_exact(conn, 1, timeout=None)
+            if not first:
                 # connection closed or broken
                 break
+            reel_liveness.heard(dev_num)
+            if first[0] == PONG_BYTE:
+                continue
+            data = first + recv_exact(conn, 3, timeout=2.0)
             if len(data) != 4:
                 # partial packet — ignore
                 continue
@@ -163,9 +228,32 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]):
                 f"[REPORT] dev {dev_num} @ {addr} -> top={top} mid={mid} bot={bot}")
 
             # If a round is waiting for this device, mark it as arrived
+            target = None
+            late = None
             with round_lock:
                 if round_in_progress and dev_num in pending_reports:
+                    target = current_targets.get(dev_num)
                     pending_reports.discard(dev_num)
+                    round_reported.add(dev_num)
+                    waited = time.perf_counter() - round_started
+                    report_latency.observe(dev_num, waited)
+                    instrument.observe("reel_report_seconds", waited, dev=dev_num)
+                    instrument.event("reel_report", round_cid, dev=dev_num,
+                                     ms=round(waited * 1000.0, 3), symbols=[top, mid, bot])
+                    round_profile.mark(f"report_dev{dev_num}")
+                    if not pending_reports:
+                        round_done.set()
+                elif dev_num in late_reels:
+                    # The report for a round that already gave up on this reel: never part of a grid,
+                    # but its latency still counts, or the deadline could never grow back.
+                    started, target = late_reels.pop(dev_num)
+                    late = time.perf_counter() - started
+                    report_latency.observe(dev_num, late)
+            if late is not None:
+                scheduler.wake()  # the next round may have been holding off for this reel
+                instrument.inc("late_reports_total", dev=dev_num)
+                print(f"[LATE] dev {dev_num} reported {late:.2f}s after its round started; ignored")
+            reel_monitor.observe(dev_num, target, top, mid, bot)
     except Exception as e:
         print(f"[ERROR] client {addr} exception: {e}")
     finally:
@@ -175,18 +263,33 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]):
             pass
         if dev_num is not None:
             with clients_lock:
-                if dev_num in clients:
+                current = clients.get(dev_num, (None,))[0] is conn
+                if current:
                     del clients[dev_num]
-            with latest_results_lock:
-                if dev_num in latest_results:
-                    del latest_results[dev_num]
+            # If the reel already reconnected, its new connection keeps the registration.
+            if current:
+                reel_liveness.remove(dev_num)
+                with latest_results_lock:
+                    if dev_num in latest_results:
+                        del latest_results[dev_num]
             # if a device disconnects while waiting, also remove from pending
             with round_lock:
                 if dev_num in pending_reports:
                     pending_reports.discard(dev_num)
+                    if not pending_reports:
+                        round_done.set()
+                late_reels.pop(dev_num, None)
+            scheduler.wake()
             print(f"[DISCONNECT] devNum {dev_num} ({addr}) disconnected")
 
 
+def _drop_dead_reel(dev_num: int, conn: socket.socket) -> None:
+    """Liveness gave up on a reel: close it so its handler unregisters it and any round stops waiting."""
+    instrument.inc("reel_dead_total", dev=dev_num)
+    instrument.event("reel_dead", round_cid, dev=dev_num)
+    shutdown_quietly(conn)
+
+
 def accept_loop(server_sock: socket.socket):
     while True:
         try:
@@ -205,27 +308,162 @@ def accept_loop(server_sock: socket.socket):
             time.sleep(0.1)
 
 
-def send_target_to_all(target_map: Dict[int, int]):
+def reels_busy_for() -> float:
+    """
+    Seconds until every reel has finished showing the last round's flash or payout, and
+    every late reel has finished (or can no longer be on) the spin it missed its deadline in.
+    """
+    busy = list(reel_busy_until.values())
+    busy += [started + SPIN_GRACE for started, _ in list(late_reels.values())]
+    return max(busy, default=0.0) - time.perf_counter()
+
+
+def tap_eta(job: RoundJob) -> float:
+    """Upper estimate of the seconds until `job`'s reply, for the gateway to wait on."""
+    per_round = report_latency.deadline(EXPECTED_DEVICES) + ROUND_OVERHEAD
+    return max(0.0, reels_busy_for()) + scheduler.position(job) * per_round
+
+
+scheduler = RoundScheduler(ROUND_QUEUE, reels_busy_for, name="round-scheduler")
+
+
+def connected_reels() -> List[int]:
+    """Connected reels that are answering heartbeats; one that has missed pings sits the round out."""
+    with clients_lock:
+        devs = [d for d in clients.keys() if d in EXPECTED_DEVICES]
+    now = time.perf_counter()
+    with round_lock:
+        for d, (started, _) in list(late_reels.items()):
+            if now - started > SPIN_GRACE:
+                del late_reels[d]  # no spin lasts this long; the report was lost
+        busy = [d for d in devs if d in late_reels]
+    live = [d for d in devs if reel_liveness.responsive(d)]
+    if len(live) != len(devs):
+        print(f"[WARN] skipping unresponsive reels: {sorted(set(devs) - set(live))}")
+    if busy:
+        # Still spinning for a round that timed out; its next report belongs to that round.
+        print(f"[WARN] skipping reels still finishing a late spin: {busy}")
+    return [d for d in live if d not in busy]
+
+
+def unavailable_reels(connected: List[int]) -> List[int]:
+    """Expected reels missing from `connected`. A round needs all of them, so none of its lines is dead from the start."""
+    missing = [d for d in EXPECTED_DEVICES if d not in connected]
+    if missing:
+        instrument.inc("rounds_refused_total", reason="reels_unavailable")
+    return missing
+
+
+def send_target_to_all(target_map: Dict[int, int], devices: Optional[List[int]] = None):
     """
     target_map: devNum -> target (0..5)
-    Sends single-byte command to each connected client. If a client is disconnected, skip.
+    Sends single-byte command to each connected client (only `devices`, if given). If a client is disconnected, skip.
     """
     with clients_lock:
         # iterate over a snapshot of currently-known clients
         items = list(clients.items())
     for dev, (conn, addr) in items:
-        if dev not in target_map:
+        if dev not in target_map or (devices is not None and dev not in devices):
             continue
         try:
             payload = bytes([target_map[dev]])
+            reel_liveness.hold(dev, SPIN_GRACE)
             conn.sendall(payload)
         except Exception as e:
             print(f"[WARN] failed to send to dev {dev} {addr}: {e}")
 
 
+def journal_begin(kind: int, cid: Optional[str], targets: Dict[int, int], credits_now: int) -> int:
+    """Journal the start of a round (bet already taken); returns its round id."""
+    if journal is None:
+        return 0
+    round_id = journal.new_round()
+    journal.begin(round_id, kind, cid, targets, EXPECTED_DEVICES, BET, credits_now)
+    return round_id
+
+
+def finish_round(round_id: int, kind: int, cid: Optional[str], targets: Dict[int, int],
+                 grid: List[List[int]], won: int, credits_now: int) -> None:
+    """Record a completed round in the journal and the columnar history."""
+    if journal is not None:
+        journal.end(round_id, kind, cid, grid, won, credits_now)
+    if history is not None:
+        history.add(round_id, kind, BET, won, [targets.get(d) for d in EXPECTED_DEVICES], grid)
+
+
+def void_round(round_id: int, kind: int, cid: Optional[str], credits_now: int) -> None:
+    """Journal the refund of a round that was voided by LATE_POLICY."""
+    if journal is not None:
+        journal.refund(round_id, kind, cid, BET, credits_now)
+
+
+def open_round(devs: List[int], targets: Dict[int, int], cid: Optional[str], profile) -> None:
+    """Publish the state handle_client() matches reports against; call before sending targets."""
+    global pending_reports, current_targets, round_cid, round_profile, round_started, round_in_progress
+    with round_lock:
+        pending_reports = set(devs)
+        round_reported.clear()
+        current_targets = targets.copy()
+        round_cid = cid
+        round_profile = profile
+        round_done.clear()
+        if not devs:
+            round_done.set()
+        round_started = time.perf_counter()
+        round_in_progress = True
+
+
+def await_reports(devs: List[int]) -> List[int]:
+    """
+    Wait for this round's reports until the adaptive deadline (no polling: the last report
+    wakes us). Returns the devices in `devs` without a report; ones still spinning become late.
+    """
+    global round_deadline
+    round_deadline = report_latency.deadline(devs)
+    instrument.observe("round_deadline_seconds", round_deadline)
+    round_done.wait(max(0.0, round_started + round_deadline - time.perf_counter()))
+    with round_lock:
+        timed_out = sorted(pending_reports)
+        for d in timed_out:
+            late_reels[d] = (round_started, current_targets.get(d))
+        pending_reports.clear()
+        reported = set(round_reported)
+    if timed_out:
+        print(f"[WARN] timed out waiting for devices: {timed_out} (deadline {round_deadline:.2f}s)")
+        for d in timed_out:
+            instrument.inc("reel_timeouts_total", dev=d)
+    return [d for d in devs if d not in reported]
+
+
+def apply_late_policy(missing: List[int], cid: Optional[str]) -> bool:
+    """Decide a round with missing devices under LATE_POLICY; True if the round is void."""
+    if not missing:
+        return False
+    void = LATE_POLICY != "default"
+    policy = "void" if void else "default"
+    instrument.inc("round_timeouts_total", policy=policy)
+    instrument.event("round_timeout", cid, missing=missing, deadline_ms=round(round_deadline * 1000.0, 1),
+                     policy=policy)
+    if void:
+        print(f"[ROLL] No result from devices {missing}: round void, bet refunded")
+    else:
+        print(f"[WARN] No result from devices {missing}: showing symbol {DEFAULT_SYMBOL}, no line through them pays")
+    return void
+
+
+def close_round() -> None:
+    global round_in_progress, pending_reports, current_targets, round_cid, round_profile
+    with round_lock:
+        round_in_progress = False
+        pending_reports = set()
+        current_targets = {}
+        round_cid = None
+        round_profile = spin_profile.NULL
+
+
 def do_roll_with_targets(target_map: Dict[int, int]):
     """Core roll logic shared by random and fixed-target rolls."""
-    global credits, round_in_progress, pending_reports, current_targets
+    global credits, round_in_progress
 
     # Ensure only one roll at a time
     with round_lock:
@@ -235,6 +473,13 @@ def do_roll_with_targets(target_map: Dict[int, int]):
         round_in_progress = True
 
     try:
+        # snapshot connected devices right now (to avoid race with new connects)
+        connected = connected_reels()
+        unavailable = unavailable_reels(connected)
+        if unavailable:
+            print(f"[WARN] Reels {unavailable} not available — roll refused, no credits taken.")
+            return
+
         # Deduct bet
         with credits_lock:
             if credits < BET:
@@ -242,132 +487,103 @@ def do_roll_with_targets(target_map: Dict[int, int]):
                 return
             credits -= BET
             before = credits + BET
+            round_id = journal_begin(KIND_CONSOLE, None, target_map, credits)
         print(f"[ROLL] Credits before pull: {before}   (deducted {BET})")
 
-        # snapshot connected devices right now (to avoid race with new connects)
-        with clients_lock:
-            connected = {d: clients[d][0]
-                         for d in clients.keys() if d in EXPECTED_DEVICES}
-
-        # Prepare round state
-        pending_reports = set(connected.keys())
-        current_targets = target_map.copy()
+        open_round(connected, target_map, None, spin_profile.start(instrument.new_id()))
 
         print(
-            f"[ROLL] sending targets -> connected devices: {list(connected.keys())}   targets: {target_map}")
+            f"[ROLL] sending targets -> connected devices: {connected}   targets: {target_map}")
 
         # send single-byte targets to all connected clients
-        send_target_to_all(target_map)
-
-        # Wait up to timeout for those connected devices to respond (update latest_results)
-        deadline = time.time() + ROLL_RESPONSE_TIMEOUT
-        while time.time() < deadline:
-            with latest_results_lock:
-                missing = [d for d in connected.keys()
-                           if d not in latest_results]
-            if not missing:
-                break
-            # also break early if all pending_reports cleared (handle case where device reports after we update latest_results)
-            with round_lock:
-                if not pending_reports:
-                    break
-            time.sleep(0.03)
-
-        # If still missing, show warning
-        with latest_results_lock:
-            missing = [d for d in connected.keys() if d not in latest_results]
-        if missing:
-            print(
-                f"[WARN] timed out waiting for devices: {missing} (using last-known/default values)")
+        send_target_to_all(target_map, connected)
+        round_profile.mark("targets_sent")
+
+        missing = await_reports(connected)
+        if apply_late_policy(missing, None):
+            with credits_lock:
+                credits += BET
+                after = credits
+                void_round(round_id, KIND_CONSOLE, None, after)
+            print(f"[ROLL] Credits after refund: {after}")
+            round_profile.finish(points=0, missing=missing, void=True)
+            return
 
         # Build grid and compute payout
-        grid = build_grid_from_results()
+        grid = build_grid_from_results(missing)
         print("[GRID] (rows = top/mid/bottom; cols = dev2/dev3/dev4)")
         for row in grid:
             print(" ".join(str(x) for x in row))
 
         # Flash any winning rows
-        winning_rows = get_winning_rows(grid)
+        winning_rows = get_winning_rows(grid, missing)
         if winning_rows:
             print(f"[FLASH] winning rows per device: {winning_rows}")
             send_flash_to_all(winning_rows)
+            round_profile.mark("flashes_sent")
 
-        payout = calculate_payout_from_grid(grid)
+        payout = calculate_payout_from_grid(grid, missing)
+        round_profile.mark("payout_computed")
         with credits_lock:
             credits += payout
             after = credits
+            finish_round(round_id, KIND_CONSOLE, None, target_map, grid, payout, after)
         print(f"[ROLL] Payout: {payout}   Credits after pull: {after}")
+        round_profile.finish(points=payout, missing=missing)
     finally:
-        # clear round state
-        with round_lock:
-            round_in_progress = False
-            pending_reports = set()
-            current_targets = {}
+        close_round()
 
 
 def roll_random_all():
-    global credits, pending_reports, current_targets, round_in_progress
+    global credits
+    connected_devs = connected_reels()
+    unavailable = unavailable_reels(connected_devs)
+    if unavailable:
+        print(f"[WARN] Reels {unavailable} not available — roll refused, no credits taken.")
+        return
     with credits_lock:
         if credits < BET:
             print("[WARN] Not enough credits to pull.")
             return
         credits -= BET
         before = credits + BET
+        targets = {dev: random.randint(0, 5) for dev in EXPECTED_DEVICES}
+        round_id = journal_begin(KIND_CONSOLE, None, targets, credits)
     print(f"[ROLL] Credits before pull: {before}   (deducted {BET})")
 
-    targets = {dev: random.randint(0, 5) for dev in EXPECTED_DEVICES}
-
-    with clients_lock:
-        connected_devs = [d for d in clients.keys() if d in EXPECTED_DEVICES]
-
-    with latest_results_lock:
-        for d in connected_devs:
-            latest_results[d] = None   # clear previous results
-
-    pending_reports = set(connected_devs)
-    current_targets = targets.copy()
-    round_in_progress = True
+    open_round(connected_devs, targets, None, spin_profile.NULL)
 
     print(
         f"[ROLL] sending targets -> connected devices: {connected_devs}   targets: {targets}")
-    send_target_to_all(targets)
-
-    deadline = time.time() + ROLL_RESPONSE_TIMEOUT
-    while time.time() < deadline:
-        with latest_results_lock:
-            missing = [d for d in connected_devs if latest_results[d] is None]
-        if not missing:
-            break
-        time.sleep(0.03)
-
-    if missing:
-        print(
-            f"[WARN] timed out waiting for devices: {missing} (using last-known/default values)")
+    send_target_to_all(targets, connected_devs)
 
-    grid = build_grid_from_results()
-    print("[GRID] (rows = top/mid/bottom; cols = dev2/dev3/dev4)")
-    for row in grid:
-        print(" ".join(str(x) for x in row))
+    try:
+        missing = await_reports(connected_devs)
+        if apply_late_policy(missing, None):
+            with credits_lock:
+                credits += BET
+                after = credits
+                void_round(round_id, KIND_CONSOLE, None, after)
+            print(f"[ROLL] Credits after refund: {after}")
+            return
 
-    payout = calculate_payout_from_grid(grid)
-    with credits_lock:
-        credits += payout
-        after = credits
-    print(f"[ROLL] Payout: {payout}   Credits after pull: {after}")
+        grid = build_grid_from_results(missing)
+        print("[GRID] (rows = top/mid/bottom; cols = dev2/dev3/dev4)")
+        for row in grid:
+            print(" ".join(str(x) for x in row))
 
-    round_in_progress = False
-    pending_reports = set()
-    current_targets = {}
+        payout = calculate_payout_from_grid(grid, missing)
+        with credits_lock:
+            credits += payout
+            after = credits
+            finish_round(round_id, KIND_CONSOLE, None, targets, grid, payout, after)
+        print(f"[ROLL] Payout: {payout}   Credits after pull: {after}")
+    finally:
+        close_round()
 
 
 def roll_set_target_map(target_map: Dict[int, int]):
     """Roll but using an externally-specified map of targets (allow 't N' type commands)."""
-    with clients_lock:
-        connected_devs = [d for d in clients.keys() if d in EXPECTED_DEVICES]
-    with latest_results_lock:
-        for d in connected_devs:
-            if d in latest_results:
-                del latest_results[d]
     do_roll_with_targets(target_map)
 
 
@@ -381,16 +597,21 @@ def send_flash_to_all(flash_map: Dict[int, List[int]]):
             if mask == 0:
                 continue
             mask |= 0x80  # set high bit to avoid conflict with 0..5
+            reel_liveness.hold(dev, FLASH_GRACE)
+            reel_busy_until[dev] = time.perf_counter() + FLASH_SECONDS
             try:
                 conn.sendall(bytes([mask]))
             except Exception as e:
                 print(f"[WARN] failed to send flash mask to dev {dev}: {e}")
 
 
-def get_winning_rows(grid) -> Dict[int, List[int]]:
+def get_winning_rows(grid, missing: List[int] = ()) -> Dict[int, List[int]]:
     flash_map = {}
+    dead_cols = {EXPECTED_DEVICES.index(d) for d in missing}
     # flash any row/column/diagonal
     for idx, line in enumerate(LINES):
+        if any(c in dead_cols for _, c in line):
+            continue
         symbols = [grid[r][c] for r, c in line]
         if symbols[0] == symbols[1] == symbols[2]:
             # for each column (device) in the line
@@ -404,6 +625,8 @@ def add_credits(amount=100):
     global credits
     with credits_lock:
         credits += amount
+        if journal is not None:
+            journal.append(CREDITS, amount=amount, credits=credits)
         print(f"[CREDIT] Added {amount}, credits now {credits}")
 
 
@@ -411,6 +634,8 @@ def set_credits(amount):
     global credits
     with credits_lock:
         credits = amount
+        if journal is not None:
+            journal.append(CREDITS, amount=amount, credits=credits)
         print(f"[CREDIT] Set credits = {credits}")
 
 
@@ -419,8 +644,135 @@ def show_credits():
         print(f"[CREDITS] {credits}")
 
 
+def show_fairness():
+    for st in reel_monitor.snapshot():
+        print(f"[FAIRNESS] dev {st['dev']}: reports={st['reports']} mismatches={st['mismatches']} "
+              f"invalid={st['invalid']} rolling chi2={st['chi2']} top-row counts={st['counts']} "
+              f"alerts={st['alerts'] or 'none'}")
+
+
+def start_roll(target_map: Optional[Dict[int, int]] = None, source: str = "console") -> Optional[RoundJob]:
+    """Queue a roll (random, or fixed targets) on the round scheduler; None if the queue is full."""
+    if target_map is None:
+        return scheduler.submit(source, roll_random_all)
+    return scheduler.submit(source, lambda: roll_set_target_map(target_map))
+
+
+def status_snapshot() -> dict:
+    """
+    Server state for the admin API. Deliberately takes none of the round/credit locks, so any
+    number of readers can poll while a round runs: it only rebinds or copies built-in
+    dicts/sets, and those copies happen atomically in CPython.
+    """
+    conns = dict(clients)
+    results = dict(latest_results)
+    in_progress = round_in_progress
+    status = {
+        "credits": credits,
+        "bet": BET,
+        "devices": {str(d): {"addr": f"{a[0]}:{a[1]}", "last": results.get(d)} for d, (_, a) in sorted(conns.items())},
+        "missing_devices": [d for d in EXPECTED_DEVICES if d not in conns],
+        "round": {
+            "in_progress": in_progress,
+            "cid": round_cid,
+            "targets": {str(d): t for d, t in dict(current_targets).items()},
+            "pending": sorted(set(pending_reports)),
+            "age_s": round(time.perf_counter() - round_started, 3) if in_progress else None,
+            "deadline_s": round(round_deadline, 3) if in_progress else None,
+        },
+        "late_reels": sorted(dict(late_reels)),
+        "late_policy": LATE_POLICY,
+        "report_latency": report_latency.snapshot(),
+        "queue": scheduler.snapshot(),
+    }
+    if journal is not None:
+        status["journal"] = {"path": JOURNAL_PATH, "next_round": journal.next_round, **journal.stats}
+    return status
+
+
+def _admin_roll(body: dict):
+    target = body.get("target")
+    target_map = None
+    if target is not None:
+        if not isinstance(target, int) or not 0 <= target <= 5:
+            return 400, {"error": "target must be an integer 0..5"}
+        target_map = {dev: target for dev in EXPECTED_DEVICES}
+    if credits < BET:
+        return 409, {"error": "not enough credits", "credits": credits}
+    unavailable = [d for d in EXPECTED_DEVICES if d not in clients]
+    if unavailable:
+        return 409, {"error": "reels not connected", "missing_devices": unavailable}
+    if start_roll(target_map, source="admin") is None:
+        return 429, {"error": "round queue full", "max_queue": scheduler.max_queue}
+    return 202, {"queued": True, "waiting": scheduler.depth, "target": target}
+
+
+def _admin_credits(body: dict):
+    try:
+        if "add" in body:
+            add_credits(int(body["add"]))
+        elif "set" in body:
+            set_credits(int(body["set"]))
+        else:
+            return 400, {"error": 'send {"add": N} or {"set": N}'}
+    except (TypeError, ValueError):
+        return 400, {"error": "amount must be an integer"}
+    return 200, {"credits": credits}
+
+
+def open_admin_api() -> Optional[AdminServer]:
+    if ADMIN_ADDR.lower() in ("", "off", "0"):
+        return None
+    api = AdminServer(ADMIN_ADDR, ADMIN_TOKEN)
+    api.route("GET", "/status", lambda body: (200, status_snapshot()))
+    api.route("GET", "/fairness", lambda body: (200, reel_monitor.snapshot()))
+    api.route("GET", "/metrics", lambda body: (200, instrument.render_prometheus()))
+    api.route("POST", "/roll", _admin_roll)
+    api.route("POST", "/credits", _admin_credits)
+    try:
+        return api.start()
+    except (OSError, RuntimeError, ValueError) as e:
+        # Port taken, unix: on Windows, or a malformed SMG_ADMIN: run the jackpot without the API.
+        print(f"[ADMIN] API disabled, cannot serve on {ADMIN_ADDR}: {e}")
+        return None
+
+
+def open_journal():
+    """Open the spin journal, restore credits and refund rounds a previous run crashed in."""
+    global journal, credits
+    journal = SpinJournal(JOURNAL_PATH, JOURNAL_COMMIT_INTERVAL)
+    refunds = journal.recover()
+    if journal.credits is not None:
+        credits = journal.credits
+        print(f"[JOURNAL] restored credits = {credits} from {JOURNAL_PATH}")
+    for r in refunds:
+        print(f"[JOURNAL] round {r['round']} never finished: refunded bet {r['bet']} to credits")
+    for r in journal.owed:
+        if r["cid"]:
+            owed_refunds[r["cid"]] = r
+            print(f"[JOURNAL] round {r['round']} (tap {r['cid']}) never finished: "
+                  f"refund of {r['bet']} will be sent to the gateway for its card")
+        else:
+            # Tapped through a gateway without correlation ids: nothing to match the card by.
+            print(f"[JOURNAL] round {r['round']} (untagged tap) never finished: "
+                  f"card owes a refund of {r['bet']}, credit it by hand")
+
+
+def open_history():
+    global history
+    try:
+        history = spin_history.HistoryWriter(HISTORY_DIR, cabinet=CABINET_ID)
+    except RuntimeError as e:
+        print(f"[HISTORY] disabled: {e}")
+
+
 def main():
     global credits
+    instrument.configure_from_env("jackpot")
+    spin_profile.configure_from_env("jackpot")
+    open_journal()
+    open_history()
+    admin = open_admin_api()
     server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server_sock.bind((HOST, PORT))
@@ -430,22 +782,39 @@ def main():
     threading.Thread(target=accept_loop, args=(
         server_sock,), daemon=True).start()
 
-    # main command loop
+    try:
+        command_loop()
+    except KeyboardInterrupt:
+        print("\nQuitting.")
+    finally:
+        # Ctrl-C as well as 'q': the journal's last batch and the partial history chunk must land.
+        if admin is not None:
+            admin.close()
+        scheduler.close()
+        journal.close()
+        if history is not None:
+            history.close()
+
+
+def command_loop():
     while True:
         try:
 
             cmd = input(
-                "Commands: (enter)=roll random, 't N'=roll N to all, 'c'=add100, 's'=show, 'set N'=set credits, 'q'=quit\n> ").strip()
+                "Commands: (enter)=roll random, 't N'=roll N to all, 'c'=add100, 's'=show, 'set N'=set credits, 'f'=reel fairness, 'q'=quit\n> ").strip()
         except EOFError:
             break
 
         if cmd == "":
             show_credits()
-            roll_random_all()
+            if start_roll() is None:
+                print("[WARN] Round queue full — ignoring roll request.")
         elif cmd.lower() == "c":
             add_credits(100)
         elif cmd.lower() == "s":
             show_credits()
+        elif cmd.lower() == "f":
+            show_fairness()
         elif cmd.lower().startswith("set "):
             parts = cmd.split()
             if len(parts) >= 2:
@@ -465,7 +834,8 @@ def main():
                     if 0 <= n <= 5:
                         target_map = {dev: n for dev in EXPECTED_DEVICES}
                         show_credits()
-                        roll_set_target_map(target_map)
+                        if start_roll(target_map) is None:
+                            print("[WARN] Round queue full — ignoring roll request.")
                     else:
                         print("[ERR] N must be 0..5")
                 except:
@@ -480,40 +850,121 @@ def main():
 
 
 def slots_to_rfid_communication(conn: socket.socket, addr):
-    global payout, credits
+    """
+    Gateway channel. Taps are queued on the round scheduler rather than run here, so this
+    thread keeps answering heartbeats and taking taps while the reels spin.
+    """
+    reply_lock = threading.Lock()  # this thread's PONGs vs. the scheduler's payout replies
+    conn.settimeout(GATEWAY_IDLE_TIMEOUT)
     try:
+        offer_refunds(conn, reply_lock)
         while True:
             data = conn.recv(1024)
             if not data:
                 break
-            message = data.decode().strip()
-            print(message)
-            if message == "SUCCESS":
-                # Calculate payout first
-                roll_slot_all()
-                # Now payout contains the actual calculated value
-                print(f"[ROLL] Actual payout calculated: {payout}")
-
-                # Send the payout status to RFID
-                send_slots_status_to_RFID(conn, payout)
-
-                # Send payout command to slot clients
-                if payout > 0:
-                    print(f"[PAYOUT] Sending payout {payout} to slot clients")
-                    send_target_payout(payout)
-                else:
-                    print("[PAYOUT] No payout to send (0 or negative)")
-
-            elif message == "NO CREDS":
-                print("HERE - NO CREDS detected, calling send_target_credits()")
-                send_target_credits()
-                print("HERE - Returned from send_target_credits()")
+            # Heartbeats may arrive on their own or glued to a tap message.
+            text, pings = strip_token(data.decode(), PING)
+            if pings:
+                with reply_lock:
+                    conn.sendall((PONG + "\n").encode())
+            for line in text.splitlines():
+                handle_gateway_message(conn, reply_lock, line.strip())
     except ConnectionResetError:
         print(f"[!] Connection lost with {addr[0]}:{addr[1]}")
+    except socket.timeout:
+        print(f"[!] Gateway {addr[0]}:{addr[1]} silent for {GATEWAY_IDLE_TIMEOUT:.0f}s, closing")
+        conn.close()
     except Exception as e:
         print(f"[ERROR] RFID communication error: {e}")
 
 
+def offer_refunds(conn: socket.socket, reply_lock: threading.Lock) -> None:
+    """Ask a freshly connected gateway to credit the cards of crashed rounds; it answers REFUNDED per tap."""
+    for cid, r in list(owed_refunds.items()):
+        print(f"[REFUND] asking gateway to refund {r['bet']} for tap {cid} (round {r['round']})")
+        with reply_lock:
+            conn.sendall((instrument.tag(f"REFUND {r['bet']}", cid) + "\n").encode())
+
+
+def refund_paid(cid: Optional[str]) -> None:
+    """The gateway credited the card of an owed round: only now is the round closed with a REFUND."""
+    r = owed_refunds.pop(cid, None)
+    if r is None:
+        return
+    with credits_lock:
+        journal.refund(r["round"], KIND_SLOT, cid, r["bet"], credits)
+    instrument.inc("crash_refunds_total")
+    print(f"[REFUND] tap {cid} (round {r['round']}) refunded {r['bet']} to its card")
+
+
+def handle_gateway_message(conn: socket.socket, reply_lock: threading.Lock, text: str) -> None:
+    if not text:
+        return
+    message, cid = instrument.untag(text)
+    print(message)
+    if message == "REFUNDED":
+        refund_paid(cid)
+        return
+    if message == "SUCCESS":
+        wf = spin_profile.start(cid)
+        wf.mark("recv")
+        job = scheduler.submit("tap", lambda c=cid, w=wf: play_tap(conn, reply_lock, c, w), cid)
+        if job is None:
+            # The credit service already took the bet; give it back rather than lose the tap.
+            print(f"[ROLL] Round queue full, refunding tap {cid}")
+            with reply_lock:
+                send_slots_status_to_RFID(conn, BET, cid)
+            wf.finish(points=BET, rejected=True)
+        elif cid is not None:
+            # Tell the gateway how long this tap may wait behind other rounds, so it doesn't give up early.
+            with reply_lock:
+                conn.sendall((instrument.tag(f"QUEUED {tap_eta(job):.1f}", cid) + "\n").encode())
+
+    elif message == "NO CREDS":
+        print("HERE - NO CREDS detected, queueing send_target_credits()")
+        instrument.inc("no_creds_total")
+        wf = spin_profile.start(cid)
+        wf.mark("recv")
+        # Queued too, so 0xAA can't land between a payout's 0xAB and its amount byte.
+        scheduler.submit("no_creds", lambda w=wf: show_no_credits(w), cid)
+
+
+def play_tap(conn: socket.socket, reply_lock: threading.Lock, cid: Optional[str], wf) -> None:
+    """Scheduler job for a card tap: run the round, reply to the gateway, show the payout on the reels."""
+    wf.mark("dequeued")
+    # Calculate payout first
+    void = roll_slot_all(cid, wf)
+    # Now payout contains the actual calculated value
+    print(f"[ROLL] Actual payout calculated: {payout}")
+
+    # Send the payout status to RFID (for a void round, the bet to give back)
+    try:
+        with reply_lock:
+            send_slots_status_to_RFID(conn, payout, cid)
+    except OSError as e:
+        print(f"[ERROR] could not reply payout {payout} for tap {cid}: {e}")
+    wf.mark("reply_sent")
+
+    # Send payout command to slot clients
+    if void:
+        print(f"[PAYOUT] Round void, bet of {payout} refunded to the card")
+    elif payout > 0:
+        print(f"[PAYOUT] Sending payout {payout} to slot clients")
+        with instrument.span("payout", cid=cid, points=payout):
+            send_target_payout(payout)
+        wf.mark("payout_sent")
+    else:
+        print("[PAYOUT] No payout to send (0 or negative)")
+    wf.finish(points=payout)
+
+
+def show_no_credits(wf) -> None:
+    send_target_credits()
+    wf.mark("no_creds_sent")
+    wf.finish()
+    print("HERE - Returned from send_target_credits()")
+
+
 def send_target_credits():
     global credits, current_targets
     with clients_lock:
@@ -534,6 +985,8 @@ def send_target_payout(payout):
     for dev, (conn, addr) in items:
         try:
             payload = bytes([0xAB])  # send only 1 byte
+            reel_liveness.hold(dev, PAYOUT_GRACE)
+            reel_busy_until[dev] = time.perf_counter() + PAYOUT_SECONDS
             print(f"[DEBUG] Sending command 0xAB to dev {dev}")
             conn.sendall(payload)
             time.sleep(0.1)  # Reduced delay
@@ -544,53 +997,63 @@ def send_target_payout(payout):
             print(f"[WARN] failed to send to dev {dev} {addr}: {e}")
 
 
-def roll_slot_all():
-    global credits, pending_reports, current_targets, round_in_progress, payout
+def roll_slot_all(cid: Optional[str] = None, wf=spin_profile.NULL) -> bool:
+    """Run a card-tap round; sets `payout` (the refunded bet if the round is void) and returns True if void."""
+    global payout
+    with instrument.span("roll", cid=cid) as sp:
+        payout, void = _roll_slot_all(cid, wf)
+        sp.set(points=payout, void=void)
+    instrument.inc("rolls_total", outcome="void" if void else "win" if payout > 0 else "lose")
+    if payout > 0 and not void:
+        instrument.inc("payout_points_total", payout)
+    return void
 
-    targets = {dev: random.randint(0, 5) for dev in EXPECTED_DEVICES}
 
-    with clients_lock:
-        connected_devs = [d for d in clients.keys() if d in EXPECTED_DEVICES]
+def _roll_slot_all(cid: Optional[str], wf) -> Tuple[int, bool]:
+    connected_devs = connected_reels()
+    unavailable = unavailable_reels(connected_devs)
+    if unavailable:
+        # Nothing was sent or journalled; the gateway credits the card with the bet we reply.
+        print(f"[ROLL] Reels {unavailable} not available: tap {cid} refused, bet refunded")
+        return BET, True
 
-    with latest_results_lock:
-        for d in connected_devs:
-            latest_results[d] = None   # clear previous results
+    targets = {dev: random.randint(0, 5) for dev in EXPECTED_DEVICES}
+    # The card's bet was taken by the credit service; journal it so a crash can be refunded.
+    with credits_lock:
+        round_id = journal_begin(KIND_SLOT, cid, targets, credits)
 
-    pending_reports = set(connected_devs)
-    current_targets = targets.copy()
-    round_in_progress = True
+    open_round(connected_devs, targets, cid, wf)
 
     print(
         f"[ROLL] sending targets -> connected devices: {connected_devs}   targets: {targets}")
-    send_target_to_all(targets)
-
-    deadline = time.time() + ROLL_RESPONSE_TIMEOUT
-    while time.time() < deadline:
-        with latest_results_lock:
-            missing = [d for d in connected_devs if latest_results[d] is None]
-        if not missing:
-            break
-        time.sleep(0.03)
-
-    if missing:
-        print(
-            f"[WARN] timed out waiting for devices: {missing} (using last-known/default values)")
-
-    grid = build_grid_from_results()
-    print("[GRID] (rows = top/mid/bottom; cols = dev2/dev3/dev4)")
-    for row in grid:
-        print(" ".join(str(x) for x in row))
+    send_target_to_all(targets, connected_devs)
+    wf.mark("targets_sent")
 
-    payout = calculate_payout_from_grid(grid)
-
-    round_in_progress = False
-    pending_reports = set()
-    current_targets = {}
+    try:
+        missing = await_reports(connected_devs)
+        if apply_late_policy(missing, cid):
+            # The gateway credits the card with whatever we reply, so reply the bet.
+            with credits_lock:
+                void_round(round_id, KIND_SLOT, cid, credits)
+            return BET, True
+
+        grid = build_grid_from_results(missing)
+        print("[GRID] (rows = top/mid/bottom; cols = dev2/dev3/dev4)")
+        for row in grid:
+            print(" ".join(str(x) for x in row))
 
+        result = calculate_payout_from_grid(grid, missing)
+        wf.mark("payout_computed")
+        with credits_lock:
+            finish_round(round_id, KIND_SLOT, cid, targets, grid, result, credits)
+        return result, False
+    finally:
+        close_round()
 
-def send_slots_status_to_RFID(conn, payout):
 
-    conn.sendall(str(payout).encode())
+def send_slots_status_to_RFID(conn, payout, cid=None):
+    """One line per reply, tagged with the tap's cid, so replies that queue up never run together."""
+    conn.sendall((instrument.tag(str(payout), cid) + "\n").encode())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+"""
+Streaming fairness checks on what the reels report.
+
+For each slot device the monitor keeps a fixed handful of numbers (O(1) memory per reel):
+
+- target mismatches: the firmware always lands the middle row on the commanded target, so
+  mid != target means a broken or tampered reel. Tracked as a count and as an
+  exponentially weighted rate.
+- a histogram of the top row, which the firmware draws fresh from symbolOdds[] after the
+  reel lands: lifetime counts, plus exponentially decayed counts over roughly `window`
+  recent reports. A Pearson chi-square of the decayed counts against SYMBOL_ODDS gives a
+  rolling drift score, so a reel that goes bad is caught even after months of good data.
+  Decayed counts vary less than raw counts of the same total, so the score is scaled by
+  sum(w) / sum(w^2) (about 1 + decay once warmed up) to follow the usual chi-square
+  distribution and keep CHI2_LIMIT's p-value honest.
+  (The bottom row is the previous middle and is slightly biased against the target, so it
+  is not tested.)
+
+An alert fires (print, metrics counter, optional callback) when a score crosses its limit
+and clears once it falls back below 80% of it. observe() is a few microseconds per report.
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import instrument
+
+SYMBOL_ODDS = (23, 23, 16, 16, 13, 9)  # percent; mirrors symbolOdds[] in slots/jackpot_extra3x1.ino
+CHI2_LIMIT = 20.52  # chi-square, 5 degrees of freedom, p = 0.001
+MISMATCH_LIMIT = 0.02  # tolerated rate of mid != target
+CLEAR_RATIO = 0.8
+
+AlertFn = Callable[[int, str, float], None]  # (dev, kind, score)
+
+
+class ReelStats:
+    __slots__ = ("dev", "reports", "judged", "mismatches", "invalid", "counts", "recent", "recent_n",
+                 "recent_sq", "weight", "mismatch_rate", "chi2", "alerts")
+
+    def __init__(self, dev: int, symbols: int):
+        self.dev = dev
+        self.reports = 0
+        self.judged = 0          # reports that had a commanded target to compare with
+        self.mismatches = 0
+        self.invalid = 0         # symbol indices outside 0..symbols-1
+        self.counts = [0] * symbols
+        # Decayed counts are stored scaled by `weight`, which grows by 1/decay per report, so a
+        # report touches one bin instead of decaying all of them.
+        self.recent = [0.0] * symbols
+        self.recent_n = 0.0
+        self.recent_sq = 0.0     # sum of squared weights, scaled by weight**2
+        self.weight = 1.0
+        self.mismatch_rate = 0.0
+        self.chi2 = 0.0
+        self.alerts = set()
+
+    def as_dict(self) -> dict:
+        return {"dev": self.dev, "reports": self.reports, "mismatches": self.mismatches, "invalid": self.invalid,
+                "mismatch_rate": round(self.mismatch_rate, 4), "chi2": round(self.chi2, 2),
+                "counts": list(self.counts), "alerts": sorted(self.alerts)}
+
+
+class ReelMonitor:
+    def __init__(self, devices: Iterable[int], odds: Iterable[float] = SYMBOL_ODDS, window: int = 600,
+                 chi2_limit: float = CHI2_LIMIT, mismatch_limit: float = MISMATCH_LIMIT,
+                 min_samples: int = 120, on_alert: Optional[AlertFn] = None):
+        odds = list(odds)
+        total = float(sum(odds))
+        self.probs = [o / total for o in odds]
+        self.decay = 1.0 - 1.0 / window
+        self.chi2_limit = chi2_limit
+        self.mismatch_limit = mismatch_limit
+        self.min_samples = min_samples  # decayed draws needed before chi-square is trusted
+        self.on_alert = on_alert
+        self._lock = threading.Lock()
+        self.reels: Dict[int, ReelStats] = {d: ReelStats(d, len(odds)) for d in devices}
+
+    def observe(self, dev: int, target: Optional[int], top: int, mid: int, bottom: int) -> None:
+        """Feed one [devNum, top, mid, bottom] report; `target` is the commanded mid symbol, if any."""
+        with self._lock:
+            st = self.reels.get(dev)
+            if st is None:
+                st = self.reels[dev] = ReelStats(dev, len(self.probs))
+            st.reports += 1
+            n = len(self.probs)
+            if target is not None:
+                st.judged += 1
+                miss = mid != target
+                if miss:
+                    st.mismatches += 1
+                    print(f"[FAIRNESS] dev {dev} landed mid={mid}, commanded {target}")
+                st.mismatch_rate = st.mismatch_rate * self.decay + (1.0 - self.decay) * miss
+            if not (0 <= top < n and 0 <= mid < n and 0 <= bottom < n):
+                st.invalid += 1
+            if 0 <= top < n:
+                st.counts[top] += 1
+                w = st.weight = st.weight / self.decay
+                st.recent[top] += w
+                st.recent_n += w
+                st.recent_sq += w * w
+                if w > 1e12:  # renormalise long before floats lose precision
+                    st.recent = [c / w for c in st.recent]
+                    st.recent_n /= w
+                    st.recent_sq /= w * w
+                    st.weight = 1.0
+                # Chi-square on weight-scaled counts is `weight` times the raw score; scaling the raw
+                # score by sum(w) / sum(w^2) = recent_n * weight / recent_sq cancels that factor.
+                total = st.recent_n
+                chi2 = 0.0
+                for obs, p in zip(st.recent, self.probs):
+                    exp = total * p
+                    chi2 += (obs - exp) * (obs - exp) / exp
+                st.chi2 = chi2 * st.recent_n / st.recent_sq
+            total = st.recent_n / st.weight
+            fired = self._check(st, "distribution", st.chi2, self.chi2_limit, total >= self.min_samples)
+            fired += self._check(st, "target_mismatch", st.mismatch_rate, self.mismatch_limit, st.judged >= 20)
+            fired += self._check(st, "invalid_symbol", float(st.invalid), 0.5, True)
+        for kind, score in fired:
+            self._raise(dev, kind, score, st)
+
+    def _check(self, st: ReelStats, kind: str, score: float, limit: float, trusted: bool) -> List[tuple]:
+        if kind in st.alerts:
+            if score < limit * CLEAR_RATIO:
+                st.alerts.discard(kind)
+                print(f"[FAIRNESS] dev {st.dev}: {kind} back to normal ({score:.3f})")
+            return []
+        if trusted and score > limit:
+            st.alerts.add(kind)
+            return [(kind, score)]
+        return []
+
+    def _raise(self, dev: int, kind: str, score: float, st: ReelStats) -> None:
+        print(f"[FAIRNESS] ALERT dev {dev}: {kind} score {score:.3f} "
+              f"(reports={st.reports}, mismatches={st.mismatches}, invalid={st.invalid})")
+        instrument.inc("fairness_alerts_total", dev=dev, kind=kind)
+        instrument.event("fairness_alert", dev=dev, kind=kind, score=round(score, 3))
+        if self.on_alert is not None:
+            try:
+                self.on_alert(dev, kind, score)
+            except Exception as e:
+                print(f"[FAIRNESS] alert callback failed: {e}")
+
+    def rolling_n(self, dev: int) -> float:
+        """Effective number of recent draws behind the rolling chi-square."""
+        st = self.reels[dev]
+        return st.recent_n / st.weight
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            return [st.as_dict() for st in self.reels.values()]
+
+    def lifetime_chi2(self, dev: int) -> float:
+        """Chi-square of every top-row symbol ever seen on `dev` (not decayed)."""
+        with self._lock:
+            counts = list(self.reels[dev].counts)
+        total = sum(counts)
+        if not total:
+            return 0.0
+        return sum((c - total * p) ** 2 / (total * p) for c, p in zip(counts, self.probs))
@@ -0,0 +1,64 @@
+"""
+Adaptive round deadline for the jackpot server.
+
+Each reel's recent report latencies (targets sent -> [devNum, top, mid, bottom] received)
+are kept in a fixed window. A round waits for the slowest reel in it: its p99 latency times
+`margin`, plus `slack` for the network, clamped to [floor, ceiling]. A reel with fewer than
+`min_samples` reports has no trustworthy p99 yet, so any round that includes it waits the
+full ceiling (the old fixed ROLL_RESPONSE_TIMEOUT).
+
+Reports that arrive after the deadline should still be observed. Otherwise the window only
+ever sees the fast reports and the deadline can never grow back.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional
+
+
+class ReportLatency:
+    def __init__(self, window: int = 256, margin: float = 1.2, slack: float = 0.3, floor: float = 1.0,
+                 ceiling: float = 10.0, min_samples: int = 20):
+        self.window = window
+        self.margin = margin
+        self.slack = slack
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[int, Deque[float]] = {}
+
+    def observe(self, dev: int, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(dev)
+            if samples is None:
+                samples = self._samples[dev] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def quantile(self, dev: int, q: float) -> Optional[float]:
+        """q-quantile of `dev`'s recent latencies (nearest rank), or None below min_samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(dev, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def deadline(self, devs: Iterable[int]) -> float:
+        """Seconds a round over `devs` should wait for their reports."""
+        wait = self.floor
+        for dev in devs:
+            p99 = self.quantile(dev, 0.99)
+            if p99 is None:
+                return self.ceiling
+            wait = max(wait, p99 * self.margin + self.slack)
+        return min(wait, self.ceiling)
+
+    def snapshot(self) -> Dict[str, dict]:
+        out = {}
+        for dev in sorted(self._samples):
+            with self._lock:
+                n = len(self._samples[dev])
+            p50, p99 = self.quantile(dev, 0.5), self.quantile(dev, 0.99)
+            out[str(dev)] = {"n": n, "p50_s": None if p50 is None else round(p50, 3),
+                             "p99_s": None if p99 is None else round(p99, 3)}
+        return out
@@ -0,0 +1,142 @@
+"""
+Per-cabinet round scheduler for the jackpot server.
+
+A cabinet's reels can run one round at a time, but rounds are asked for from several places
+at once: card taps (one thread per gateway connection), the console and the admin API.
+Every request becomes a job on a bounded FIFO queue that a single worker thread serves, so
+rounds never overlap or trample each other's round state. A tap that arrives mid-spin is
+started as soon as the reels are free instead of being dropped.
+
+"Free" means more than the last report being in. After a round the reels may still be
+flashing a win or showing a payout, and they won't read their next target until that's
+done, so the worker asks `reels_busy_for()` how long to hold off. wake() makes it ask again
+early, for when the reels free up sooner than that estimate (a late reel finally reports).
+
+When `max_queue` jobs are already waiting, submit() refuses the new one straight away (it
+returns None), so the caller can refund the tap or report the rejection.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Optional
+
+import instrument
+
+
+class RoundJob:
+    __slots__ = ("source", "cid", "fn", "queued", "started", "result", "error", "_done")
+
+    def __init__(self, source: str, fn: Callable[[], Any], cid: Optional[str]):
+        self.source = source
+        self.cid = cid
+        self.fn = fn
+        self.queued = time.perf_counter()
+        self.started: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def as_dict(self, now: float) -> dict:
+        return {"source": self.source, "cid": self.cid,
+                "age_s": round(now - (self.started or self.queued), 3)}
+
+
+class RoundScheduler:
+    def __init__(self, max_queue: int = 3, reels_busy_for: Callable[[], float] = lambda: 0.0,
+                 name: str = "rounds"):
+        self.max_queue = max_queue
+        self.reels_busy_for = reels_busy_for
+        self._jobs: Deque[RoundJob] = deque()
+        self._running: Optional[RoundJob] = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"run": 0, "rejected": 0}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        return len(self._jobs)
+
+    def submit(self, source: str, fn: Callable[[], Any], cid: Optional[str] = None) -> Optional[RoundJob]:
+        """Queue `fn` to run as the next free round; None if the queue is full or closed."""
+        job = RoundJob(source, fn, cid)
+        with self._cond:
+            if self._closed or len(self._jobs) >= self.max_queue:
+                self.stats["rejected"] += 1
+                depth = None
+            else:
+                busy = self._running is not None or bool(self._jobs)
+                self._jobs.append(job)
+                depth = len(self._jobs)
+                self._cond.notify()
+        if depth is None:
+            print(f"[QUEUE] {source} round rejected, {self.max_queue} already waiting")
+            instrument.inc("rounds_rejected_total", source=source)
+            return None
+        instrument.gauge("round_queue_depth", depth)
+        if busy:
+            print(f"[QUEUE] {source} round queued ({depth} waiting)")
+        return job
+
+    def position(self, job: RoundJob) -> int:
+        """Rounds that finish before `job` does, itself included (0 once it has run)."""
+        with self._cond:
+            if job is self._running:
+                return 1
+            if job not in self._jobs:
+                return 0
+            return self._jobs.index(job) + 1 + (self._running is not None)
+
+    def wake(self) -> None:
+        """The reels may have freed up early: have a worker holding off re-check reels_busy_for()."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        now = time.perf_counter()
+        with self._cond:
+            running = self._running.as_dict(now) if self._running is not None else None
+            waiting = [j.as_dict(now) for j in self._jobs]
+        return {"running": running, "waiting": waiting, "max_queue": self.max_queue, **self.stats}
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Stop taking jobs; rounds already queued still run (up to `timeout`)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._jobs or self._closed)
+                if not self._jobs:
+                    return
+            # The job stays queued (and counted) until the reels can take new targets.
+            while True:
+                wait = self.reels_busy_for()
+                if wait <= 0:
+                    break
+                with self._cond:
+                    self._cond.wait(wait)
+            with self._cond:
+                job = self._running = self._jobs.popleft()
+                depth = len(self._jobs)
+            instrument.gauge("round_queue_depth", depth)
+            job.started = time.perf_counter()
+            instrument.observe("round_queue_wait_seconds", job.started - job.queued, source=job.source)
+            try:
+                job.result = job.fn()
+            except Exception as e:
+                job.error = e
+                print(f"[QUEUE] {job.source} round failed: {type(e).__name__}: {e}")
+            finally:
+                with self._cond:
+                    self._running = None
+                    self.stats["run"] += 1
+                job._done.set()
@@ -0,0 +1,307 @@
+"""
+Columnar spin history: completed rounds stored as NumPy column chunks for fast aggregates.
+
+The jackpot server hands every finished round to a HistoryWriter, which buffers rows and
+writes them out as one .npz chunk per CHUNK_ROWS rounds (or after FLUSH_INTERVAL seconds,
+and on shutdown). Each chunk holds one array per column:
+
+    round u8, ts f8, cabinet u2, kind u1, bet i4, payout i4, targets u1[3], grid u1[9]
+
+Chunk file names carry the chunk's first/last timestamp, so time-bounded queries skip
+chunks without opening them. Queries are vectorised scans (bincount/unique) over the
+concatenated columns rather than loops over rounds.
+
+    python spin_history.py summary
+    python spin_history.py rtp --by hour --since 2025-11-01
+    python spin_history.py symbols --row mid
+    python spin_history.py import-journal spin_journal.bin   # backfill rounds missing from the store
+"""
+
+import argparse
+import glob
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spin_history")
+CHUNK_ROWS = 4096
+FLUSH_INTERVAL = 300.0  # seconds a partial chunk may sit in memory
+SYMBOL_NAMES = ["lemon", "cherry", "clover", "bell", "diamond", "seven"]
+NO_SYMBOL = 0xFF
+
+COLUMNS = {  # name -> (dtype, per-row shape)
+    "round": ("<u8", ()), "ts": ("<f8", ()), "cabinet": ("<u2", ()), "kind": ("u1", ()),
+    "bet": ("<i4", ()), "payout": ("<i4", ()), "targets": ("u1", (3,)), "grid": ("u1", (9,)),
+}
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy is required for the spin history store (pip install numpy)")
+
+
+def write_chunk(directory: str, cols: Dict[str, "np.ndarray"]) -> Optional[str]:
+    """Write one chunk atomically; returns its path (None if empty)."""
+    n = len(cols["ts"])
+    if n == 0:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    t0, t1 = int(cols["ts"].min()), int(cols["ts"].max())
+    base = os.path.join(directory, f"{t0}_{t1}_{int(cols['round'][0])}_{n}")
+    tmp = base + ".tmp.npz"
+    np.savez(tmp, **cols)
+    os.replace(tmp, base + ".npz")
+    return base + ".npz"
+
+
+class HistoryWriter:
+    """Buffers finished rounds and writes column chunks from a background thread."""
+
+    def __init__(self, directory: str = DEFAULT_DIR, cabinet: int = 1, chunk_rows: int = CHUNK_ROWS,
+                 flush_interval: float = FLUSH_INTERVAL):
+        _require_numpy()
+        self.directory = directory
+        self.cabinet = cabinet
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self._rows: List[tuple] = []
+        self._first_at = 0.0
+        self._lock = threading.Lock()
+        self._chunks: "queue.Queue[Optional[List[tuple]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="spin-history", daemon=True)
+        self._thread.start()
+
+    def add(self, round_id: int, kind: int, bet: int, payout: int, targets: List[Optional[int]],
+            grid: List[List[int]], ts: Optional[float] = None) -> None:
+        now = time.time() if ts is None else ts
+        row = (round_id, now, self.cabinet, kind, bet, payout,
+               [NO_SYMBOL if t is None else t for t in targets], [v for r in grid for v in r])
+        with self._lock:
+            if not self._rows:
+                self._first_at = time.time()
+            self._rows.append(row)
+            full = len(self._rows) >= self.chunk_rows or time.time() - self._first_at >= self.flush_interval
+            if full:
+                batch, self._rows = self._rows, []
+        if full:
+            self._chunks.put(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._rows = self._rows, []
+        if batch:
+            self._chunks.put(batch)
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.flush()
+        self._chunks.put(None)
+        self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        tick = max(0.05, min(self.flush_interval / 4.0, 5.0))
+        while True:
+            try:
+                batch = self._chunks.get(timeout=tick)
+            except queue.Empty:
+                # No round has come along to trip the age check in add(); flush on the clock instead.
+                with self._lock:
+                    if not self._rows or time.time() - self._first_at < self.flush_interval:
+                        continue
+                    batch, self._rows = self._rows, []
+            if batch is None:
+                return
+            try:
+                path = write_chunk(self.directory, _columns_from_rows(batch))
+                print(f"[HISTORY] wrote {len(batch)} rounds to {os.path.basename(path)}")
+            except Exception as e:
+                print(f"[HISTORY] failed to write chunk of {len(batch)} rounds: {e}")
+
+
+def _columns_from_rows(rows: List[tuple]) -> Dict[str, "np.ndarray"]:
+    names = list(COLUMNS)
+    return {name: np.array([r[i] for r in rows], dtype=COLUMNS[name][0]) for i, name in enumerate(names)}
+
+
+def load(directory: str = DEFAULT_DIR, since: Optional[float] = None,
+         until: Optional[float] = None, cabinet: Optional[int] = None) -> Dict[str, "np.ndarray"]:
+    """Concatenate every chunk overlapping [since, until], then filter rows."""
+    _require_numpy()
+    parts: Dict[str, list] = {name: [] for name in COLUMNS}
+    for path in sorted(glob.glob(os.path.join(directory, "*.npz"))):
+        name = os.path.basename(path)
+        if ".tmp" in name:
+            continue
+        try:
+            t0, t1 = (int(v) for v in name.split("_")[:2])
+        except ValueError:
+            continue
+        if (since is not None and t1 < since) or (until is not None and t0 > until):
+            continue
+        with np.load(path) as z:
+            for col in COLUMNS:
+                parts[col].append(z[col])
+    cols = {}
+    for col, (dtype, shape) in COLUMNS.items():
+        cols[col] = np.concatenate(parts[col]) if parts[col] else np.zeros((0,) + shape, dtype)
+    mask = np.ones(len(cols["ts"]), bool)
+    if since is not None:
+        mask &= cols["ts"] >= since
+    if until is not None:
+        mask &= cols["ts"] <= until
+    if cabinet is not None:
+        mask &= cols["cabinet"] == cabinet
+    if not mask.all():
+        cols = {k: v[mask] for k, v in cols.items()}
+    return cols
+
+
+def import_journal(journal_path: str, directory: str = DEFAULT_DIR, cabinet: int = 1,
+                   chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Backfill finished rounds from a spin journal (vectorised join of BEGIN and END records).
+    Rounds this cabinet already has in `directory` (written live by HistoryWriter, or by an
+    earlier import) are skipped, so importing is safe to repeat.
+    """
+    from spin_journal import BEGIN, END, JournalReader
+
+    with JournalReader(journal_path) as reader:
+        recs = reader.array()
+        begins = recs[recs["type"] == BEGIN]
+        ends = recs[recs["type"] == END]
+        if len(begins) == 0 or len(ends) == 0:
+            return 0
+        order = np.argsort(begins["round"], kind="stable")
+        begin_rounds = begins["round"][order]
+        idx = np.searchsorted(begin_rounds, ends["round"])
+        ok = (idx < len(begin_rounds)) & (begin_rounds[np.minimum(idx, len(begin_rounds) - 1)] == ends["round"])
+        ends, matched = ends[ok], begins[order][idx[ok]]
+        cols = {
+            "round": ends["round"].astype("<u8"), "ts": ends["ts"].astype("<f8"),
+            "cabinet": np.full(len(ends), cabinet, "<u2"), "kind": ends["kind"].astype("u1"),
+            "bet": matched["amount"].astype("<i4"), "payout": ends["amount"].astype("<i4"),
+            "targets": matched["targets"].copy(), "grid": ends["grid"].copy(),
+        }
+    have = load(directory, cabinet=cabinet)["round"]
+    if len(have):
+        fresh = ~np.isin(cols["round"], have)
+        cols = {k: v[fresh] for k, v in cols.items()}
+    for start in range(0, len(cols["ts"]), chunk_rows):
+        write_chunk(directory, {k: v[start:start + chunk_rows] for k, v in cols.items()})
+    return len(cols["ts"])
+
+
+def _bucket(ts: "np.ndarray", by: str) -> "np.ndarray":
+    """Local-time bucket start (epoch seconds) for each timestamp, at today's UTC offset."""
+    offset = time.localtime().tm_gmtoff
+    size = {"hour": 3600, "day": 86400}[by]
+    return ((ts + offset) // size) * size - offset
+
+
+def query_summary(cols: Dict[str, "np.ndarray"]) -> None:
+    n = len(cols["ts"])
+    if n == 0:
+        print("no rounds")
+        return
+    bet, paid = int(cols["bet"].sum()), int(cols["payout"].sum())
+    wins = cols["payout"] > 0
+    print(f"{n} rounds  {datetime.fromtimestamp(cols['ts'].min()):%Y-%m-%d %H:%M} .. "
+          f"{datetime.fromtimestamp(cols['ts'].max()):%Y-%m-%d %H:%M}")
+    print(f"bet {bet}  paid {paid}  RTP {paid / bet * 100.0 if bet else 0.0:.2f}%  "
+          f"hit rate {wins.mean() * 100.0:.2f}%  biggest {int(cols['payout'].max())}")
+    values, counts = np.unique(cols["payout"][wins], return_counts=True)
+    for v, c in zip(values, counts):
+        print(f"  payout {int(v):>5}: {int(c)}")
+
+
+def query_rtp(cols: Dict[str, "np.ndarray"], by: str) -> None:
+    if len(cols["ts"]) == 0:
+        print("no rounds")
+        return
+    # One int64 key per (bucket, cabinet): 1-D unique is far faster than unique over rows.
+    keys = _bucket(cols["ts"], by).astype("<i8") * 65536 + cols["cabinet"]
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.ravel()
+    spins = np.bincount(inverse)
+    bet = np.bincount(inverse, weights=cols["bet"])
+    paid = np.bincount(inverse, weights=cols["payout"])
+    fmt = "%Y-%m-%d %H:00" if by == "hour" else "%Y-%m-%d"
+    print(f"{by:<16} {'cabinet':>7} {'spins':>7} {'bet':>9} {'paid':>9} {'RTP %':>7}")
+    for key, n, b, p in zip(uniq, spins, bet, paid):
+        start, cab = divmod(int(key), 65536)
+        rtp = p / b * 100.0 if b else 0.0
+        print(f"{datetime.fromtimestamp(start).strftime(fmt):<16} {int(cab):>7} {int(n):>7} {int(b):>9} "
+              f"{int(p):>9} {rtp:>7.1f}")
+
+
+def query_symbols(cols: Dict[str, "np.ndarray"], row: str) -> None:
+    n = len(cols["ts"])
+    if n == 0:
+        print("no rounds")
+        return
+    grid = cols["grid"].reshape(-1, 3, 3)  # round, row (top/mid/bottom), reel (dev 2/3/4)
+    rows = {"top": [0], "mid": [1], "bottom": [2], "all": [0, 1, 2]}[row]
+    print(f"symbol frequency ({row} row{'s' if row == 'all' else ''}, {n} rounds)")
+    print(f"{'symbol':<10}" + "".join(f"{'reel ' + str(d):>14}" for d in (2, 3, 4)))
+    counts = [np.bincount(grid[:, rows, reel].ravel(), minlength=NO_SYMBOL + 1) for reel in range(3)]
+    totals = [c[:len(SYMBOL_NAMES)].sum() or 1 for c in counts]
+    for sym, name in enumerate(SYMBOL_NAMES):
+        print(f"{name:<10}" + "".join(f"{int(c[sym]):>7} {c[sym] / t * 100.0:>5.1f}%" for c, t in zip(counts, totals)))
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Query the columnar spin history")
+    p.add_argument("query", choices=["summary", "rtp", "symbols", "import-journal"])
+    p.add_argument("args", nargs="*", help="import-journal: <spin_journal.bin>")
+    p.add_argument("--dir", default=os.environ.get("SMG_HISTORY", DEFAULT_DIR), help="History directory")
+    p.add_argument("--since", help="Start time (ISO date/time or epoch seconds)")
+    p.add_argument("--until", help="End time (ISO date/time or epoch seconds)")
+    p.add_argument("--cabinet", type=int, help="Only this cabinet (import-journal: cabinet id to record)")
+    p.add_argument("--by", choices=["hour", "day"], default="hour", help="rtp bucket size (default hour)")
+    p.add_argument("--row", choices=["top", "mid", "bottom", "all"], default="mid",
+                   help="symbols: which row(s) to count (default mid, the pay line)")
+    ns = p.parse_args(argv)
+    if np is None:
+        print("numpy is required: pip install numpy", file=sys.stderr)
+        return 1
+
+    if ns.query == "import-journal":
+        if len(ns.args) != 1:
+            p.error("import-journal requires 1 arg: <spin_journal.bin>")
+        n = import_journal(ns.args[0], ns.dir, ns.cabinet or 1)
+        print(f"imported {n} rounds into {ns.dir}")
+        return 0
+
+    t0 = time.perf_counter()
+    cols = load(ns.dir, _parse_time(ns.since), _parse_time(ns.until), ns.cabinet)
+    loaded = time.perf_counter()
+    if ns.query == "summary":
+        query_summary(cols)
+    elif ns.query == "rtp":
+        query_rtp(cols, ns.by)
+    else:
+        query_symbols(cols, ns.row)
+    done = time.perf_counter()
+    print(f"\n[{len(cols['ts'])} rounds: load {(loaded - t0) * 1000:.0f} ms, query {(done - loaded) * 1000:.0f} ms]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Append-only binary spin journal for the jackpot server.
+
+Every round is written as a BEGIN record (round id, tap correlation id, targets, bet,
+credits after the bet) and an END record (grid, payout, credits after the payout).
+Console credit changes are journalled as CREDITS records. A round that has a BEGIN but
+no END is one the server crashed in: recover() finds those on startup. Console bets go
+straight back into `credits` and get their REFUND at once. Card-tap bets were taken by the
+credit service, so those rounds stay open (SpinJournal.owed) until the gateway confirms it
+has credited the card; the server then journals the REFUND with refund().
+
+Records are fixed-size (RECORD_SIZE bytes, little endian, CRC32-checked), so a torn
+tail from a crash is detected and cut off, and analytics can mmap the file and read
+it as an array (JournalReader).
+
+Appends never wait for the disk. A committer thread writes whatever has accumulated
+and fsyncs once per batch, at most every `commit_interval` seconds. A crash loses at
+most that window, and a spin never pays for an fsync.
+
+    python spin_journal.py spin_journal.bin            # summary
+    python spin_journal.py spin_journal.bin --tail 10  # last 10 rounds
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+MAGIC = 0xD5
+BEGIN, END, REFUND, CREDITS = 1, 2, 3, 4
+TYPE_NAMES = {BEGIN: "BEGIN", END: "END", REFUND: "REFUND", CREDITS: "CREDITS"}
+KIND_CONSOLE, KIND_SLOT = 0, 1  # who paid the bet: jackpot's own `credits`, or the card's credit service
+NO_SYMBOL = 0xFF
+
+# magic, type, kind, pad, round id, timestamp, cid, targets (dev 2,3,4), grid (row-major 3x3),
+# amount (bet / payout / refund), credits balance after this record, crc32 of everything before it
+_FORMAT = "<BBBxQd10s3s9sii2xI"
+RECORD_SIZE = struct.calcsize(_FORMAT)  # 56
+_BODY = struct.Struct(_FORMAT[:-1])
+_RECORD = struct.Struct(_FORMAT)
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([
+        ("magic", "u1"), ("type", "u1"), ("kind", "u1"), ("_pad", "u1"), ("round", "<u8"), ("ts", "<f8"),
+        ("cid", "S10"), ("targets", "u1", (3,)), ("grid", "u1", (9,)), ("amount", "<i4"), ("credits", "<i4"),
+        ("_pad2", "u1", (2,)), ("crc", "<u4"),
+    ])
+
+
+def pack(rtype: int, round_id: int, kind: int = KIND_CONSOLE, cid: Optional[str] = None,
+         targets: Optional[List[int]] = None, grid: Optional[List[List[int]]] = None,
+         amount: int = 0, credits: int = 0, ts: Optional[float] = None) -> bytes:
+    t = bytes(NO_SYMBOL if v is None else v for v in (targets or [None] * 3))
+    g = bytes(v for row in grid for v in row) if grid else bytes([NO_SYMBOL] * 9)
+    body = _BODY.pack(MAGIC, rtype, kind, round_id, time.time() if ts is None else ts,
+                      (cid or "").encode()[:10], t, g, amount, credits)
+    return body + struct.pack("<I", zlib.crc32(body))
+
+
+def unpack(buf, offset: int = 0) -> Optional[dict]:
+    """One record as a dict, or None if it is torn/corrupt."""
+    fields = _RECORD.unpack_from(buf, offset)
+    magic, rtype, kind, round_id, ts, cid, targets, grid, amount, credits, crc = fields
+    if magic != MAGIC or zlib.crc32(bytes(buf[offset:offset + RECORD_SIZE - 4])) != crc:
+        return None
+    return {"type": rtype, "kind": kind, "round": round_id, "ts": ts, "cid": cid.rstrip(b"\0").decode() or None,
+            "targets": [None if v == NO_SYMBOL else v for v in targets],
+            "grid": None if grid[0] == NO_SYMBOL else [list(grid[i:i + 3]) for i in (0, 3, 6)],
+            "amount": amount, "credits": credits}
+
+
+class JournalReader:
+    """Memory-mapped, read-only view of a journal; stops at the first torn or corrupt record."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.count = 0
+        for _ in self.records():
+            self.count += 1
+
+    def close(self) -> None:
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # an array() view is still alive; the map goes away with it
+        self._f.close()
+
+    def __enter__(self) -> "JournalReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def valid_bytes(self) -> int:
+        return self.count * RECORD_SIZE
+
+    def records(self) -> Iterator[dict]:
+        if self._mm is None:
+            return
+        for off in range(0, len(self._mm) - RECORD_SIZE + 1, RECORD_SIZE):
+            rec = unpack(self._mm, off)
+            if rec is None:
+                return
+            yield rec
+
+    def array(self):
+        """All valid records as a NumPy structured array backed by the mmap (no copy)."""
+        if np is None:
+            raise RuntimeError("numpy is required for JournalReader.array()")
+        if self._mm is None:
+            return np.zeros(0, RECORD_DTYPE)
+        return np.frombuffer(self._mm, RECORD_DTYPE, count=self.count)
+
+    def rounds(self) -> Iterator[dict]:
+        """BEGIN joined with its END/REFUND as rounds complete, then unfinished ones; 'status' is done, refunded or open."""
+        open_rounds: Dict[int, dict] = {}
+        for rec in self.records():
+            if rec["type"] == BEGIN:
+                open_rounds[rec["round"]] = {"round": rec["round"], "kind": rec["kind"], "cid": rec["cid"],
+                                             "started": rec["ts"], "targets": rec["targets"], "bet": rec["amount"],
+                                             "status": "open"}
+            elif rec["type"] in (END, REFUND) and rec["round"] in open_rounds:
+                r = open_rounds.pop(rec["round"])
+                if rec["type"] == END:
+                    r.update(status="done", ended=rec["ts"], grid=rec["grid"], payout=rec["amount"])
+                else:
+                    r.update(status="refunded", ended=rec["ts"], refund=rec["amount"])
+                yield r
+        yield from open_rounds.values()
+
+
+class SpinJournal:
+    """Appender with group-commit fsync. Use recover() once at startup before appending."""
+
+    def __init__(self, path: str, commit_interval: float = 0.05):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.next_round = 1
+        self.credits: Optional[int] = None  # last journalled balance, set by recover()
+        self.owed: List[dict] = []  # card-tap rounds a crash left open, set by recover(); see refund()
+        self._pending: List[bytes] = []
+        self._appended = 0   # records handed to append() so far
+        self._committed = 0  # of those, how many are written and fsynced
+        self._cond = threading.Condition()
+        self._closed = False
+        self._fd: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"records": 0, "commits": 0}
+
+    def recover(self) -> List[dict]:
+        """
+        Read the existing journal, drop a torn tail, restore the round counter and credits
+        balance, and refund console rounds that never finished. Returns the refunded rounds;
+        unfinished card-tap rounds are left open and listed in `owed`.
+        """
+        refunds: List[dict] = []
+        valid = 0
+        if os.path.isfile(self.path):
+            with JournalReader(self.path) as reader:
+                valid = reader.valid_bytes
+                for rec in reader.records():
+                    self.next_round = max(self.next_round, rec["round"] + 1)
+                    self.credits = rec["credits"]  # every record carries the balance after it
+                unfinished = [r for r in reader.rounds() if r["status"] == "open"]
+            refunds = [r for r in unfinished if r["kind"] == KIND_CONSOLE]
+            self.owed = [r for r in unfinished if r["kind"] != KIND_CONSOLE]
+            if os.path.getsize(self.path) != valid:
+                print(f"[JOURNAL] cutting torn tail of {self.path} at {valid} bytes")
+                with open(self.path, "r+b") as f:
+                    f.truncate(valid)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._thread = threading.Thread(target=self._commit_loop, name="spin-journal", daemon=True)
+        self._thread.start()
+
+        for r in refunds:
+            self.credits = (self.credits or 0) + r["bet"]
+            self.append(REFUND, r["round"], kind=r["kind"], cid=r["cid"], amount=r["bet"], credits=self.credits)
+        if refunds:
+            self.sync()
+        return refunds
+
+    def refund(self, round_id: int, kind: int, cid: Optional[str], amount: int, credits: int) -> None:
+        """Close a round with a REFUND (voided, or an owed card refund the gateway has now paid)."""
+        self.append(REFUND, round_id, kind=kind, cid=cid, amount=amount, credits=credits)
+        self.owed = [r for r in self.owed if r["round"] != round_id]
+
+    def new_round(self) -> int:
+        with self._cond:
+            round_id = self.next_round
+            self.next_round += 1
+        return round_id
+
+    def append(self, rtype: int, round_id: int = 0, **fields) -> None:
+        record = pack(rtype, round_id, **fields)
+        with self._cond:
+            self._pending.append(record)
+            self._appended += 1
+            self.stats["records"] += 1
+            self._cond.notify()
+
+    def begin(self, round_id: int, kind: int, cid: Optional[str], targets: Dict[int, int], devices: List[int],
+              bet: int, credits: int) -> None:
+        self.append(BEGIN, round_id, kind=kind, cid=cid, targets=[targets.get(d) for d in devices],
+                    amount=bet, credits=credits)
+
+    def end(self, round_id: int, kind: int, cid: Optional[str], grid: List[List[int]], payout: int,
+            credits: int) -> None:
+        self.append(END, round_id, kind=kind, cid=cid, grid=grid, amount=payout, credits=credits)
+
+    def sync(self, timeout: float = 5.0) -> bool:
+        """Block until everything appended so far is on disk."""
+        with self._cond:
+            target = self._appended
+            self._cond.notify()
+            return self._cond.wait_for(lambda: self._committed >= target or self._closed, timeout=timeout)
+
+    def close(self) -> None:
+        self.sync()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _commit_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if self._closed and not self._pending:
+                    return
+            # Let a burst of appends (BEGIN, credits, END of back-to-back rounds) share one fsync.
+            time.sleep(self.commit_interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                upto = self._appended
+            if batch:
+                os.write(self._fd, b"".join(batch))
+                os.fsync(self._fd)
+            with self._cond:
+                self._committed = upto
+                self.stats["commits"] += 1
+                self._cond.notify_all()
+
+
+def _fmt_grid(grid: Optional[List[List[int]]]) -> str:
+    return "/".join("".join(str(v) for v in row) for row in grid) if grid else "-"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Summarise a jackpot spin journal")
+    p.add_argument("journal")
+    p.add_argument("--tail", type=int, default=0, help="Print the last N rounds")
+    ns = p.parse_args(argv)
+
+    with JournalReader(ns.journal) as reader:
+        rounds = list(reader.rounds())
+        total = os.path.getsize(ns.journal)
+        print(f"{reader.count} records ({total - reader.valid_bytes} torn bytes at end)")
+    done = [r for r in rounds if r["status"] == "done"]
+    bets = sum(r["bet"] for r in done)
+    paid = sum(r["payout"] for r in done)
+    print(f"{len(done)} rounds done, {sum(r['status'] == 'refunded' for r in rounds)} refunded, "
+          f"{sum(r['status'] == 'open' for r in rounds)} open (card refunds still owed, or in progress)")
+    if bets:
+        print(f"bets {bets}  payouts {paid}  RTP {paid / bets * 100.0:.1f}%")
+    for r in rounds[-ns.tail:] if ns.tail else []:
+        kind = "slot" if r["kind"] == KIND_SLOT else "console"
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["started"]))
+        amount = f"refund={r['refund']}" if r["status"] == "refunded" else f"payout={r.get('payout', '-')}"
+        print(f"#{r['round']:<7} {started}  {kind:<7} cid={r['cid'] or '-':<10}  targets={r['targets']}  "
+              f"{r['status']:<8} grid={_fmt_grid(r.get('grid'))}  {amount}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Opt-in per-spin latency waterfall for the gateway and the jackpot server.
+
+Each spin gets a Waterfall keyed by the tap's correlation id (see instrument.py). Code marks
+phases as they finish (serial parse, HTTP deduct, socket send, targets sent, each reel
+report, payout computed, ...), and the finished waterfall is appended to a JSONL file:
+
+    {"cid": "3f2a9c01de", "service": "jackpot", "t0": 1717000000.123,
+     "phases": [["recv", 0.0], ["targets_sent", 1.9], ["report_dev2", 2380.4], ...]}
+
+Offsets are milliseconds from t0 (wall clock), so files from the gateway and the jackpot
+server (same PC) can be merged per cid by spin_report.py.
+
+Enable with environment variables:
+  SMG_PROFILE=spins_profile.jsonl   write waterfalls
+  SMG_PROFILE_SAMPLE=5              also sample every thread's stack every 5 ms and write
+                                    folded stacks (flamegraph.pl / speedscope format) to
+                                    <SMG_PROFILE>.<service>.folded at exit
+
+Disabled, start() hands back a shared no-op waterfall.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional, Tuple
+
+_enabled = False
+_service = "app"
+_lock = threading.Lock()
+_out = None
+_sampler: Optional["Sampler"] = None
+
+
+def configure(service: str, path: Optional[str] = None, sample_ms: float = 0.0) -> None:
+    global _enabled, _service, _out, _sampler
+    _service = service
+    if not path:
+        return
+    _out = open(path, "a", buffering=1)
+    _enabled = True
+    print(f"[PROFILE] writing spin waterfalls to {path}")
+    if sample_ms > 0:
+        _sampler = Sampler(sample_ms / 1000.0, f"{path}.{service}.folded").start()
+        atexit.register(_sampler.stop)
+
+
+def configure_from_env(service: str) -> None:
+    configure(service, os.environ.get("SMG_PROFILE") or None,
+              float(os.environ.get("SMG_PROFILE_SAMPLE") or 0.0))
+
+
+class Waterfall:
+    __slots__ = ("cid", "t0", "_p0", "phases", "_done")
+
+    def __init__(self, cid: Optional[str], t0: Optional[float] = None, perf0: Optional[float] = None):
+        self.cid = cid
+        # t0/perf0 let a caller back-date the start (e.g. to when the serial line arrived).
+        self.t0 = time.time() if t0 is None else t0
+        self._p0 = time.perf_counter() if perf0 is None else perf0
+        self.phases: List[Tuple[str, float]] = []
+        self._done = False
+
+    def mark(self, phase: str) -> None:
+        self.phases.append((phase, round((time.perf_counter() - self._p0) * 1000.0, 3)))
+
+    def finish(self, **attrs) -> None:
+        if self._done:
+            return
+        self._done = True
+        record = {"cid": self.cid, "service": _service, "t0": self.t0,
+                  "phases": [list(p) for p in self.phases], **attrs}
+        line = json.dumps(record)
+        with _lock:
+            _out.write(line + "\n")
+
+
+class _NullWaterfall:
+    __slots__ = ()
+    cid = None
+
+    def mark(self, phase: str) -> None:
+        pass
+
+    def finish(self, **attrs) -> None:
+        pass
+
+
+NULL = _NullWaterfall()
+
+
+def start(cid: Optional[str], t0: Optional[float] = None, perf0: Optional[float] = None):
+    if not _enabled:
+        return NULL
+    return Waterfall(cid, t0, perf0)
+
+
+class Sampler:
+    """Stack sampler: counts folded stacks of every other thread at a fixed interval."""
+
+    def __init__(self, interval: float, path: str):
+        self.interval = interval
+        self.path = path
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                parts.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        with open(self.path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"[PROFILE] {self.samples} stack samples -> {self.path}")
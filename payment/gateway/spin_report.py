@@ -0,0 +1,127 @@
+"""
+Aggregate spin waterfalls written by spin_profile.py.
+
+Records from the gateway and the jackpot server with the same cid are merged into one
+timeline (both run on the same PC, so wall clocks agree). For every phase it prints how long
+the phase took (time since the previous mark in that spin) and when it happened relative to
+the card tap, as percentiles over all spins.
+
+    python spin_report.py gateway.jsonl jackpot.jsonl
+    python spin_report.py spins.jsonl --show 5          # also draw the 5 slowest spins
+    python spin_report.py spins.jsonl --spin 3f2a9c01de
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+BAR_WIDTH = 50
+
+Timeline = List[Tuple[str, float]]  # (service/phase, ms since the spin's first timestamp)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def load(paths: List[str]) -> Dict[str, Timeline]:
+    """cid -> merged timeline, sorted by time."""
+    events: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+    starts: Dict[str, float] = {}
+    for path in paths:
+        with open(path) as f:
+            for n, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    print(f"[WARN] {path}:{n}: not JSON, skipped", file=sys.stderr)
+                    continue
+                cid = rec.get("cid") or f"{path}:{n}"
+                t0 = float(rec["t0"])
+                starts[cid] = min(starts.get(cid, t0), t0)
+                events[cid].append((t0, f"{rec.get('service', '?')}/start"))
+                for phase, at_ms in rec.get("phases", []):
+                    events[cid].append((t0 + at_ms / 1000.0, f"{rec.get('service', '?')}/{phase}"))
+    spins = {}
+    for cid, evs in events.items():
+        evs.sort()
+        first = starts[cid]
+        # A service's "start" only matters when it is not the first thing in the spin.
+        spins[cid] = [(name, (ts - first) * 1000.0) for i, (ts, name) in enumerate(evs)
+                      if i > 0 or not name.endswith("/start")]
+    return spins
+
+
+def summarize(spins: Dict[str, Timeline]) -> List[Tuple[str, int, List[float], List[float]]]:
+    """Per phase: (name, count, durations, offsets), phases ordered by median offset."""
+    durations: Dict[str, List[float]] = defaultdict(list)
+    offsets: Dict[str, List[float]] = defaultdict(list)
+    for timeline in spins.values():
+        prev = 0.0
+        for name, at in timeline:
+            durations[name].append(at - prev)
+            offsets[name].append(at)
+            prev = at
+    rows = [(name, len(offsets[name]), durations[name], offsets[name]) for name in offsets]
+    rows.sort(key=lambda r: percentile(r[3], 50))
+    return rows
+
+
+def print_summary(spins: Dict[str, Timeline]) -> None:
+    totals = [t[-1][1] for t in spins.values() if t]
+    print(f"{len(spins)} spins   total ms: p50 {percentile(totals, 50):.0f}  p90 {percentile(totals, 90):.0f}  "
+          f"p99 {percentile(totals, 99):.0f}  max {max(totals) if totals else 0:.0f}")
+    print()
+    print(f"{'phase':<28}{'n':>5}   {'took ms p50':>11}{'p90':>8}{'p99':>8}{'max':>8}   {'at ms p50':>9}{'p90':>8}")
+    for name, n, durs, offs in summarize(spins):
+        print(f"{name:<28}{n:>5}   {percentile(durs, 50):>11.1f}{percentile(durs, 90):>8.1f}"
+              f"{percentile(durs, 99):>8.1f}{max(durs):>8.1f}   {percentile(offs, 50):>9.1f}{percentile(offs, 90):>8.1f}")
+
+
+def print_waterfall(cid: str, timeline: Timeline) -> None:
+    total = timeline[-1][1] if timeline else 0.0
+    print(f"\nspin {cid}  ({total:.0f} ms)")
+    scale = BAR_WIDTH / total if total > 0 else 0.0
+    prev = 0.0
+    for name, at in timeline:
+        lead = int(prev * scale)
+        bar = max(1, int(at * scale) - lead)
+        print(f"  {name:<28}{' ' * lead}{'#' * bar:<{BAR_WIDTH - lead}} {at - prev:8.1f} ms  @ {at:.0f}")
+        prev = at
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Per-phase latency report from SMG_PROFILE waterfall files")
+    p.add_argument("files", nargs="+", help="Waterfall JSONL files (gateway and/or jackpot)")
+    p.add_argument("--show", type=int, default=0, help="Draw the N slowest spins")
+    p.add_argument("--spin", help="Draw the spin with this correlation id")
+    ns = p.parse_args(argv)
+
+    spins = load(ns.files)
+    if not spins:
+        print("no spins found")
+        return 1
+    if ns.spin:
+        if ns.spin not in spins:
+            print(f"spin {ns.spin} not found")
+            return 1
+        print_waterfall(ns.spin, spins[ns.spin])
+        return 0
+    print_summary(spins)
+    slowest = sorted(spins.items(), key=lambda kv: kv[1][-1][1] if kv[1] else 0.0, reverse=True)
+    for cid, timeline in slowest[:ns.show]:
+        print_waterfall(cid, timeline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Statistical checks for reel_monitor.py. No hardware needed:
+
+    python -m unittest test_reel_monitor      # from payment/gateway
+"""
+
+import contextlib
+import io
+import random
+import unittest
+
+from reel_monitor import CHI2_LIMIT, SYMBOL_ODDS, ReelMonitor
+
+
+def feed(monitor: ReelMonitor, rng: random.Random, odds, n: int, dev: int = 2, skip: int = 0):
+    """Report `n` top-row symbols drawn from `odds`; returns the rolling chi-square after each one past `skip`."""
+    symbols = range(len(odds))
+    scores = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, top in enumerate(rng.choices(symbols, odds, k=n)):
+            monitor.observe(dev, None, top, 0, 0)
+            if i >= skip:
+                scores.append(monitor.reels[dev].chi2)
+    return scores
+
+
+class NullDistributionTest(unittest.TestCase):
+    """A fair reel's rolling score should follow chi-square with 5 degrees of freedom."""
+
+    def test_steady_state_matches_chi2_5(self):
+        scores = feed(ReelMonitor([2]), random.Random(1), SYMBOL_ODDS, 100_000, skip=3000)
+        mean = sum(scores) / len(scores)
+        over = sum(s > CHI2_LIMIT for s in scores) / len(scores)
+        self.assertAlmostEqual(mean, 5.0, delta=0.5)
+        # p = 0.001 per report; consecutive scores are correlated, so allow a wide band around it.
+        self.assertLess(over, 0.004)
+        self.assertGreater(sorted(scores)[int(0.999 * len(scores))], 14.0)
+
+    def test_warm_up_is_not_inflated(self):
+        rng = random.Random(2)
+        at_150 = [feed(ReelMonitor([2]), rng, SYMBOL_ODDS, 150)[-1] for _ in range(400)]
+        self.assertAlmostEqual(sum(at_150) / len(at_150), 5.0, delta=0.6)
+
+
+class DriftTest(unittest.TestCase):
+    def test_biased_reel_alerts(self):
+        alerts = []
+        monitor = ReelMonitor([2], on_alert=lambda dev, kind, score: alerts.append(kind))
+        rng = random.Random(3)
+        feed(monitor, rng, SYMBOL_ODDS, 2000)
+        feed(monitor, rng, (15, 15, 16, 16, 13, 25), 600)  # sevens far too often
+        self.assertIn("distribution", alerts)
+
+    def test_target_mismatch_alerts(self):
+        alerts = []
+        monitor = ReelMonitor([2], on_alert=lambda dev, kind, score: alerts.append(kind))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(100):
+                monitor.observe(2, 3, 0, 3 if i % 4 else 4, 0)
+        self.assertEqual(monitor.reels[2].mismatches, 25)
+        self.assertIn("target_mismatch", alerts)
+
+
+if __name__ == "__main__":
+    unittest.main()
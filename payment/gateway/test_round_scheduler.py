@@ -0,0 +1,91 @@
+"""
+Ordering and back-pressure checks for round_scheduler.py. No hardware needed:
+
+    python -m unittest test_round_scheduler      # from payment/gateway
+"""
+
+import contextlib
+import io
+import threading
+import time
+import unittest
+
+from round_scheduler import RoundScheduler
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self._quiet = contextlib.redirect_stdout(io.StringIO())
+        self._quiet.__enter__()
+        self.schedulers = []
+
+    def tearDown(self):
+        for s in self.schedulers:
+            s.close(timeout=5)
+        self._quiet.__exit__(None, None, None)
+
+    def scheduler(self, **kw) -> RoundScheduler:
+        s = RoundScheduler(**kw)
+        self.schedulers.append(s)
+        return s
+
+    def test_runs_jobs_in_submit_order(self):
+        s = self.scheduler(max_queue=10)
+        ran = []
+        gate = threading.Event()
+        first = s.submit("console", lambda: gate.wait(5))
+        jobs = [s.submit("slot", lambda i=i: ran.append(i), cid=f"t{i}") for i in range(5)]
+        self.assertEqual([s.position(j) for j in jobs], [2, 3, 4, 5, 6])
+        gate.set()
+        for job in [first] + jobs:
+            self.assertTrue(job.wait(5))
+        self.assertEqual(ran, [0, 1, 2, 3, 4])
+        self.assertEqual(s.position(jobs[-1]), 0)
+
+    def test_rejects_when_full(self):
+        s = self.scheduler(max_queue=2)
+        gate = threading.Event()
+        running = s.submit("console", lambda: gate.wait(5))
+        deadline = time.monotonic() + 5
+        while s.depth and time.monotonic() < deadline:  # wait for the worker to take it
+            time.sleep(0.01)
+        waiting = [s.submit("slot", lambda: None) for _ in range(2)]
+        self.assertIsNone(s.submit("slot", lambda: None))
+        self.assertEqual(s.stats["rejected"], 1)
+        gate.set()
+        for job in [running] + waiting:
+            self.assertTrue(job.wait(5))
+        self.assertEqual(s.stats["run"], 3)
+
+    def test_job_errors_are_kept_on_the_job(self):
+        s = self.scheduler()
+        job = s.submit("admin", lambda: 1 / 0)
+        self.assertTrue(job.wait(5))
+        self.assertIsInstance(job.error, ZeroDivisionError)
+        self.assertTrue(s.submit("admin", lambda: "next").wait(5))
+
+    def test_waits_for_busy_reels_before_next_round(self):
+        free_at = [0.0]
+        s = self.scheduler(reels_busy_for=lambda: free_at[0] - time.monotonic())
+
+        def round_that_leaves_reels_busy():
+            free_at[0] = time.monotonic() + 0.4
+            return time.monotonic()
+
+        first = s.submit("slot", round_that_leaves_reels_busy)
+        second = s.submit("slot", time.monotonic)
+        self.assertTrue(second.wait(5))
+        self.assertGreaterEqual(second.result - first.result, 0.38)
+
+    def test_wake_rechecks_busy_reels_early(self):
+        free_at = [time.monotonic() + 30]
+        s = self.scheduler(reels_busy_for=lambda: free_at[0] - time.monotonic())
+        job = s.submit("slot", lambda: None)
+        self.assertFalse(job.wait(0.2))
+        free_at[0] = 0.0
+        s.wake()
+        self.assertTrue(job.wait(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Crash-recovery checks for spin_journal.py. No hardware needed:
+
+    python -m unittest test_spin_journal      # from payment/gateway
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from spin_journal import CREDITS, KIND_CONSOLE, KIND_SLOT, RECORD_SIZE, JournalReader, SpinJournal
+
+DEVICES = [2, 3, 4]
+TARGETS = {2: 1, 3: 1, 4: 1}
+GRID = [[1, 1, 1], [2, 2, 2], [3, 3, 3]]
+
+
+class RecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "spin_journal.bin")
+        self._quiet = contextlib.redirect_stdout(io.StringIO())
+        self._quiet.__enter__()
+
+    def tearDown(self):
+        self._quiet.__exit__(None, None, None)
+        shutil.rmtree(self.dir)
+
+    def open(self) -> SpinJournal:
+        journal = SpinJournal(self.path, commit_interval=0.001)
+        self.refunds = journal.recover()
+        self.addCleanup(journal.close)
+        return journal
+
+    def crash(self, journal: SpinJournal) -> None:
+        """Stop appending without closing cleanly, as a killed server would."""
+        journal.sync()
+
+    def rounds(self) -> dict:
+        with JournalReader(self.path) as reader:
+            return {r["round"]: r for r in reader.rounds()}
+
+    def test_restores_credits_and_round_counter(self):
+        j = self.open()
+        j.append(CREDITS, credits=100)
+        r = j.new_round()
+        j.begin(r, KIND_CONSOLE, None, TARGETS, DEVICES, 10, 90)
+        j.end(r, KIND_CONSOLE, None, GRID, 25, 115)
+        self.crash(j)
+
+        j2 = self.open()
+        self.assertEqual(j2.credits, 115)
+        self.assertEqual(j2.new_round(), r + 1)
+        self.assertEqual(self.refunds, [])
+
+    def test_torn_tail_is_cut_off(self):
+        j = self.open()
+        j.append(CREDITS, credits=100)
+        j.append(CREDITS, credits=70)
+        self.crash(j)
+        with open(self.path, "ab") as f:
+            f.write(b"\xd5\x04" + b"\0" * 20)  # half a record
+        with open(self.path, "r+b") as f:
+            f.seek(RECORD_SIZE + 8)
+            f.write(b"\xff")  # and a corrupt one before it
+
+        j2 = self.open()
+        self.assertEqual(os.path.getsize(self.path), RECORD_SIZE)
+        self.assertEqual(j2.credits, 100)
+
+    def test_console_round_is_refunded_to_credits(self):
+        j = self.open()
+        j.append(CREDITS, credits=100)
+        r = j.new_round()
+        j.begin(r, KIND_CONSOLE, None, TARGETS, DEVICES, 10, 90)
+        self.crash(j)
+
+        j2 = self.open()
+        self.assertEqual([x["round"] for x in self.refunds], [r])
+        self.assertEqual(j2.credits, 100)
+        self.assertEqual(j2.owed, [])
+        j2.sync()
+        self.assertEqual(self.rounds()[r]["status"], "refunded")
+
+    def test_card_round_stays_open_until_refunded(self):
+        j = self.open()
+        j.append(CREDITS, credits=50)
+        r = j.new_round()
+        j.begin(r, KIND_SLOT, "tap1", TARGETS, DEVICES, 10, 50)
+        self.crash(j)
+
+        j2 = self.open()
+        self.assertEqual(self.refunds, [])
+        self.assertEqual([(x["round"], x["cid"], x["bet"]) for x in j2.owed], [(r, "tap1", 10)])
+        self.assertEqual(j2.credits, 50)  # the card paid, not the console balance
+        self.crash(j2)
+        self.assertEqual(self.rounds()[r]["status"], "open")
+
+        # Still owed after another restart; closed once the gateway has paid it.
+        j3 = self.open()
+        self.assertEqual([x["round"] for x in j3.owed], [r])
+        j3.refund(r, KIND_SLOT, "tap1", 10, j3.credits)
+        self.assertEqual(j3.owed, [])
+        j3.sync()
+        self.assertEqual(self.rounds()[r]["status"], "refunded")
+        self.assertEqual(self.open().owed, [])
+
+    def test_sync_waits_for_the_fsync(self):
+        j = self.open()
+        in_fsync, synced = threading.Event(), []
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            in_fsync.set()
+            time.sleep(0.2)
+            real_fsync(fd)
+            synced.append(fd)
+
+        with mock.patch("os.fsync", slow_fsync):
+            j.append(CREDITS, credits=100)
+            self.assertTrue(in_fsync.wait(2))  # batch taken, nothing left pending
+            self.assertTrue(j.sync())
+            self.assertEqual(len(synced), 1)
+        self.assertEqual(os.path.getsize(self.path), RECORD_SIZE)
+
+
+if __name__ == "__main__":
+    unittest.main()
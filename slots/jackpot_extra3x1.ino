@@ -22,6 +22,14 @@ IPAddress gateway(10, 102, 150, 31);
 IPAddress subnet(255, 255, 255, 0);
 WiFiClient client;
 
+// The server pings an idle reel (0xFE) every second. If nothing at all arrives for this long
+// the server is gone (or the link is half-open), so drop the socket and reconnect.
+const unsigned long SERVER_SILENCE_MS = 15000;
+const unsigned long RECONNECT_MIN_MS = 500;
+const unsigned long RECONNECT_MAX_MS = 16000;
+unsigned long lastRxMs = 0;
+unsigned long reconnectDelayMs = RECONNECT_MIN_MS;
+
 // ---------------- SLOT MACHINE ----------------
 int topIndex, midIndex, bottomIndex;
 int targetIndex;
@@ -227,16 +235,28 @@ void loop() {
     if (client.connect(serverIP, port)) {
       uint8_t hdr[2] = { 0xFD, (uint8_t)devNum };
       client.write(hdr, 2);
+      lastRxMs = millis();
+      reconnectDelayMs = RECONNECT_MIN_MS;
       SerialUSB.println("Connecting to server.");
     } else {
+      // Exponential backoff with jitter so the reels don't all hammer a restarting server.
       SerialUSB.println("Connection to server failed.");
+      delay(reconnectDelayMs / 2 + random(0, reconnectDelayMs / 2));
+      reconnectDelayMs = min(reconnectDelayMs * 2, RECONNECT_MAX_MS);
       return;
     }
   }
 
+  if (!client.available() && millis() - lastRxMs > SERVER_SILENCE_MS) {
+    SerialUSB.println("Server silent, reconnecting.");
+    client.stop();
+    return;
+  }
+
   // Handle messages from server
   if (client.available()) {
     int cmd = client.read();
+    lastRxMs = millis();
     SerialUSB.println(cmd);
     if (cmd == 0xFE) {
       // handshake start
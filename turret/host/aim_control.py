@@ -0,0 +1,302 @@
+"""
+Closed-loop pan/tilt controller for the face tracker, plus an offline replay harness.
+
+PanTiltController turns face positions into AB step commands with per-axis PID
+gains, a pixel deadband, velocity feed-forward and a minimum interval between
+commands. Face velocity is estimated in "world" pixels (image position plus the
+motion we have already commanded), so the turret's own movement doesn't show up
+as target motion.
+
+Replay a recorded trajectory (CSV with t,x,y[,w,h] face centres in world pixels,
+as written by `stepper_cli.py track --log-trajectory`) and score it:
+  python aim_control.py traj.csv --kp 0.8 --kd 0.05 --deadband 8
+  python aim_control.py --synthetic step
+"""
+
+import argparse
+import csv
+import math
+from typing import List, Optional, Tuple
+
+Point = Tuple[float, float]
+
+
+class AxisPID:
+    def __init__(self, kp: float = 1.0, ki: float = 0.0, kd: float = 0.0, i_limit: float = 200.0):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.i_limit = i_limit
+        self.integral = 0.0
+        self._prev_err: Optional[float] = None
+
+    def reset(self) -> None:
+        self.integral = 0.0
+        self._prev_err = None
+
+    def update(self, err: float, dt: float) -> float:
+        """Returns the control effort in pixels for this axis."""
+        deriv = 0.0
+        if dt > 0:
+            self.integral = max(-self.i_limit, min(self.i_limit, self.integral + err * dt))
+            if self._prev_err is not None:
+                deriv = (err - self._prev_err) / dt
+        self._prev_err = err
+        return self.kp * err + self.ki * self.integral + self.kd * deriv
+
+
+class PanTiltController:
+    def __init__(self, step_scale: float = 0.05, max_step: int = 25, kp: float = 1.0, ki: float = 0.0,
+                 kd: float = 0.0, deadband: float = 6.0, feed_forward: float = 0.0, min_interval: float = 0.0,
+                 invert_x: bool = False, invert_y: bool = False, vel_alpha: float = 0.3):
+        """
+        step_scale: steps per pixel of effort; max_step: clamp per AB command
+        deadband: pixel error below which an axis is considered on target
+        feed_forward: seconds of lead applied to the estimated face velocity
+        min_interval: minimum seconds between issued commands (rate limit)
+        """
+        self.step_scale = step_scale
+        self.max_step = max_step
+        self.deadband = deadband
+        self.feed_forward = feed_forward
+        self.min_interval = min_interval
+        self.invert_x = invert_x
+        self.invert_y = invert_y
+        self.vel_alpha = vel_alpha
+        self.pid_x = AxisPID(kp, ki, kd)
+        self.pid_y = AxisPID(kp, ki, kd)
+        self.commands = 0
+        self.offset: List[float] = [0.0, 0.0]  # pixels of motion already commanded
+        self.velocity: List[float] = [0.0, 0.0]
+        self._last_t: Optional[float] = None
+        self._last_world: Optional[Point] = None
+        self._last_world_t: Optional[float] = None
+        self._last_cmd_t: Optional[float] = None
+
+    def reset(self) -> None:
+        """Forget target history (call when the face is lost)."""
+        self.pid_x.reset()
+        self.pid_y.reset()
+        self.velocity = [0.0, 0.0]
+        self._last_t = None
+        self._last_world = None
+        self._last_world_t = None
+
+    def world_estimate(self, center: Point) -> Point:
+        return center[0] + self.offset[0], center[1] + self.offset[1]
+
+    def _axis_steps(self, pid: AxisPID, err: float, vel: float, dt: float) -> int:
+        if abs(err) < self.deadband:
+            pid.reset()
+            return 0
+        effort = pid.update(err, dt) + vel * self.feed_forward
+        return int(max(-self.max_step, min(self.max_step, effort * self.step_scale)))
+
+    def update(self, center: Optional[Point], frame_size: Tuple[int, int], t: float,
+               settled: bool = True) -> Optional[Tuple[int, int]]:
+        """
+        center: face centre in image pixels (None if no face); frame_size: (w, h); t: capture time.
+        settled: False for a frame captured while a move was running. It still yields a
+        correction, but stays out of the velocity estimate: the offset doesn't include that
+        move yet, so its world position would be wrong.
+        Returns (step_x, step_y) to send, or None to hold.
+        """
+        if center is None:
+            self.reset()
+            return None
+        w, h = frame_size
+        err_x = center[0] - w / 2.0
+        err_y = center[1] - h / 2.0
+        world = self.world_estimate(center)
+        dt = 0.0 if self._last_t is None else max(0.0, t - self._last_t)
+        self._last_t = t
+        if settled:
+            world_dt = 0.0 if self._last_world_t is None else t - self._last_world_t
+            if self._last_world is not None and world_dt > 0:
+                for i in (0, 1):
+                    inst = (world[i] - self._last_world[i]) / world_dt
+                    self.velocity[i] += self.vel_alpha * (inst - self.velocity[i])
+            self._last_world = world
+            self._last_world_t = t
+
+        step_x = self._axis_steps(self.pid_x, err_x, self.velocity[0], dt)
+        step_y = self._axis_steps(self.pid_y, err_y, self.velocity[1], dt)
+        if step_x == 0 and step_y == 0:
+            return None
+        if self._last_cmd_t is not None and t - self._last_cmd_t < self.min_interval:
+            return None
+        if self.invert_x:
+            step_x = -step_x
+        if self.invert_y:
+            step_y = -step_y
+        return step_x, step_y
+
+    def sent(self, step_x: int, step_y: int, t: float) -> None:
+        """Record a command that actually went out, so motion compensation and rate limiting stay honest."""
+        if self.invert_x:
+            step_x = -step_x
+        if self.invert_y:
+            step_y = -step_y
+        self.offset[0] += step_x / self.step_scale
+        self.offset[1] += step_y / self.step_scale
+        self._last_cmd_t = t
+        self.commands += 1
+
+
+def load_trajectory(path: str) -> Tuple[List[Tuple[float, float, float]], Tuple[int, int]]:
+    """Read a t,x,y[,w,h] CSV; returns ([(t, x, y)], (w, h))."""
+    rows = []
+    size = (640, 480)
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            rows.append((float(row["t"]), float(row["x"]), float(row["y"])))
+            if row.get("w") and row.get("h"):
+                size = (int(float(row["w"])), int(float(row["h"])))
+    if not rows:
+        raise ValueError(f"No samples in {path}")
+    t0 = rows[0][0]
+    return [(t - t0, x, y) for t, x, y in rows], size
+
+
+def synthetic_trajectory(kind: str, size: Tuple[int, int] = (640, 480), duration: float = 8.0, fps: float = 30.0):
+    """Scripted face paths: 'step' (jump off-centre and hold) or 'sine' (slow side-to-side sway)."""
+    w, h = size
+    out = []
+    for i in range(int(duration * fps)):
+        t = i / fps
+        if kind == "step":
+            x, y = w / 2.0 + 180.0, h / 2.0 - 80.0
+        elif kind == "sine":
+            x, y = w / 2.0 + 150.0 * math.sin(2 * math.pi * 0.2 * t), h / 2.0 + 40.0 * math.sin(2 * math.pi * 0.1 * t)
+        else:
+            raise ValueError(f"Unknown synthetic trajectory {kind}")
+        out.append((t, x, y))
+    return out, size
+
+
+def interp(samples, t: float) -> Point:
+    if t <= samples[0][0]:
+        return samples[0][1], samples[0][2]
+    for (t0, x0, y0), (t1, x1, y1) in zip(samples, samples[1:]):
+        if t0 <= t <= t1:
+            a = (t - t0) / (t1 - t0) if t1 > t0 else 0.0
+            return x0 + a * (x1 - x0), y0 + a * (y1 - y0)
+    return samples[-1][1], samples[-1][2]
+
+
+def replay(samples, size: Tuple[int, int], controller: PanTiltController, fps: float = 30.0, rpm: int = 12,
+           px_per_step: Optional[float] = None, settle_px: float = 15.0, hold: float = 0.5,
+           latency: float = 0.05) -> dict:
+    """
+    Simulate the closed loop against a face trajectory given in world pixels.
+
+    The gimbal is modelled like the firmware's blocking stepAll: an AB move of (a, b)
+    takes (|a| + |b|) step periods at `rpm` and no new command is accepted until it
+    finishes. `latency` is the serial/command overhead per move. Frames are sampled
+    at `fps` and show the face relative to wherever the gimbal is pointing then.
+    """
+    w, h = size
+    px_per_step = px_per_step or 1.0 / controller.step_scale
+    step_period = 60.0 / (2048 * max(1, rpm))
+    pos = [0.0, 0.0]  # gimbal pointing, pixels
+    move_from = move_to = (0.0, 0.0)
+    move_start = move_end = 0.0
+    errors = []
+    total_steps = 0
+    settle_time = None  # start of the first in-band stretch lasting `hold` seconds
+    in_band_since = None
+    end_t = samples[-1][0]
+    t = 0.0
+    while t <= end_t:
+        if t < move_end:
+            a = (t - move_start) / (move_end - move_start)
+            pos = [move_from[0] + a * (move_to[0] - move_from[0]), move_from[1] + a * (move_to[1] - move_from[1])]
+        else:
+            pos = list(move_to)
+        fx, fy = interp(samples, t)
+        img = (fx - pos[0], fy - pos[1])  # world pixels are image pixels with the gimbal at home
+        err = math.hypot(img[0] - w / 2.0, img[1] - h / 2.0)
+        errors.append((t, err))
+        if err <= settle_px:
+            if in_band_since is None:
+                in_band_since = t
+            if settle_time is None and t - in_band_since >= hold:
+                settle_time = in_band_since
+        else:
+            in_band_since = None
+
+        # Like the live tracker, only frames taken with the gimbal at rest reach the controller.
+        if t < move_end:
+            t += 1.0 / fps
+            continue
+        visible = 0 <= img[0] < w and 0 <= img[1] < h
+        cmd = controller.update(img if visible else None, size, t)
+        if cmd is not None:
+            sx, sy = cmd
+            if controller.invert_x:
+                sx = -sx
+            if controller.invert_y:
+                sy = -sy
+            controller.sent(*cmd, t)
+            total_steps += abs(sx) + abs(sy)
+            move_from = tuple(pos)
+            move_to = (pos[0] + sx * px_per_step, pos[1] + sy * px_per_step)
+            move_start = t + latency
+            move_end = move_start + (abs(sx) + abs(sy)) * step_period
+        t += 1.0 / fps
+
+    vals = [e for _, e in errors]
+    return {
+        "commands": controller.commands,
+        "total_steps": total_steps,
+        "settle_time": settle_time,
+        "rms_err": math.sqrt(sum(e * e for e in vals) / len(vals)) if vals else 0.0,
+        "max_err": max(vals) if vals else 0.0,
+        "final_err": vals[-1] if vals else 0.0,
+    }
+
+
+def _format_score(name: str, score: dict) -> str:
+    settle = f"{score['settle_time']:.2f}s" if score["settle_time"] is not None else "never"
+    return (f"{name:<10} commands={score['commands']:<5} steps={score['total_steps']:<6} settle={settle:<7} "
+            f"rms={score['rms_err']:.1f}px max={score['max_err']:.1f}px final={score['final_err']:.1f}px")
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Replay face trajectories through the pan/tilt controller")
+    p.add_argument("trajectory", nargs="?", help="CSV with t,x,y[,w,h] columns")
+    p.add_argument("--synthetic", choices=["step", "sine"], help="Use a scripted trajectory instead of a file")
+    p.add_argument("--fps", type=float, default=30.0, help="Simulated camera rate (default 30)")
+    p.add_argument("--rpm", type=int, default=12, help="Stepper RPM (default 12)")
+    p.add_argument("--step-scale", type=float, default=0.05, help="Steps per pixel (default 0.05)")
+    p.add_argument("--max-step", type=int, default=25, help="Max steps per command (default 25)")
+    p.add_argument("--px-per-step", type=float, default=None,
+                   help="True plant gain in pixels per step, to model miscalibration (default 1/step-scale)")
+    p.add_argument("--kp", type=float, default=1.0)
+    p.add_argument("--ki", type=float, default=0.0)
+    p.add_argument("--kd", type=float, default=0.0)
+    p.add_argument("--deadband", type=float, default=6.0, help="Pixel deadband (default 6)")
+    p.add_argument("--feed-forward", type=float, default=0.0, help="Velocity lead in seconds (default 0)")
+    p.add_argument("--min-interval", type=float, default=0.0, help="Min seconds between commands (default 0)")
+    p.add_argument("--settle-px", type=float, default=15.0, help="Error band for settling time (default 15)")
+    ns = p.parse_args(argv)
+
+    if ns.synthetic:
+        samples, size = synthetic_trajectory(ns.synthetic)
+    elif ns.trajectory:
+        samples, size = load_trajectory(ns.trajectory)
+    else:
+        p.error("give a trajectory file or --synthetic")
+
+    baseline = PanTiltController(ns.step_scale, ns.max_step, kp=1.0, deadband=0.0)
+    tuned = PanTiltController(ns.step_scale, ns.max_step, kp=ns.kp, ki=ns.ki, kd=ns.kd, deadband=ns.deadband,
+                              feed_forward=ns.feed_forward, min_interval=ns.min_interval)
+    for name, ctl in (("baseline", baseline), ("tuned", tuned)):
+        score = replay(samples, size, ctl, fps=ns.fps, rpm=ns.rpm, px_per_step=ns.px_per_step,
+                       settle_px=ns.settle_px)
+        print(_format_score(name, score))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,303 @@
+"""
+One place to open the webcam, and one capture shared by everything that needs frames.
+
+Opening a camera on Windows can take seconds: the wrong backend may open but deliver black
+frames, so the tracker, TARGET and the NO CREDS recorder each used to walk a list of
+backends and read a test frame. Here the walk happens once per device; the backend that
+worked (plus the resolution and FPS it delivered) is cached in camera_cache.json and used
+directly next time. If a cached backend stops working the device is probed again.
+
+acquire() returns a handle onto a SharedCamera: a single VideoCapture with a reader thread
+that keeps the newest frame. Any number of handles can read at once, and the device stays
+open until the last handle is released, so a consumer that starts while tracking runs
+(or while `listen` holds the camera warm) gets frames immediately. A video file is the
+exception: it gets a plain VideoCapture of its own, so every frame is read in order
+instead of the free-running reader skipping whatever the consumer was too slow for.
+
+Where OpenCV supports it, captures are opened with hardware-accelerated decoding requested
+(CAP_PROP_HW_ACCELERATION); backends that don't support it ignore the request.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE = os.path.join(HOST_DIR, "camera_cache.json")
+# Tried after the requested backend. MSMF is left out: it opens on most Windows webcams but
+# spams grabFrame warnings and often returns black frames.
+FALLBACK_APIS = ("dshow", "v4l2", "avfoundation", "auto")
+
+
+def api_ids() -> Dict[str, int]:
+    return {
+        "auto": getattr(cv2, "CAP_ANY", 0),
+        "dshow": getattr(cv2, "CAP_DSHOW", 700),
+        "msmf": getattr(cv2, "CAP_MSMF", 1400),
+        "v4l2": getattr(cv2, "CAP_V4L2", 200),
+        "avfoundation": getattr(cv2, "CAP_AVFOUNDATION", 1200),
+        "gstreamer": getattr(cv2, "CAP_GSTREAMER", 1800),
+    }
+
+
+def _source(cam: str):
+    try:
+        return int(cam)
+    except ValueError:
+        return cam
+
+
+def _is_file(cam: str) -> bool:
+    return not isinstance(_source(cam), int) and os.path.isfile(cam)
+
+
+def _usable(frame) -> bool:
+    """A real frame, not the black one a backend that opened but can't stream delivers."""
+    return frame is not None and frame.mean() > 1.0
+
+
+def _open(cam: str, api: str, size: Optional[Tuple[int, int]] = None):
+    """Open `cam` with one backend; returns the VideoCapture (possibly not opened)."""
+    src, api_id = _source(cam), api_ids().get(api, 0)
+    params: List[int] = []
+    hw = getattr(cv2, "CAP_PROP_HW_ACCELERATION", None)
+    if hw is not None:
+        params = [hw, getattr(cv2, "VIDEO_ACCELERATION_ANY", 1)]
+    try:
+        cap = cv2.VideoCapture(src, api_id, params) if params else cv2.VideoCapture(src, api_id)
+    except (TypeError, cv2.error):
+        cap = cv2.VideoCapture(src, api_id)  # OpenCV < 4.5.2 has no open params
+    if size and cap.isOpened():
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+    return cap
+
+
+class CameraCache:
+    """Working backend/resolution/FPS per device, persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if path and os.path.isfile(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[CAM] ignoring unreadable {path}: {e}")
+
+    def get(self, cam: str) -> Optional[dict]:
+        with self._lock:
+            return self.entries.get(str(cam))
+
+    def put(self, cam: str, entry: Optional[dict]) -> None:
+        with self._lock:
+            if entry is None:
+                self.entries.pop(str(cam), None)
+            else:
+                self.entries[str(cam)] = entry
+            data = dict(self.entries)
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def probe(cam: str, api: str = "auto", size: Optional[Tuple[int, int]] = None):
+    """
+    Find a backend that opens `cam` and returns a non-black frame, trying `api` first.
+    Returns (capture, first_frame, cache_entry) or (None, None, None).
+    """
+    order = [api] + [a for a in FALLBACK_APIS if a != api]
+    for name in order:
+        t0 = time.perf_counter()
+        cap = _open(cam, name, size)
+        if not cap.isOpened():
+            cap.release()
+            continue
+        ok, frame = cap.read()
+        if ok and _usable(frame):
+            h, w = frame.shape[:2]
+            entry = {"api": name, "width": w, "height": h, "fps": cap.get(cv2.CAP_PROP_FPS) or 0.0,
+                     "open_ms": round((time.perf_counter() - t0) * 1000.0), "probed": time.time()}
+            if size:
+                entry["size"] = list(size)
+            print(f"[CAM] camera {cam}: {name} works ({w}x{h}, opened in {entry['open_ms']} ms)")
+            return cap, frame, entry
+        cap.release()
+    return None, None, None
+
+
+class SharedCamera:
+    """One open device, read continuously by a background thread; hand out frames via CameraHandle."""
+
+    def __init__(self, cam: str, cap, first_frame=None, info: Optional[dict] = None):
+        self.cam = cam
+        self.cap = cap
+        self.info = info or {}
+        self.refs = 0
+        self._cond = threading.Condition()
+        self._frame = first_frame
+        self._seq = 1 if first_frame is not None else 0
+        self._ts = time.time()
+        self._closed = False
+        self.failures = 0
+        self._thread = threading.Thread(target=self._read_loop, name=f"camera-{cam}", daemon=True)
+        self._thread.start()
+
+    def _read_loop(self) -> None:
+        while not self._closed:
+            ok, frame = self.cap.read()
+            if not ok or frame is None:
+                self.failures += 1
+                time.sleep(0.01)
+                continue
+            with self._cond:
+                self._frame = frame
+                self._seq += 1
+                self._ts = time.time()
+                self._cond.notify_all()
+
+    def latest(self, after_seq: int = 0, timeout: float = 1.0):
+        """Newest frame with seq > after_seq; returns (seq, frame, ts) or (after_seq, None, 0)."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq or self._closed, timeout=timeout):
+                return after_seq, None, 0.0
+            if self._closed or self._frame is None:
+                return after_seq, None, 0.0
+            return self._seq, self._frame, self._ts
+
+    def get(self, prop) -> float:
+        return self.cap.get(prop)
+
+    def close(self) -> None:
+        self._closed = True
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        self.cap.release()
+
+
+class CameraHandle:
+    """cv2.VideoCapture-like view of a SharedCamera; read() blocks for a frame this handle hasn't seen."""
+
+    def __init__(self, shared: SharedCamera, manager: "CameraManager", copy: bool = True):
+        self.shared = shared
+        self.manager = manager
+        self.copy = copy  # frames are shared between handles; copy unless the caller never draws on them
+        self._seq = 0
+        self._released = False
+        self.last_ts = 0.0
+
+    def isOpened(self) -> bool:
+        return not self._released
+
+    def read(self):
+        if self._released:
+            return False, None
+        seq, frame, ts = self.shared.latest(self._seq)
+        if frame is None:
+            return False, None
+        self._seq = seq
+        self.last_ts = ts
+        return True, frame.copy() if self.copy else frame
+
+    def get(self, prop) -> float:
+        return self.shared.get(prop)
+
+    def set(self, prop, value) -> bool:
+        return False  # shared device: settings belong to the manager
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.manager.release(self.shared)
+
+
+class CameraManager:
+    def __init__(self, cache_path: Optional[str] = DEFAULT_CACHE):
+        self.cache = CameraCache(cache_path)
+        self._open: Dict[str, SharedCamera] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, cam: str, api: str = "auto", copy: bool = True, reprobe: bool = False,
+                size: Optional[Tuple[int, int]] = None):
+        """
+        A handle on camera `cam`, opening it (cached backend first) if nobody has it open yet.
+        A video file gets its own VideoCapture instead, read frame by frame.
+        """
+        if cv2 is None:
+            return None
+        cam = str(cam)
+        if _is_file(cam):
+            cap = _open(cam, api)
+            if not cap.isOpened():
+                cap.release()
+                print(f"[CAM] Failed to open video file {cam}")
+                return None
+            return cap
+        with self._lock:
+            shared = self._open.get(cam)
+            if shared is None:
+                shared = self._open_device(cam, api, reprobe, size)
+                if shared is None:
+                    return None
+                self._open[cam] = shared
+            shared.refs += 1
+        return CameraHandle(shared, self, copy=copy)
+
+    def release(self, shared: SharedCamera) -> None:
+        with self._lock:
+            shared.refs -= 1
+            if shared.refs > 0:
+                return
+            self._open.pop(shared.cam, None)
+        shared.close()
+
+    def _open_device(self, cam: str, api: str, reprobe: bool, size: Optional[Tuple[int, int]]):
+        entry = None if reprobe else self.cache.get(cam)
+        # A different backend asked for explicitly overrides the cache; "auto" means "whatever worked".
+        if entry and api not in ("auto", entry.get("api")):
+            entry = None
+        if entry:
+            t0 = time.perf_counter()
+            cached_size = size or (tuple(entry["size"]) if entry.get("size") else None)
+            cap = _open(cam, entry["api"], cached_size)
+            ok, frame = cap.read() if cap.isOpened() else (False, None)
+            if ok and _usable(frame):
+                print(f"[CAM] camera {cam}: cached {entry['api']} backend, opened in "
+                      f"{(time.perf_counter() - t0) * 1000:.0f} ms")
+                return SharedCamera(cam, cap, first_frame=frame, info=entry)
+            cap.release()
+            print(f"[CAM] cached {entry['api']} backend failed for camera {cam}; probing again")
+        cap, frame, entry = probe(cam, api, size)
+        if cap is None:
+            print(f"[CAM] Failed to open camera {cam} with api {api} (and fallbacks)")
+            self.cache.put(cam, None)
+            return None
+        self.cache.put(cam, entry)
+        return SharedCamera(cam, cap, first_frame=frame, info=entry)
+
+
+_manager = CameraManager()
+
+
+def configure(cache_path: Optional[str]) -> None:
+    """Point the process-wide manager at another cache file (None = don't persist)."""
+    global _manager
+    _manager = CameraManager(cache_path)
+
+
+def acquire(cam: str, api: str = "auto", copy: bool = True, reprobe: bool = False,
+            size: Optional[Tuple[int, int]] = None):
+    return _manager.acquire(cam, api, copy=copy, reprobe=reprobe, size=size)
@@ -0,0 +1,197 @@
+"""
+Persistent background queue that transcodes kill-cam clips and uploads them to Telegram.
+
+Each clip becomes a small JSON job file in a spool directory; the job is rewritten as it
+moves through transcode -> upload and deleted once every subscriber has the video. Jobs
+still in the spool when the host restarts are picked up again, so a crash or a network
+outage never loses a clip. Chats that already received a clip are remembered in the job,
+so a retry only goes to the ones that failed.
+
+Transcoding uses ffmpeg when it is on PATH (H.264 + faststart, which Telegram previews
+inline and is far smaller than OpenCV's mp4v); without it the clip is uploaded as-is.
+"""
+
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, List, Optional
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SPOOL = os.path.join(HOST_DIR, "clip_spool")
+
+# sender(path, caption, chat_ids) -> chat IDs that received the clip
+Sender = Callable[[str, Optional[str], List[str]], Iterable[str]]
+
+
+def transcode(src: str, crf: int = 28) -> Optional[str]:
+    """Re-encode `src` to H.264 next to it; returns the new path, or None if ffmpeg is unavailable/failed."""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    dst = os.path.splitext(src)[0] + "-tg.mp4"
+    cmd = [ffmpeg, "-y", "-loglevel", "error", "-i", src, "-c:v", "libx264", "-preset", "veryfast",
+           "-crf", str(crf), "-pix_fmt", "yuv420p", "-movflags", "+faststart", "-an", dst]
+    try:
+        subprocess.run(cmd, check=True, timeout=120)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"[CLIPQ] transcode failed for {src}: {e}")
+        return None
+    return dst
+
+
+class ClipQueue:
+    def __init__(self, sender: Sender, chat_ids: Iterable[str], spool_dir: str = DEFAULT_SPOOL,
+                 do_transcode: bool = True, retries: int = 5, backoff: float = 5.0):
+        self.sender = sender
+        self.chat_ids = list(chat_ids)
+        self.spool_dir = spool_dir
+        self.do_transcode = do_transcode
+        self.retries = retries
+        self.backoff = backoff
+        self._jobs: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._open = 0  # jobs neither delivered nor given up on this run
+        self._idle = threading.Condition()
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def start(self) -> "ClipQueue":
+        """Re-queue anything left in the spool from a previous run and start the worker."""
+        resumed = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.spool_dir, name)) as f:
+                    job = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[CLIPQ] skipping unreadable job {name}: {e}")
+                continue
+            job["attempts"] = 0  # fresh retry budget each run
+            self._track(1)
+            self._jobs.put(job)
+            resumed += 1
+        if resumed:
+            print(f"[CLIPQ] resuming {resumed} queued clip(s)")
+        self._worker = threading.Thread(target=self._run, name="clip-queue", daemon=True)
+        self._worker.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop after the current job; unfinished jobs stay in the spool for the next run."""
+        self._jobs.put(None)
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+
+    def enqueue(self, video_path: str, caption: Optional[str] = None) -> str:
+        """Persist a job for `video_path` and hand it to the worker; returns immediately."""
+        job = {
+            "id": f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}",
+            "video": os.path.abspath(video_path),
+            "upload": None,
+            "caption": caption,
+            "sent_to": [],
+            "attempts": 0,
+            "created": time.time(),
+        }
+        self._try_save(job)
+        self._track(1)
+        self._jobs.put(job)
+        print(f"[CLIPQ] queued {os.path.basename(video_path)} ({self._open} pending)")
+        return job["id"]
+
+    @property
+    def pending(self) -> int:
+        return self._open
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every job is delivered (or given up on); True if the queue went idle in time."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._open == 0, timeout=timeout)
+
+    def _track(self, delta: int) -> None:
+        with self._idle:
+            self._open += delta
+            self._idle.notify_all()
+
+    def _job_path(self, job: dict) -> str:
+        return os.path.join(self.spool_dir, job["id"] + ".json")
+
+    def _save(self, job: dict) -> None:
+        path = self._job_path(job)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(job, f, indent=2)
+        os.replace(tmp, path)
+
+    def _try_save(self, job: dict) -> None:
+        try:
+            self._save(job)
+        except OSError as e:
+            # Disk full or spool gone: the job carries on from memory, it just won't survive a restart.
+            print(f"[CLIPQ] could not update spool entry for {job['id']}, keeping it in memory: {e}")
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            try:
+                self._process(job)
+            except Exception as e:
+                # Keep the worker alive; the job file is still in the spool.
+                print(f"[CLIPQ] job {job.get('id')} crashed: {e}")
+                try:
+                    self._retry_later(job)
+                except Exception as e:
+                    # Nothing more we can do for this job in this run; the worker must outlive it.
+                    print(f"[CLIPQ] job {job.get('id')} dropped for this run: {e}")
+                    self._track(-1)
+
+    def _process(self, job: dict) -> None:
+        if not os.path.isfile(job["video"]):
+            print(f"[CLIPQ] dropping job {job['id']}: {job['video']} is gone")
+            self._finish(job)
+            return
+        if job["upload"] is None:
+            job["upload"] = (self.do_transcode and transcode(job["video"])) or job["video"]
+            self._try_save(job)
+        remaining = [c for c in self.chat_ids if c not in job["sent_to"]]
+        if remaining:
+            delivered = list(self.sender(job["upload"], job["caption"], remaining))
+            job["sent_to"].extend(c for c in delivered if c not in job["sent_to"])
+            self._try_save(job)
+            remaining = [c for c in remaining if c not in delivered]
+        if remaining:
+            self._retry_later(job)
+        else:
+            print(f"[CLIPQ] delivered {os.path.basename(job['upload'])} to {len(job['sent_to'])} chat(s)")
+            self._finish(job)
+
+    def _retry_later(self, job: dict) -> None:
+        job["attempts"] = job.get("attempts", 0) + 1
+        self._try_save(job)
+        if job["attempts"] >= self.retries:
+            # Left in the spool so the next start tries again; just stop hammering the API now.
+            print(f"[CLIPQ] giving up on {job['id']} for this run after {job['attempts']} attempts")
+            self._track(-1)
+            return
+        delay = self.backoff * (2 ** (job["attempts"] - 1))
+        print(f"[CLIPQ] retrying {job['id']} in {delay:.0f}s")
+        timer = threading.Timer(delay, self._jobs.put, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+    def _finish(self, job: dict) -> None:
+        try:
+            os.remove(self._job_path(job))
+        except OSError:
+            pass
+        upload = job.get("upload")
+        if upload and upload != job["video"] and os.path.isfile(upload):
+            os.remove(upload)
+        self._track(-1)  # last, so wait_idle() returns with the spool already cleaned up
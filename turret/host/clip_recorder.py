@@ -0,0 +1,108 @@
+"""
+Kill-cam clip assembly from the tracker's own camera feed.
+
+The tracking capture thread pushes frames into a FrameRing, which keeps the last few
+seconds (downsampled to the recording rate). On a NO CREDS event a clip is built from
+that pre-roll plus the frames that arrive during the post-roll window, so the moment
+of the shot is always in the clip and no second VideoCapture is opened. Encoding runs
+on the caller's (background) thread, never on the capture or control path.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional, Tuple
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+
+class FrameRing:
+    def __init__(self, preroll: float = 3.0, fps: float = 15.0):
+        self.fps = fps
+        self.preroll = preroll
+        self._frames: Deque[Tuple[float, object]] = deque(maxlen=max(1, int(preroll * fps)))
+        self._lock = threading.Lock()
+        self._last_ts = 0.0
+        self._taps: List[queue.Queue] = []
+
+    def push(self, frame, ts: Optional[float] = None) -> None:
+        """Offer a captured frame; frames faster than the recording rate are skipped."""
+        ts = time.time() if ts is None else ts
+        if ts - self._last_ts < 0.9 / self.fps:
+            return
+        self._last_ts = ts
+        with self._lock:
+            self._frames.append((ts, frame))
+            for tap in self._taps:
+                tap.put((ts, frame))
+
+    def open_tap(self) -> Tuple[List[Tuple[float, object]], queue.Queue]:
+        """Atomically snapshot the pre-roll and subscribe to every frame pushed after it."""
+        tap: queue.Queue = queue.Queue()
+        with self._lock:
+            pre = list(self._frames)
+            self._taps.append(tap)
+        return pre, tap
+
+    def close_tap(self, tap: queue.Queue) -> None:
+        with self._lock:
+            if tap in self._taps:
+                self._taps.remove(tap)
+
+
+def open_writer(size: Tuple[int, int], fps: float, ext: str = "mp4"):
+    """Create a timestamped VideoWriter in the working directory; returns (writer, filename)."""
+    ext = (ext or "avi").lower()
+    if ext == "mp4":
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        suffix = "mp4"
+    else:
+        fourcc = cv2.VideoWriter_fourcc(*"XVID")
+        suffix = "avi"
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    filename = f"{ts}-shot.{suffix}"
+    return cv2.VideoWriter(filename, fourcc, fps, size), filename
+
+
+def record_from_ring(ring: FrameRing, postroll: float = 7.0, ext: str = "mp4") -> Optional[str]:
+    """Write pre-roll + `postroll` seconds of live frames from the ring to a clip; returns its path or None."""
+    if cv2 is None:
+        print("[SERVER] OpenCV not installed; cannot record clip")
+        return None
+    t_event = time.time()
+    pre, tap = ring.open_tap()
+    writer = filename = None
+    written = 0
+    try:
+        pending = iter(pre)
+        end = t_event + postroll
+        while True:
+            item = next(pending, None)
+            if item is None:
+                remaining = end - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = tap.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            _, frame = item
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer, filename = open_writer((w, h), ring.fps, ext)
+            writer.write(frame)
+            written += 1
+    finally:
+        ring.close_tap(tap)
+        if writer is not None:
+            writer.release()
+    if not written:
+        print("[SERVER] No frames in ring buffer; is tracking running?")
+        return None
+    print(f"[SERVER] Saved recording to {filename} ({len(pre)} pre-roll + {written - len(pre)} live frames)")
+    return filename
@@ -0,0 +1,184 @@
+"""
+Persistent TCP event listener for the turret host.
+
+The payment gateway (and anything else) connects and writes short text events such as
+"NO CREDS", newline-terminated or as a bare packet. One selector thread serves any number
+of clients for the life of the process; clients may disconnect and reconnect freely.
+Nothing is written back except "PONG" for a gateway heartbeat "PING"; the gateway reads
+the turret socket with the same helper it uses for jackpot payouts and strips those, so
+any other reply would be mistaken for a payout.
+
+Firing is slow (motor C sweep + clip), so events are handed to a FireQueue: a single worker
+that fires one event at a time, enforces a cooldown between shots and drops events once a
+small backlog is waiting instead of firing minutes late.
+"""
+
+import queue
+import selectors
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+Addr = Tuple[str, int]
+HEARTBEAT = "PING"  # conn_supervisor.PING in payment/gateway
+
+
+class EventServer:
+    def __init__(self, host: str, port: int, on_message: Callable[[str, Addr], None]):
+        self.host = host
+        self.port = port
+        self.on_message = on_message
+        self._sel = selectors.DefaultSelector()
+        self._srv: Optional[socket.socket] = None
+        self._bufs: Dict[socket.socket, bytes] = {}
+        self._addrs: Dict[socket.socket, Addr] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._addrs)
+
+    def start(self) -> "EventServer":
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((self.host, self.port))
+        srv.listen(16)
+        srv.setblocking(False)
+        self._srv = srv
+        self._sel.register(srv, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._serve, name="event-server", daemon=True)
+        self._thread.start()
+        print(f"[SERVER] Listening on {self.host}:{self.port} ...")
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        for conn in list(self._addrs):
+            self._drop(conn)
+        if self._srv is not None:
+            self._sel.unregister(self._srv)
+            self._srv.close()
+            self._srv = None
+        self._sel.close()
+
+    def _serve(self) -> None:
+        while not self._stop.is_set():
+            for key, _ in self._sel.select(timeout=0.5):
+                if key.fileobj is self._srv:
+                    self._accept()
+                else:
+                    self._read(key.fileobj)
+
+    def _accept(self) -> None:
+        try:
+            conn, addr = self._srv.accept()
+        except OSError:
+            return
+        conn.setblocking(False)
+        self._bufs[conn] = b""
+        self._addrs[conn] = addr
+        self._sel.register(conn, selectors.EVENT_READ)
+        print(f"[SERVER] Client connected from {addr[0]}:{addr[1]} ({self.clients} connected)")
+
+    def _drop(self, conn: socket.socket) -> None:
+        addr = self._addrs.pop(conn, None)
+        self._bufs.pop(conn, None)
+        try:
+            self._sel.unregister(conn)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.close()
+        except OSError:
+            pass
+        if addr:
+            print(f"[SERVER] Client {addr[0]}:{addr[1]} disconnected ({self.clients} connected)")
+
+    def _read(self, conn: socket.socket) -> None:
+        try:
+            data = conn.recv(1024)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(conn)
+            return
+        addr = self._addrs[conn]
+        buf = self._bufs[conn] + data
+        # Process newline-delimited messages
+        while b"\n" in buf:
+            line, buf = buf.split(b"\n", 1)
+            self._dispatch(line, addr, conn)
+        # Process short packets without newline
+        if buf:
+            self._dispatch(buf, addr, conn)
+            buf = b""
+        self._bufs[conn] = buf
+
+    def _dispatch(self, raw: bytes, addr: Addr, conn: socket.socket) -> None:
+        msg = raw.decode(errors="ignore").strip()
+        if msg.startswith(HEARTBEAT):
+            try:
+                conn.send(b"PONG\n")
+            except OSError:
+                pass
+            msg = msg[len(HEARTBEAT):].strip()  # an event may share the packet
+        if not msg:
+            return
+        try:
+            self.on_message(msg, addr)
+        except Exception as e:
+            print(f"[SERVER] handler error for {msg!r}: {e}")
+
+
+class FireQueue:
+    """Serialises fire events: one at a time, at least `cooldown` s apart, at most `max_pending` waiting."""
+
+    def __init__(self, fire: Callable[[str], None], cooldown: float = 5.0, max_pending: int = 2):
+        self.fire = fire
+        self.cooldown = cooldown
+        self._events: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max(1, max_pending))
+        self._last_fire = 0.0
+        self.stats = {"fired": 0, "dropped": 0}
+        self._thread = threading.Thread(target=self._run, name="fire-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, event: str) -> bool:
+        try:
+            self._events.put_nowait(event)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            print(f"[FIRE] backlog full, dropping {event!r} ({self.stats['dropped']} dropped)")
+            return False
+        print(f"[FIRE] queued {event!r} ({self._events.qsize()} waiting)")
+        return True
+
+    def close(self, timeout: float = 2.0) -> None:
+        while True:
+            try:
+                self._events.get_nowait()  # don't fire leftovers on shutdown
+            except queue.Empty:
+                break
+        self._events.put(None)
+        self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            wait = self._last_fire + self.cooldown - time.time()
+            if wait > 0:
+                print(f"[FIRE] cooldown {wait:.1f}s")
+                time.sleep(wait)
+            try:
+                self.fire(event)
+                self.stats["fired"] += 1
+            except Exception as e:
+                print(f"[FIRE] failed: {e}")
+            self._last_fire = time.time()
@@ -0,0 +1,392 @@
+"""
+Face detection helpers for the turret tracker.
+
+Detector backends (Haar cascade, LBP cascade, OpenCV DNN res10 SSD) share one
+interface: detect(image, min_size) -> list of (x, y, w, h) boxes. Use
+make_detector() to build one by name.
+
+FaceFinder wraps a detector so detection runs on a downscaled copy of the frame and,
+once a face has been seen, only inside a region of interest around it. After
+`max_misses` consecutive misses it falls back to a full-frame search. Boxes are
+always returned in full-resolution frame coordinates.
+
+DetectThenTrack runs the (expensive) detector only every K frames or after the
+tracker loses lock, and follows the face with a cheap tracker in between.
+"""
+
+import math
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import cv2
+    import numpy as np
+except Exception:
+    cv2 = None
+    np = None
+
+Box = Tuple[int, int, int, int]
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(HOST_DIR, "models")
+DETECTORS = ("haar", "lbp", "dnn")
+
+
+def _cascade_dirs() -> List[str]:
+    dirs = [MODEL_DIR]
+    haar_dir = getattr(getattr(cv2, "data", None), "haarcascades", None)
+    if haar_dir:
+        dirs.append(haar_dir)
+        # Full OpenCV installs keep LBP cascades next to the Haar ones.
+        dirs.append(os.path.join(os.path.dirname(os.path.normpath(haar_dir)), "lbpcascades"))
+    return dirs
+
+
+def _find_model(filename: str, dirs: Iterable[str]) -> Optional[str]:
+    for d in dirs:
+        path = os.path.join(d, filename)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+class CascadeDetector:
+    """Haar or LBP cascade classifier."""
+
+    def __init__(self, model_path: str, scale_factor: float = 1.2, min_neighbors: int = 5):
+        self.model_path = model_path
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.cascade = cv2.CascadeClassifier(model_path)
+        if self.cascade.empty():
+            raise ValueError(f"Failed to load cascade {model_path}")
+
+    def detect(self, image, min_size: int) -> List[Box]:
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                                              minSize=(min_size, min_size))
+        return [tuple(int(v) for v in f) for f in faces]
+
+
+class DnnDetector:
+    """OpenCV DNN res10 300x300 SSD face detector (Caffe model, CPU)."""
+
+    MEAN = (104.0, 177.0, 123.0)
+
+    def __init__(self, model_path: str, proto_path: str, confidence: float = 0.5):
+        self.model_path = model_path
+        self.confidence = confidence
+        self.net = cv2.dnn.readNetFromCaffe(proto_path, model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def detect(self, image, min_size: int) -> List[Box]:
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        h, w = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(image, 1.0, (300, 300), self.MEAN, swapRB=False, crop=False)
+        self.net.setInput(blob)
+        out = self.net.forward()  # shape (1, 1, N, 7): [_, _, conf, x0, y0, x1, y1] normalised
+        boxes = []
+        for det in out[0, 0]:
+            if det[2] < self.confidence:
+                continue
+            x0, y0 = max(0, int(det[3] * w)), max(0, int(det[4] * h))
+            x1, y1 = min(w, int(det[5] * w)), min(h, int(det[6] * h))
+            if x1 - x0 >= min_size and y1 - y0 >= min_size:
+                boxes.append((x0, y0, x1 - x0, y1 - y0))
+        return boxes
+
+
+def make_detector(name: str, model: Optional[str] = None, proto: Optional[str] = None,
+                  confidence: float = 0.5):
+    """Build a detector backend by name; raises ValueError if its model files can't be found."""
+    name = name.lower()
+    if name == "haar":
+        path = model or _find_model("haarcascade_frontalface_default.xml", _cascade_dirs())
+        if not path:
+            raise ValueError("Could not locate haarcascade_frontalface_default.xml")
+        return CascadeDetector(path)
+    if name == "lbp":
+        path = model or _find_model("lbpcascade_frontalface_improved.xml", _cascade_dirs()) \
+            or _find_model("lbpcascade_frontalface.xml", _cascade_dirs())
+        if not path:
+            raise ValueError(f"Could not locate an LBP face cascade; put lbpcascade_frontalface_improved.xml in {MODEL_DIR}")
+        return CascadeDetector(path, scale_factor=1.1, min_neighbors=4)
+    if name == "dnn":
+        path = model or _find_model("res10_300x300_ssd_iter_140000.caffemodel", [MODEL_DIR])
+        proto = proto or _find_model("deploy.prototxt", [MODEL_DIR])
+        if not path or not proto:
+            raise ValueError(f"DNN detector needs deploy.prototxt and res10_300x300_ssd_iter_140000.caffemodel in {MODEL_DIR}")
+        return DnnDetector(path, proto, confidence=confidence)
+    raise ValueError(f"Unknown detector {name}")
+
+
+def largest(boxes: List[Box]) -> Optional[Box]:
+    if not boxes:
+        return None
+    return max(boxes, key=lambda f: f[2] * f[3])
+
+
+def iou(a: Box, b: Box) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def percentile(sorted_vals: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, math.ceil(q / 100.0 * len(sorted_vals)) - 1))
+    return sorted_vals[idx]
+
+
+def bench_detectors(detectors: Dict[str, object], frames: Iterable, min_size: int, reference: str,
+                    max_frames: int = 0, min_iou: float = 0.5) -> Dict[str, dict]:
+    """
+    Run every detector over the same frames and collect per-backend stats:
+    fps (detector time only), latency percentiles in ms, hit rate, and agreement with
+    the reference backend (both miss, or both hit with IoU >= min_iou).
+    """
+    lat: Dict[str, List[float]] = {name: [] for name in detectors}
+    hits = {name: 0 for name in detectors}
+    agree = {name: 0 for name in detectors}
+    n = 0
+    for frame in frames:
+        found = {}
+        for name, det in detectors.items():
+            t0 = time.perf_counter()
+            box = largest(det.detect(frame, min_size))
+            lat[name].append(time.perf_counter() - t0)
+            found[name] = box
+            if box is not None:
+                hits[name] += 1
+        ref = found.get(reference)
+        for name, box in found.items():
+            if (box is None and ref is None) or (box is not None and ref is not None and iou(box, ref) >= min_iou):
+                agree[name] += 1
+        n += 1
+        if max_frames and n >= max_frames:
+            break
+
+    stats = {}
+    for name, vals in lat.items():
+        vals.sort()
+        total = sum(vals)
+        stats[name] = {
+            "frames": n,
+            "fps": n / total if total > 0 else 0.0,
+            "p50_ms": percentile(vals, 50) * 1000.0,
+            "p90_ms": percentile(vals, 90) * 1000.0,
+            "p99_ms": percentile(vals, 99) * 1000.0,
+            "max_ms": (vals[-1] if vals else 0.0) * 1000.0,
+            "hit_rate": hits[name] / n if n else 0.0,
+            "agreement": agree[name] / n if n else 0.0,
+        }
+    return stats
+
+
+class FaceFinder:
+    def __init__(self, detector, scale: float = 1.0, roi_margin: float = 0.0, max_misses: int = 5,
+                 min_face: int = 60):
+        """
+        detector: backend from make_detector()
+        scale: resize factor applied before detection (1.0 = full resolution)
+        roi_margin: ROI padding around the last face, in face widths/heights (0 disables ROI search)
+        max_misses: consecutive ROI misses before reverting to full-frame search
+        """
+        if not 0.0 < scale <= 1.0:
+            raise ValueError("scale must be in (0, 1]")
+        self.detector = detector
+        self.scale = scale
+        self.roi_margin = roi_margin
+        self.max_misses = max(1, max_misses)
+        self.min_face = min_face
+        self.misses = 0
+        self.roi: Optional[Box] = None  # last searched region, full-res (x0, y0, x1, y1)
+        self._last: Optional[Box] = None  # last face in scaled coords
+
+    def reset(self) -> None:
+        self.misses = 0
+        self.roi = None
+        self._last = None
+
+    def hint(self, box: Box) -> None:
+        """Centre the next ROI search on a full-resolution box obtained elsewhere (e.g. a tracker)."""
+        x, y, w, h = box
+        self._last = (int(x * self.scale), int(y * self.scale), int(w * self.scale), int(h * self.scale))
+
+    def _search_window(self, sw: int, sh: int) -> Box:
+        if self._last is None or self.roi_margin <= 0:
+            return 0, 0, sw, sh
+        lx, ly, lw, lh = self._last
+        mx, my = lw * self.roi_margin, lh * self.roi_margin
+        return (max(0, int(lx - mx)), max(0, int(ly - my)),
+                min(sw, int(lx + lw + mx)), min(sh, int(ly + lh + my)))
+
+    def find(self, frame) -> Optional[Box]:
+        """Detect the largest face in a BGR frame; returns (x, y, w, h) at full resolution or None."""
+        if self.scale < 1.0:
+            small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        else:
+            small = frame
+        sh, sw = small.shape[:2]
+        x0, y0, x1, y1 = self._search_window(sw, sh)
+        inv = 1.0 / self.scale
+        self.roi = (int(x0 * inv), int(y0 * inv), int(x1 * inv), int(y1 * inv))
+
+        min_sz = max(12, int(self.min_face * self.scale))
+        faces = self.detector.detect(small[y0:y1, x0:x1], min_sz)
+        if len(faces) == 0:
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                self._last = None
+            return None
+
+        fx, fy, fw, fh = largest(faces)
+        self._last = (int(fx) + x0, int(fy) + y0, int(fw), int(fh))
+        self.misses = 0
+        lx, ly, lw, lh = self._last
+        return int(lx * inv), int(ly * inv), int(lw * inv), int(lh * inv)
+
+
+class FlowTracker:
+    """Follows a box with pyramidal Lucas-Kanade optical flow on corner features inside it."""
+
+    def __init__(self, max_points: int = 40, min_points: int = 8, max_fb_error: float = 1.0):
+        self.max_points = max_points
+        self.min_points = min_points
+        self.max_fb_error = max_fb_error
+        self._prev = None
+        self._pts = None
+        self._box = None
+
+    def init(self, gray, box: Box) -> bool:
+        x, y, w, h = box
+        pts = cv2.goodFeaturesToTrack(gray[y:y + h, x:x + w], maxCorners=self.max_points,
+                                      qualityLevel=0.01, minDistance=3)
+        if pts is None or len(pts) < self.min_points:
+            self._pts = None
+            return False
+        pts[:, 0, 0] += x
+        pts[:, 0, 1] += y
+        self._prev, self._pts, self._box = gray, pts, box
+        return True
+
+    def update(self, gray) -> Optional[Box]:
+        if self._pts is None:
+            return None
+        lk = dict(winSize=(15, 15), maxLevel=2)
+        nxt, st, _ = cv2.calcOpticalFlowPyrLK(self._prev, gray, self._pts, None, **lk)
+        back, st_back, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev, nxt, None, **lk)
+        # Forward-backward check rejects points that drifted onto the background.
+        fb_err = np.abs(self._pts - back).reshape(-1, 2).max(axis=1)
+        good = (st.ravel() == 1) & (st_back.ravel() == 1) & (fb_err < self.max_fb_error)
+        if int(good.sum()) < self.min_points:
+            self._pts = None
+            return None
+        shift = np.median((nxt[good] - self._pts[good]).reshape(-1, 2), axis=0)
+        x, y, w, h = self._box
+        gh, gw = gray.shape[:2]
+        x = int(min(max(0, x + shift[0]), gw - w))
+        y = int(min(max(0, y + shift[1]), gh - h))
+        self._prev, self._pts, self._box = gray, nxt[good].reshape(-1, 1, 2), (x, y, w, h)
+        return self._box
+
+
+class CvTracker:
+    """Adapter for OpenCV's built-in trackers (KCF, CSRT, MOSSE) to the FlowTracker interface."""
+
+    def __init__(self, name: str):
+        factory = getattr(cv2, f"Tracker{name}_create", None)
+        legacy = getattr(cv2, "legacy", None)
+        if factory is None and legacy is not None:
+            factory = getattr(legacy, f"Tracker{name}_create", None)
+        if factory is None:
+            raise ValueError(f"OpenCV tracker {name} not available in this build (try opencv-contrib-python)")
+        self._factory = factory
+        self._tracker = None
+
+    def init(self, gray, box: Box) -> bool:
+        self._tracker = self._factory()
+        res = self._tracker.init(gray, tuple(int(v) for v in box))
+        return res is None or bool(res)
+
+    def update(self, gray) -> Optional[Box]:
+        if self._tracker is None:
+            return None
+        ok, box = self._tracker.update(gray)
+        if not ok:
+            self._tracker = None
+            return None
+        return tuple(int(v) for v in box)
+
+
+def make_tracker(name: str):
+    name = name.lower()
+    if name == "flow":
+        return FlowTracker()
+    if name in ("kcf", "csrt", "mosse"):
+        return CvTracker(name.upper())
+    raise ValueError(f"Unknown tracker {name}")
+
+
+class DetectThenTrack:
+    """Run the detector every `detect_every` frames (or on tracker loss); track in between."""
+
+    def __init__(self, finder: FaceFinder, tracker, detect_every: int = 5):
+        self.finder = finder
+        self.tracker = tracker
+        self.detect_every = max(1, detect_every)
+        self.source = None  # "detect", "track" or None for the last frame
+        self.detections = 0
+        self.tracked = 0
+        self._box: Optional[Box] = None
+        self._since_detect = 0
+
+    @property
+    def roi(self):
+        return self.finder.roi if self.source == "detect" else None
+
+    def reset(self) -> None:
+        self.finder.reset()
+        self._box = None
+        self._since_detect = 0
+
+    def find(self, frame) -> Optional[Box]:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self._box is not None and self._since_detect < self.detect_every:
+            box = self.tracker.update(gray)
+            self._since_detect += 1
+            if box is not None:
+                self._box = box
+                self.finder.hint(box)
+                self.source = "track"
+                self.tracked += 1
+                return box
+            self._box = None  # lost lock, fall through to a fresh detection
+
+        box = self.finder.find(frame)
+        self.detections += 1
+        if box is None:
+            self.source = None
+            # Keep coasting on the tracker until the detector has missed enough times to give up.
+            if self._box is not None and self.finder.misses < self.finder.max_misses:
+                self._since_detect = self.detect_every - 1
+                self._box = self.tracker.update(gray)
+                if self._box is not None:
+                    self.source = "track"
+                    self.tracked += 1
+                return self._box
+            self._box = None
+            return None
+        self.source = "detect"
+        self._since_detect = 1
+        self._box = box if self.tracker.init(gray, box) else None
+        return box
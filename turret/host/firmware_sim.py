@@ -0,0 +1,396 @@
+"""
+Pseudo-terminal emulator of the turret firmware (turret/src/main.cpp), for running the host
+stack without an Uno attached.
+
+It speaks the same text command set (HELP, SPEED, A/B/C/AB/ABC, TARGET, STOP/S, RESUME/R,
+RELEASE, DEMO) and the 0xA5 binary frames, prints the same READY/OK/ERR lines, and keeps the
+firmware's timing: commands run one at a time from loop(), each loop() pass ends with the
+5 ms idle delay, moves block for |steps| x the Stepper library's step delay (stepAll steps
+the motors one after another), TARGET pauses 1 s, and a 25 ms serial timeout applies to
+partial lines/frames. The Uno's 64-byte RX buffer is modelled too: bytes that arrive while
+it is full are dropped, so over-eager pipelining fails here the way it does on hardware.
+
+    python firmware_sim.py                 # prints the pty path, e.g. /dev/pts/5
+    python stepper_cli.py bench-serial --port /dev/pts/5
+    python stepper_cli.py bench-serial --sim   # spawns the emulator in-process
+
+POSIX only (uses os.openpty).
+"""
+
+import argparse
+import os
+import re
+import threading
+import time
+import tty
+from typing import Dict, Optional
+
+STEPS_PER_REV = 2048  # 28BYJ-48 typical
+A_DIR, B_DIR, C_DIR = -1, 1, 1
+RX_BUFFER = 64  # HardwareSerial RX ring on the Uno
+SERIAL_TIMEOUT = 0.025  # Serial.setTimeout(25)
+IDLE_DELAY = 0.005  # delay(5) at the end of loop()
+
+BIN_SYNC = 0xA5
+BIN_REPLY = 0xA6
+BIN_FRAME_LEN = 9
+OP_A, OP_B, OP_C, OP_AB, OP_ABC = 0x01, 0x02, 0x03, 0x04, 0x05
+OP_SPEED, OP_STOP, OP_RESUME, OP_RELEASE, OP_TARGET, OP_PING = 0x10, 0x11, 0x12, 0x13, 0x14, 0x15
+ST_OK, ST_ERR_CRC, ST_ERR_OP, ST_ERR_ARG, ST_ERR_STOPPED = 0, 1, 2, 3, 4
+
+READY = "READY ULN2003 28BYJ-48 (A:D8-11, B:D4-7, C:D2,D3,D12,D13)"
+HELP_LINES = [
+    "Commands:",
+    " HELP                - show this help",
+    " SPEED <rpm>         - set speed for all motors (RPM)",
+    " A <steps>           - step motor A by N steps",
+    " B <steps>           - step motor B by N steps",
+    " C <steps>           - step motor C by N steps",
+    " AB <a> <b>          - step A=a, B=b steps",
+    " ABC <a> <b> <c>     - step A=a, B=b, C=c steps",
+    " TARGET              - camera-aim macro: C-150, wait, C+150",
+    " S | STOP            - stop + release coils",
+    " R | RESUME          - resume motion",
+    " RELEASE             - release coils (no hold)",
+    " DEMO ON|OFF         - toggle demo sweep mode",
+    " 0xA5 frame          - binary command (see BIN_SYNC in main.cpp)",
+]
+
+_LONG_RE = re.compile(r"\s*([+-]?\d+)")
+
+
+def crc8(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def parse_long(tok: str) -> Optional[int]:
+    """strtol() as used by parseLong(): leading digits count, trailing junk is ignored."""
+    m = _LONG_RE.match(tok[:23])
+    return int(m.group(1)) if m else None
+
+
+def step_delay(rpm: int) -> float:
+    """Stepper::setSpeed() step delay in seconds (integer microseconds, as on the AVR)."""
+    return (60 * 1000 * 1000 // STEPS_PER_REV // rpm) / 1e6
+
+
+class FirmwareSim:
+    def __init__(self, rpm: int = 12, time_scale: float = 1.0, rx_buffer: int = RX_BUFFER, trace: bool = False):
+        """time_scale < 1 runs the firmware's delays faster than real time (0 = no delays)."""
+        self.time_scale = time_scale
+        self.rx_buffer = rx_buffer
+        self.trace = trace
+        self.delay = step_delay(rpm)
+        self.enabled = True
+        self.demo_mode = False
+        self.steps: Dict[str, int] = {"A": 0, "B": 0, "C": 0}  # net commanded steps, host sign convention
+        self.stats = {"commands": 0, "frames": 0, "overrun_bytes": 0, "busy_s": 0.0}
+        self.port: Optional[str] = None
+        self._master = self._slave = -1
+        self._rx = bytearray()
+        self._rx_cond = threading.Condition()
+        self._running = threading.Event()
+        self._threads = []
+
+    # -- pty plumbing -------------------------------------------------------
+    def start(self) -> "FirmwareSim":
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)  # no echo / line discipline, like a real USB-serial port
+        self.port = os.ttyname(self._slave)
+        self._running.set()
+        for target, name in ((self._rx_loop, "sim-uart"), (self._main_loop, "sim-loop")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def close(self) -> None:
+        self._running.clear()
+        with self._rx_cond:
+            self._rx_cond.notify_all()
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        for t in self._threads:
+            t.join(timeout=1.0)
+
+    def _rx_loop(self) -> None:
+        # The UART ISR: fill the RX ring as bytes arrive, drop them when it's full.
+        while self._running.is_set():
+            try:
+                data = os.read(self._master, 1024)
+            except OSError:
+                break
+            if not data:
+                continue
+            with self._rx_cond:
+                room = len(data) if self.rx_buffer <= 0 else max(0, self.rx_buffer - len(self._rx))
+                self._rx += data[:room]
+                if room < len(data):
+                    self.stats["overrun_bytes"] += len(data) - room
+                    self._log(f"RX overrun, dropped {len(data) - room} bytes")
+                self._rx_cond.notify_all()
+
+    def _write(self, data: bytes) -> None:
+        try:
+            os.write(self._master, data)
+        except OSError:
+            pass
+
+    def _println(self, text: str) -> None:
+        self._write(text.encode() + b"\r\n")  # Serial.println ends lines with CRLF
+
+    def _sleep(self, seconds: float) -> None:
+        if seconds > 0 and self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def _log(self, text: str) -> None:
+        if self.trace:
+            print(f"[SIM] {time.strftime('%H:%M:%S')} {text}")
+
+    # -- Serial API as used by the sketch -------------------------------------
+    def _available(self) -> int:
+        with self._rx_cond:
+            return len(self._rx)
+
+    def _read_byte(self, timeout: float = SERIAL_TIMEOUT) -> Optional[int]:
+        """Stream::timedRead()"""
+        with self._rx_cond:
+            if not self._rx_cond.wait_for(lambda: self._rx or not self._running.is_set(), timeout=timeout):
+                return None
+            if not self._rx:
+                return None
+            b = self._rx[0]
+            del self._rx[0]
+            return b
+
+    def _read_line(self) -> str:
+        """Serial.readStringUntil('\\n')"""
+        out = bytearray()
+        while True:
+            b = self._read_byte()
+            if b is None or b == 0x0A:
+                return out.decode(errors="ignore")
+            out.append(b)
+
+    # -- sketch behaviour -----------------------------------------------------
+    def _step_motor(self, axis: str, steps: int) -> None:
+        if not self.enabled:
+            return  # stepMotor() releases the coils and returns straight away
+        self._busy(abs(steps) * self.delay)
+        self.steps[axis] += steps
+
+    def _step_all(self, a: int, b: int, c: int) -> None:
+        if not self.enabled:
+            return
+        # One Stepper::step() per active motor per pass, each a full step delay.
+        self._busy((abs(a) + abs(b) + abs(c)) * self.delay)
+        self.steps["A"] += a
+        self.steps["B"] += b
+        self.steps["C"] += c
+
+    def _busy(self, seconds: float) -> None:
+        self.stats["busy_s"] += seconds
+        self._sleep(seconds)
+
+    def _target(self) -> None:
+        self._step_motor("C", -150)
+        self._sleep(1.0)
+        self._step_motor("C", 150)
+
+    def _set_speed(self, rpm: int) -> None:
+        self.delay = step_delay(rpm)
+
+    def _main_loop(self) -> None:
+        self._println(READY)
+        for line in HELP_LINES:
+            self._println(line)
+        while self._running.is_set():
+            if self._available():
+                with self._rx_cond:
+                    sync = self._rx[0] == BIN_SYNC
+                if sync:
+                    self._handle_binary_frame()
+                else:
+                    line = self._read_line().strip()
+                    if line:
+                        self.stats["commands"] += 1
+                        t0 = time.perf_counter()
+                        reply = self._handle_line(line)
+                        self._log(f"{line!r} -> {reply!r} in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+            if not self.enabled:
+                self._sleep(0.002)
+                continue
+            if self.demo_mode:
+                self._step_all(STEPS_PER_REV, STEPS_PER_REV, STEPS_PER_REV)
+                self._sleep(0.25)
+                self._step_all(-STEPS_PER_REV, -STEPS_PER_REV, -STEPS_PER_REV)
+                self._sleep(0.25)
+            elif self.time_scale > 0:
+                self._sleep(IDLE_DELAY)
+            else:
+                with self._rx_cond:  # unthrottled: don't spin while idle
+                    self._rx_cond.wait_for(lambda: self._rx or not self._running.is_set(), timeout=0.05)
+
+    def _handle_line(self, line: str) -> Optional[str]:
+        sp = line.find(" ")
+        cmd = (line[:sp] if sp >= 0 else line).upper()
+        rest = line[sp + 1:] if sp >= 0 else ""
+        reply: Optional[str]
+
+        if cmd in ("HELP", "H", "?"):
+            for text in HELP_LINES:
+                self._println(text)
+            return None
+        if cmd in ("S", "STOP"):
+            self.enabled = False
+            reply = "OK STOP"
+        elif cmd in ("R", "RESUME"):
+            self.enabled = True
+            reply = "OK RESUME"
+        elif cmd == "RELEASE":
+            reply = "OK RELEASE"
+        elif cmd == "SPEED":
+            rpm = parse_long(rest)
+            if rpm is not None and rpm > 0:
+                self._set_speed(rpm)
+                reply = "OK SPEED"
+            else:
+                reply = "ERR SPEED"
+        elif cmd in ("A", "B", "C"):
+            n = parse_long(rest)
+            if n is not None:
+                self._step_motor(cmd, n)
+                reply = f"OK {cmd}"
+            else:
+                reply = f"ERR {cmd}"
+        elif cmd == "AB":
+            rest = rest.strip()
+            sp2 = rest.find(" ")
+            a = parse_long(rest[:sp2]) if sp2 >= 0 else None
+            b = parse_long(rest[sp2 + 1:].strip()) if sp2 >= 0 else None
+            if a is not None and b is not None:
+                self._step_all(a, b, 0)
+                reply = "OK AB"
+            else:
+                reply = "ERR AB"
+        elif cmd == "ABC":
+            rest = rest.strip()
+            sp1 = rest.find(" ")
+            sp2 = rest.find(" ", sp1 + 1) if sp1 >= 0 else -1
+            vals = None
+            if sp1 >= 0 and sp2 >= 0:
+                vals = (parse_long(rest[:sp1]), parse_long(rest[sp1 + 1:sp2].strip()), parse_long(rest[sp2 + 1:].strip()))
+            if vals and None not in vals:
+                self._step_all(*vals)
+                reply = "OK ABC"
+            else:
+                reply = "ERR ABC"
+        elif cmd == "DEMO":
+            rest = rest.strip()
+            if rest.upper() == "ON" or rest == "1":
+                self.demo_mode = True
+            elif rest.upper() == "OFF" or rest == "0":
+                self.demo_mode = False
+            else:
+                self.demo_mode = not self.demo_mode
+            reply = "OK DEMO ON" if self.demo_mode else "OK DEMO OFF"
+        elif cmd == "TARGET":
+            if not self.enabled:
+                reply = "ERR TARGET STOPPED"
+            else:
+                self._target()
+                reply = "OK TARGET"
+        else:
+            reply = "ERR UNKNOWN"
+        self._println(reply)
+        return reply
+
+    def _handle_binary_frame(self) -> None:
+        self._read_byte()  # sync
+        buf = bytearray()
+        while len(buf) < BIN_FRAME_LEN:
+            b = self._read_byte()
+            if b is None:
+                self._log(f"truncated frame ({len(buf)} bytes)")
+                return  # host will time out
+            buf.append(b)
+        self.stats["frames"] += 1
+        op, seq = buf[0], buf[1]
+        if crc8(bytes(buf[:BIN_FRAME_LEN - 1])) != buf[BIN_FRAME_LEN - 1]:
+            return self._bin_reply(seq, ST_ERR_CRC)
+        a, b, c = (int.from_bytes(buf[i:i + 2], "little", signed=True) for i in (2, 4, 6))
+        if op == OP_A:
+            self._step_motor("A", a)
+        elif op == OP_B:
+            self._step_motor("B", b)
+        elif op == OP_C:
+            self._step_motor("C", c)
+        elif op == OP_AB:
+            self._step_all(a, b, 0)
+        elif op == OP_ABC:
+            self._step_all(a, b, c)
+        elif op == OP_SPEED:
+            if a <= 0:
+                return self._bin_reply(seq, ST_ERR_ARG)
+            self._set_speed(a)
+        elif op == OP_STOP:
+            self.enabled = False
+        elif op == OP_RESUME:
+            self.enabled = True
+        elif op in (OP_RELEASE, OP_PING):
+            pass
+        elif op == OP_TARGET:
+            if not self.enabled:
+                return self._bin_reply(seq, ST_ERR_STOPPED)
+            self._target()
+        else:
+            return self._bin_reply(seq, ST_ERR_OP)
+        self._bin_reply(seq, ST_OK)
+
+    def _bin_reply(self, seq: int, status: int) -> None:
+        self._log(f"frame seq={seq} -> status {status}")
+        self._write(bytes([BIN_REPLY, seq, status, crc8(bytes([seq, status]))]))
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Emulate the turret firmware on a pseudo-terminal")
+    p.add_argument("--rpm", type=int, default=12, help="Initial motor speed, as set in setup() (default 12)")
+    p.add_argument("--time-scale", type=float, default=1.0,
+                   help="Multiply firmware delays by this (0 = instant moves, default 1 = real time)")
+    p.add_argument("--rx-buffer", type=int, default=RX_BUFFER,
+                   help="Serial RX buffer size in bytes, 0 = unlimited (default 64, as on the Uno)")
+    p.add_argument("--link", default=None, help="Also expose the pty under this path (symlink), e.g. /tmp/ttyTURRET")
+    p.add_argument("--trace", action="store_true", help="Log every command with its simulated duration")
+    ns = p.parse_args(argv)
+
+    sim = FirmwareSim(rpm=ns.rpm, time_scale=ns.time_scale, rx_buffer=ns.rx_buffer, trace=ns.trace).start()
+    if ns.link:
+        if os.path.islink(ns.link):
+            os.remove(ns.link)
+        os.symlink(sim.port, ns.link)
+    print(f"[SIM] turret firmware on {sim.port}" + (f" ({ns.link})" if ns.link else ""))
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.close()
+        if ns.link and os.path.islink(ns.link):
+            os.remove(ns.link)
+        print(f"[SIM] {sim.stats['commands']} commands, {sim.stats['frames']} frames, "
+              f"{sim.stats['overrun_bytes']} bytes lost to RX overrun; net steps {sim.steps}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
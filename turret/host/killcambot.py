@@ -1,6 +1,14 @@
+import argparse
 import asyncio
-from telegram import Bot 
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from telegram import Bot
+from telegram.error import NetworkError, RetryAfter
+from telegram.request import HTTPXRequest
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 '''
     Prerequisites: python-telegram-bot
     Install using: pip install python-telegram-bot
@@ -8,60 +16,220 @@ from pathlib import Path
 '''
     To use:
     Import this function using "from killcambot.py import *"
-    Call the function: send_video_to_subscribers("poop.mp4", "caption") 
-    This function assumes all videos are stored in the same folder as the script 
+    Call the function: send_video_to_subscribers("poop.mp4", "caption")
+    This function assumes all videos are stored in the same folder as the script
 '''
 
-async def _async_send_video_core(video_filename: str, caption: str = None):
-    # Configuration stuff
-    TELEGRAM_BOT_TOKEN = "7954230057:AAHpn8-TH2Ftn45yBweE3zGQ93PNPTCt56s"
-    VIDEO_FOLDER = Path(__file__).resolve().parent 
-    # VIDEO_FOLDER = Path('C:\\example\\'))
-    # Use the option above if you want to specify an absolute path
-
-
-    SUBSCRIBER_CHAT_IDS = [
-        '-1003472830495', # join this group using https://t.me/+iwu9Y1COVo40NDU1
-        # you can add more to this list
-    ]
-
-    # Actual shit starts below
-    video_path = VIDEO_FOLDER / video_filename
-    
-    if not video_path.is_file():
-        print(f"Are you sure the video is at: {video_path}")
-        return
-
-    bot = Bot(token=TELEGRAM_BOT_TOKEN)
-
-    print(f"Uploading video '{video_filename}'")
-
-    # Open the video file once for reading
-    with open(video_path, 'rb') as video_file:
-        for chat_id in SUBSCRIBER_CHAT_IDS:
-            try:
-                video_file.seek(0)
-                
-                await bot.send_video(
-                    chat_id=chat_id,
-                    video=video_file,
-                    caption=caption,
-                    read_timeout=60, # Increase timeout for large files
-                    write_timeout=60, # as above
-                )
-                print(f"Successfully sent {video_filename}")
-                await asyncio.sleep(1) 
-
-            except Exception as e:
-                print(f"Failed to send to chat ID {chat_id}. Error: {e}")
-                
-    print("Video sending process complete.")
+# Configuration stuff
+TELEGRAM_BOT_TOKEN = "7954230057:AAHpn8-TH2Ftn45yBweE3zGQ93PNPTCt56s"
+# Point this at telegram_stub.py (e.g. http://127.0.0.1:8081/bot) to test without Telegram
+TELEGRAM_API_URL = os.environ.get("KILLCAM_API_URL", "https://api.telegram.org/bot")
+VIDEO_FOLDER = Path(__file__).resolve().parent
+# VIDEO_FOLDER = Path('C:\\example\\'))
+# Use the option above if you want to specify an absolute path
+
+
+SUBSCRIBER_CHAT_IDS = [
+    '-1003472830495', # join this group using https://t.me/+iwu9Y1COVo40NDU1
+    # you can add more to this list
+]
+
+# Telegram allows ~30 messages/s per bot; stay under it when fanning out.
+MAX_SENDS_PER_SEC = 25.0
+MAX_CONCURRENT_SENDS = 8
+# Upper bound on one send() (upload plus fan-out, retries included) before the caller gives up.
+SEND_TIMEOUT = 300.0
+
+
+class _RateLimiter:
+    """Spaces out calls to at most `rate` per second (must be used from the sender's loop)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+class VideoSender:
+    """
+    Long-lived Telegram sender: one event loop thread and one Bot/HTTP session for the whole run.
+    Each clip is uploaded once; every other chat gets it by file_id, concurrently and rate limited.
+    """
+
+    def __init__(self, token: str = TELEGRAM_BOT_TOKEN, base_url: str = TELEGRAM_API_URL,
+                 rate: float = MAX_SENDS_PER_SEC, concurrency: int = MAX_CONCURRENT_SENDS,
+                 retry_backoff: float = 1.0):
+        self.token = token
+        self.base_url = base_url
+        self.rate = rate
+        self.concurrency = concurrency
+        self.retry_backoff = retry_backoff  # first wait after a network error or 5xx; doubles per attempt
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="killcam-sender", daemon=True)
+        self._thread.start()
+        self._bot: Optional[Bot] = None
+        self._limiter: Optional[_RateLimiter] = None
+        self._gate: Optional[asyncio.Semaphore] = None
+        self._file_ids: Dict[Tuple[str, float], str] = {}  # (path, mtime) -> Telegram file_id
+
+    def send(self, video_path, caption: str = None, chat_ids: Optional[Iterable[str]] = None,
+             timeout: float = SEND_TIMEOUT) -> List[str]:
+        """
+        Blocking send from any thread; returns the chat IDs that received the video.
+        Raises TimeoutError (and abandons the send) if it takes longer than `timeout` seconds.
+        """
+        chat_ids = list(SUBSCRIBER_CHAT_IDS if chat_ids is None else chat_ids)
+        fut = asyncio.run_coroutine_threadsafe(self._send(Path(video_path), caption, chat_ids), self._loop)
+        try:
+            return fut.result(timeout)
+        except FutureTimeout:
+            fut.cancel()
+            raise TimeoutError(f"sending {Path(video_path).name} took over {timeout:.0f}s") from None
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        if self._bot is not None:
+            asyncio.run_coroutine_threadsafe(self._bot.shutdown(), self._loop).result(10)
+            self._bot = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2.0)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+    async def _ensure_bot(self) -> Bot:
+        if self._bot is None:
+            # The default pool holds a single connection, which would serialise the fan-out.
+            request = HTTPXRequest(connection_pool_size=self.concurrency + 1,
+                                   read_timeout=60, write_timeout=60) # generous for large uploads
+            bot = Bot(token=self.token, base_url=self.base_url, request=request)
+            await bot.initialize()
+            self._bot = bot
+            self._limiter = _RateLimiter(self.rate)
+            self._gate = asyncio.Semaphore(self.concurrency)
+        return self._bot
+
+    async def _send(self, video_path: Path, caption: Optional[str], chat_ids: List[str]) -> List[str]:
+        if not video_path.is_file():
+            print(f"Are you sure the video is at: {video_path}")
+            return []
+        bot = await self._ensure_bot()
+        key = (str(video_path), video_path.stat().st_mtime)
+        delivered: List[str] = []
+        pending = list(chat_ids)
+        file_id = self._file_ids.get(key)
+
+        # Upload the bytes once, to the first chat that accepts them.
+        while file_id is None and pending:
+            chat_id = pending.pop(0)
+            print(f"Uploading video '{video_path.name}'")
+            msg = await self._call(chat_id, lambda f, c=chat_id: bot.send_video(chat_id=c, video=f, caption=caption),
+                                   video_path)
+            if msg is None:
+                continue
+            delivered.append(chat_id)
+            media = msg.video or msg.document or msg.animation
+            if media is not None:
+                file_id = self._file_ids[key] = media.file_id
+
+        if file_id is not None and pending:
+            results = await asyncio.gather(*(
+                self._call(c, lambda c=c: bot.send_video(chat_id=c, video=file_id, caption=caption))
+                for c in pending
+            ))
+            delivered.extend(c for c, msg in zip(pending, results) if msg is not None)
+        elif pending:
+            # No file_id came back (odd API response); fall back to uploading to each chat.
+            results = await asyncio.gather(*(
+                self._call(c, lambda f, c=c: bot.send_video(chat_id=c, video=f, caption=caption), video_path)
+                for c in pending
+            ))
+            delivered.extend(c for c, msg in zip(pending, results) if msg is not None)
+        print(f"Video sending process complete ({len(delivered)}/{len(chat_ids)} chats).")
+        return delivered
+
+    async def _call(self, chat_id: str, make_request, upload: Optional[Path] = None, attempts: int = 3):
+        """
+        Run one send under the rate limit and concurrency cap. Telegram's RetryAfter is honoured;
+        network errors and 5xx replies (NetworkError) are retried with exponential backoff.
+        """
+        for attempt in range(attempts):
+            async with self._gate:
+                await self._limiter.wait()
+                try:
+                    if upload is not None:
+                        with open(upload, 'rb') as video_file:
+                            msg = await make_request(video_file)
+                    else:
+                        msg = await make_request()
+                    print(f"Successfully sent to {chat_id}")
+                    return msg
+                except RetryAfter as e:
+                    delay = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                    print(f"Rate limited on {chat_id}; retrying in {delay}s")
+                except NetworkError as e:
+                    delay = self.retry_backoff * (2 ** attempt)
+                    print(f"Network error sending to {chat_id} ({e}); retrying in {delay:.1f}s")
+                except Exception as e:
+                    print(f"Failed to send to chat ID {chat_id}. Error: {e}")
+                    return None
+            await asyncio.sleep(delay)
+        return None
+
+
+_sender: Optional[VideoSender] = None
+_sender_lock = threading.Lock()
+
+
+def get_sender() -> VideoSender:
+    """Process-wide sender, created on first use."""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = VideoSender()
+        return _sender
+
+
+def deliver_video(video_filename: str, caption: str = None, chat_ids: Optional[Iterable[str]] = None) -> List[str]:
+    """Blocking send to the given (default: all) subscribers; returns the chat IDs that succeeded."""
+    return get_sender().send(VIDEO_FOLDER / video_filename, caption, chat_ids)
 
 
 def send_video_to_subscribers(video_filename: str, caption: str = None):
     print("[STATUS] Delivering video to your Telegram channel")
     try:
-        asyncio.run(_async_send_video_core(video_filename, caption))
+        deliver_video(video_filename, caption)
     except Exception as e:
         print(f"{e}")
 
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Send a clip to kill-cam subscribers and time the delivery")
+    p.add_argument("video", help="Video file to send")
+    p.add_argument("--caption", default=None)
+    p.add_argument("--api", default=TELEGRAM_API_URL, help="Bot API base URL (e.g. http://127.0.0.1:8081/bot for the stub)")
+    p.add_argument("--chats", default=None, help="Comma-separated chat IDs (default: SUBSCRIBER_CHAT_IDS)")
+    p.add_argument("--repeat", type=int, default=1, help="Send the clip this many times to show warm-session timing")
+    ns = p.parse_args(argv)
+
+    chats = ns.chats.split(",") if ns.chats else None
+    sender = VideoSender(base_url=ns.api)
+    try:
+        for i in range(ns.repeat):
+            t0 = time.perf_counter()
+            delivered = sender.send(Path(ns.video).resolve(), ns.caption, chats)
+            print(f"[KILLCAM] send {i + 1}: {len(delivered)} chats in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    finally:
+        sender.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,13 +1,24 @@
 import argparse
+import importlib.util
 import os
-import socket
+import struct
 import sys
 import threading
 import time
-from datetime import datetime
-from typing import Optional
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 
-from killcambot import send_video_to_subscribers  # local helper to push recorded clips
+from aim_control import PanTiltController
+import camera_manager
+from clip_recorder import FrameRing, open_writer, record_from_ring
+from event_server import EventServer, FireQueue
+from face_detect import (DETECTORS, DetectThenTrack, FaceFinder, bench_detectors, make_detector, make_tracker,
+                         percentile)
+from clip_queue import DEFAULT_SPOOL, ClipQueue
+from synthetic_cam import SpriteDetector, open_source
+from killcambot import SUBSCRIBER_CHAT_IDS, deliver_video, send_video_to_subscribers  # local helper to push recorded clips
+from turret_position import DEFAULT_PATH as POSITION_PATH, PositionModel
 
 try:
     import cv2
@@ -21,90 +32,478 @@ except ImportError:  # pragma: no cover
     sys.exit(1)
 
 
+def _load_instrument():
+    """
+    Metrics/tracing come from the gateway's instrument.py. Load that one file by path
+    (SMG_INSTRUMENT, default payment/gateway/instrument.py in this checkout) rather than
+    putting the whole gateway directory on sys.path; a host without the payment tree can
+    point SMG_INSTRUMENT at a copy or install it as a plain `instrument` module.
+    """
+    path = os.environ.get("SMG_INSTRUMENT") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "payment", "gateway", "instrument.py")
+    if "instrument" in sys.modules or not os.path.isfile(path):
+        import instrument
+        return instrument
+    spec = importlib.util.spec_from_file_location("instrument", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["instrument"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+instrument = _load_instrument()
+
+
+# Binary framed protocol, mirroring BIN_SYNC/BinOp/BinStatus in turret/src/main.cpp.
+# Command: [0xA5, opcode, seq, a:int16le, b:int16le, c:int16le, crc8(opcode..c)]
+# Reply:   [0xA6, seq, status, crc8(seq, status)]
+BIN_SYNC = 0xA5
+BIN_REPLY = 0xA6
+BIN_REPLY_LEN = 4
+BIN_OPS = {"A": 0x01, "B": 0x02, "C": 0x03, "AB": 0x04, "ABC": 0x05,
+           "SPEED": 0x10, "STOP": 0x11, "RESUME": 0x12, "RELEASE": 0x13, "TARGET": 0x14, "PING": 0x15}
+BIN_ALIASES = {"S": "STOP", "R": "RESUME"}
+BIN_ARGS = {"A": ("a",), "B": ("b",), "C": ("c",), "AB": ("a", "b"), "ABC": ("a", "b", "c"), "SPEED": ("a",)}
+BIN_STATUS = {0: "OK", 1: "CRC", 2: "UNKNOWN", 3: "ARG", 4: "STOPPED"}
+_I16_MIN, _I16_MAX = -32768, 32767
+
+
+def crc8(data: bytes) -> int:
+    """CRC-8, polynomial 0x07, init 0 (same as the firmware)."""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def encode_frame(opcode: int, seq: int, a: int = 0, b: int = 0, c: int = 0) -> bytes:
+    body = struct.pack("<BBhhh", opcode, seq & 0xFF, a, b, c)
+    return bytes([BIN_SYNC]) + body + bytes([crc8(body)])
+
+
+def decode_reply(frame: bytes) -> Tuple[int, int]:
+    """Returns (seq, status) for a 4-byte reply frame; raises ValueError if it's malformed."""
+    if len(frame) != BIN_REPLY_LEN or frame[0] != BIN_REPLY:
+        raise ValueError(f"not a reply frame: {frame.hex()}")
+    if crc8(frame[1:3]) != frame[3]:
+        raise ValueError(f"reply CRC mismatch: {frame.hex()}")
+    return frame[1], frame[2]
+
+
+def encode_command(line: str, seq: int) -> Optional[Tuple[bytes, str]]:
+    """
+    Translate an ASCII command line into a binary frame; returns (frame, command name),
+    or None if the command has no binary form (HELP, DEMO) or its arguments don't fit.
+    """
+    toks = line.split()
+    if not toks:
+        return None
+    name = BIN_ALIASES.get(toks[0].upper(), toks[0].upper())
+    if name not in BIN_OPS:
+        return None
+    slots = BIN_ARGS.get(name, ())
+    if len(toks) - 1 != len(slots):
+        return None
+    try:
+        vals = {slot: int(tok) for slot, tok in zip(slots, toks[1:])}
+    except ValueError:
+        return None
+    if any(not _I16_MIN <= v <= _I16_MAX for v in vals.values()):
+        return None
+    return encode_frame(BIN_OPS[name], seq, vals.get("a", 0), vals.get("b", 0), vals.get("c", 0)), name
+
+
 class StepperClient:
-    def __init__(self, port: str = "COM5", baud: int = 115200, timeout: float = 10.0, verbose: bool = False):
+    """
+    Serial client for the turret firmware.
+
+    A background reader thread owns the input side of the port. Commands are written
+    in order and each gets a Future that resolves with the matching OK/ERR reply (the
+    firmware answers strictly in order), so several commands can be in flight at once.
+    Lines that aren't replies (READY banner, HELP text, debug output) go to a log.
+
+    With a PositionModel attached, A/B moves are clamped to its soft limits and
+    counted, and goto() moves to absolute step positions.
+
+    move_ab() is the non-blocking way to aim: corrections requested while an AB move is
+    still executing are merged and only the net delta is sent once the firmware ACKs.
+
+    protocol="binary" sends commands as CRC-checked binary frames matched to replies by
+    sequence id (needs the matching firmware); commands without a binary form (HELP,
+    DEMO) still go out as text. Replies are reported as the same "OK X"/"ERR X" strings.
+    """
+
+    LOG_SIZE = 200
+    RESYNC_QUIET = 0.2  # s to let late replies drain after a lost one
+
+    def __init__(self, port: str = "COM5", baud: int = 115200, timeout: float = 10.0, verbose: bool = False,
+                 max_inflight: int = 4, position: Optional[PositionModel] = None, protocol: str = "ascii"):
+        if protocol not in ("ascii", "binary"):
+            raise ValueError(f"unknown protocol {protocol}")
+        self.protocol = protocol
         self.verbose = verbose
+        self.position = position
         self.timeout = timeout
-        self._lock = threading.Lock()
-        self.ser = serial.Serial(port=port, baudrate=baud, timeout=timeout, write_timeout=timeout)
+        # Uno's RX buffer is 64 bytes; a handful of queued commands fits comfortably.
+        self.max_inflight = max(1, max_inflight)
+        self._write_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending: Deque[Future] = deque()  # ASCII replies arrive in command order
+        self._bin_pending: Dict[int, Tuple[Future, str]] = {}  # binary replies carry their seq
+        self._seq = 0
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        self._log_cond = threading.Condition()
+        self._log: Deque[Tuple[int, float, str]] = deque(maxlen=self.LOG_SIZE)
+        self._log_seq = 0
+        self._closed = threading.Event()
+        self._motion_cond = threading.Condition()
+        self._queued_move: Optional[Tuple[int, int]] = None
+        self._motion_thread: Optional[threading.Thread] = None
+        self.move_busy = False
+        self.last_move_done = 0.0
+        self.motion_stats = {"requested": 0, "sent": 0, "coalesced": 0, "failed": 0}
+        self.on_move_done: Optional[Callable[[int, int, str], None]] = None
+        self.ser = serial.Serial(port=port, baudrate=baud, timeout=0.1, write_timeout=timeout)
         time.sleep(2.0)  # allow Uno reset
         self.ser.reset_input_buffer()
-        t0 = time.time()
-        while time.time() - t0 < 1.0:
-            line = self.ser.readline().decode(errors="ignore").strip()
-            if not line:
-                break
-            if self.verbose:
-                print(f"< {line}")
+        self._reader = threading.Thread(target=self._read_loop, name="stepper-reader", daemon=True)
+        self._reader.start()
 
     def close(self):
+        self._closed.set()
+        with self._motion_cond:
+            self._motion_cond.notify_all()
         try:
             self.ser.close()
         except Exception:
             pass
+        self._reader.join(timeout=1.0)
+        self._fail_pending(ConnectionError("serial port closed"))
+        if self.position is not None:
+            self.position.save(force=True)
 
-    def _send(self, line: str) -> str:
-        with self._lock:
-            if not line.endswith("\n"):
-                line += "\n"
-            if self.verbose:
-                print(f"> {line.rstrip()}")
-            self.ser.reset_input_buffer()
-            self.ser.write(line.encode("ascii"))
-            self.ser.flush()
-            end = time.time() + self.timeout
-            resp = ""
-            while time.time() < end:
-                r = self.ser.readline().decode(errors="ignore").strip()
-                if not r:
+    def _fail_pending(self, exc: Exception) -> None:
+        with self._pending_lock:
+            pending, self._pending = list(self._pending), deque()
+            pending += [fut for fut, _ in self._bin_pending.values()]
+            self._bin_pending = {}
+        for fut in pending:
+            self._slots.release()
+            if not fut.done():
+                fut.set_exception(exc)
+
+    def _read_loop(self) -> None:
+        buf = bytearray()
+        while not self._closed.is_set():
+            try:
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                if not self._closed.is_set():
+                    print(f"[SERIAL] reader stopped: {e}")
+                    self._fail_pending(ConnectionError(str(e)))
+                break
+            if chunk:
+                buf += chunk
+                self._parse(buf)
+
+    def _parse(self, buf: bytearray) -> None:
+        """Split the input stream into text lines and binary reply frames (consumed from buf)."""
+        while buf:
+            if buf[0] == BIN_REPLY:
+                if len(buf) < BIN_REPLY_LEN:
+                    return
+                frame = bytes(buf[:BIN_REPLY_LEN])
+                del buf[:BIN_REPLY_LEN]
+                try:
+                    seq, status = decode_reply(frame)
+                except ValueError as e:
+                    self._on_unsolicited(f"[bad reply] {e}")
                     continue
-                if r.startswith("READY") or r.startswith("Commands:"):
+                self._dispatch_binary(seq, status)
+                continue
+            end = buf.find(b"\n")
+            sync = buf.find(bytes([BIN_REPLY]))
+            if sync != -1 and (end == -1 or sync < end):
+                end = sync  # firmware only emits whole lines, so this is a line without its newline
+            if end == -1:
+                return
+            line = buf[:end].decode(errors="ignore").rstrip()  # keep HELP indentation
+            del buf[:end + 1 if buf[end:end + 1] == b"\n" else end]
+            if line.strip():
+                self._dispatch(line)
+
+    def _dispatch_binary(self, seq: int, status: int) -> None:
+        with self._pending_lock:
+            entry = self._bin_pending.pop(seq, None)
+        if entry is None:
+            self._on_unsolicited(f"[stray reply] seq={seq} status={status}")
+            return
+        fut, name = entry
+        self._slots.release()
+        text = f"OK {name}" if status == 0 else f"ERR {name} {BIN_STATUS.get(status, status)}"
+        if self.verbose:
+            print(f"< {text} (seq {seq})")
+        if not fut.done():
+            fut.set_result(text)
+
+    def _dispatch(self, line: str) -> None:
+        if line.startswith("OK") or line.startswith("ERR"):
+            with self._pending_lock:
+                fut = self._pending.popleft() if self._pending else None
+            if fut is not None:
+                self._slots.release()
+                if self.verbose:
+                    print(f"< {line}")
+                if not fut.done():  # caller may have given up (cancelled) already
+                    fut.set_result(line)
+                return
+        self._on_unsolicited(line)
+
+    def _on_unsolicited(self, line: str) -> None:
+        with self._log_cond:
+            self._log_seq += 1
+            self._log.append((self._log_seq, time.time(), line))
+            self._log_cond.notify_all()
+        if self.verbose:
+            print(f"< {line}")
+
+    def recent_log(self) -> List[str]:
+        """Unsolicited firmware lines seen so far (most recent last)."""
+        with self._log_cond:
+            return [line for _, _, line in self._log]
+
+    def _write(self, line: str, data: Optional[bytes] = None) -> None:
+        if self.verbose:
+            print(f"> {line}" + (f" [{data.hex()}]" if data else ""))
+        self.ser.write(data if data is not None else (line + "\n").encode("ascii"))
+        self.ser.flush()
+
+    def submit(self, line: str) -> Future:
+        """Send a command without waiting; the Future resolves with its OK/ERR reply line."""
+        line = line.strip()
+        fut: Future = Future()
+        if not self._slots.acquire(timeout=self.timeout):
+            fut.set_exception(TimeoutError(f"{self.max_inflight} commands already in flight"))
+            return fut
+        with self._write_lock:
+            encoded = encode_command(line, self._seq) if self.protocol == "binary" else None
+            seq = self._seq
+            with self._pending_lock:
+                if encoded:
+                    self._seq = (self._seq + 1) & 0xFF
+                    self._bin_pending[seq] = (fut, encoded[1])
+                else:
+                    self._pending.append(fut)
+            try:
+                self._write(line, encoded[0] if encoded else None)
+            except Exception as e:
+                self._forget(fut)
+                fut.set_exception(e)
+        return fut
+
+    def _forget(self, fut: Future) -> None:
+        """Drop a command we no longer expect an answer for and free its in-flight slot."""
+        with self._pending_lock:
+            if fut in self._pending:
+                self._pending.remove(fut)
+            else:
+                seqs = [seq for seq, (f, _) in self._bin_pending.items() if f is fut]
+                if not seqs:
+                    return
+                del self._bin_pending[seqs[0]]
+        self._slots.release()
+
+    def _send(self, line: str) -> str:
+        """Send a command and wait for its reply; returns "" on timeout."""
+        if line.strip().upper() in ("HELP", "H", "?"):
+            return self.help()
+        fut = self.submit(line)
+        try:
+            resp = fut.result(timeout=self.timeout)
+        except FutureTimeout:
+            fut.cancel()
+            with self._pending_lock:
+                lost_ascii = fut in self._pending
+            if lost_ascii:
+                self._resync(line)
+            else:
+                self._forget(fut)  # a lost/corrupted binary reply would otherwise pin a slot forever
+            return ""
+        return resp
+
+    def _resync(self, line: str) -> None:
+        """
+        Recover from an ASCII reply that never came. Replies carry no id, so every command
+        still waiting would now be answered one reply late: fail them all (their _send()
+        returns "" as on a timeout), let stragglers arrive as log lines while nothing is
+        pending and no new command can be written, then drop whatever is left unread.
+        """
+        with self._write_lock:
+            with self._pending_lock:
+                pending, self._pending = list(self._pending), deque()
+            failed = 0
+            for fut in pending:
+                self._slots.release()
+                if not fut.done():
+                    fut.set_exception(FutureTimeout(f"dropped by resync after no reply to {line!r}"))
+                    failed += 1
+            time.sleep(self.RESYNC_QUIET)
+            try:
+                self.ser.reset_input_buffer()
+            except Exception:
+                pass
+        print(f"[SERIAL] no reply to {line!r}; resynced, {failed} queued command(s) failed")
+
+    def move_ab(self, a_steps: int, b_steps: int, merge: str = "sum") -> None:
+        """
+        Queue a pan/tilt correction without blocking.
+
+        If a move is already executing, the request is merged with anything else queued:
+        merge="sum" accumulates the deltas, merge="latest" keeps only the newest one (for
+        callers whose corrections are absolute errors rather than increments).
+        """
+        with self._motion_cond:
+            self.motion_stats["requested"] += 1
+            if self._queued_move is None:
+                self._queued_move = (a_steps, b_steps)
+            else:
+                self.motion_stats["coalesced"] += 1
+                if merge == "latest":
+                    self._queued_move = (a_steps, b_steps)
+                else:
+                    qa, qb = self._queued_move
+                    self._queued_move = (qa + a_steps, qb + b_steps)
+            if self._motion_thread is None:
+                self._motion_thread = threading.Thread(target=self._motion_loop, name="stepper-motion", daemon=True)
+                self._motion_thread.start()
+            self._motion_cond.notify_all()
+
+    def wait_motion_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no move is queued or executing; returns False on timeout."""
+        with self._motion_cond:
+            return self._motion_cond.wait_for(lambda: not self.move_busy and self._queued_move is None, timeout)
+
+    def _motion_loop(self) -> None:
+        while not self._closed.is_set():
+            with self._motion_cond:
+                self._motion_cond.wait_for(lambda: self._queued_move is not None or self._closed.is_set(), timeout=0.5)
+                if self._queued_move is None:
                     continue
-                resp = r
-                break
-            if self.verbose and resp:
-                print(f"< {resp}")
-            return resp
+                a_steps, b_steps = self._queued_move
+                self._queued_move = None
+                self.move_busy = True
+            resp = ""
+            try:
+                if self.position is not None:
+                    a_steps, b_steps = self.position.clamp("A", a_steps), self.position.clamp("B", b_steps)
+                if a_steps == 0 and b_steps == 0:
+                    continue  # corrections cancelled out (or pinned at a soft limit)
+                resp = self.step_ab(a_steps, b_steps)
+                self.motion_stats["sent"] += 1
+                if not resp.startswith("OK"):
+                    self.motion_stats["failed"] += 1
+                if self.on_move_done:
+                    self.on_move_done(a_steps, b_steps, resp)
+            except Exception as e:
+                self.motion_stats["failed"] += 1
+                print(f"[SERIAL] move AB {a_steps} {b_steps} failed: {e}")
+            finally:
+                with self._motion_cond:
+                    self.move_busy = False
+                    self.last_move_done = time.time()
+                    self._motion_cond.notify_all()
 
     # High-level helpers
     def help(self) -> str:
-        self.ser.reset_input_buffer()
-        self._send("HELP")
+        """HELP has no OK/ERR reply; collect the text lines it prints until the port goes quiet."""
+        with self._log_cond:
+            seq0 = self._log_seq
+        with self._write_lock:
+            self._write("HELP")
         lines = []
-        t0 = time.time()
-        while time.time() - t0 < 0.5:
-            line = self.ser.readline().decode(errors="ignore").rstrip()
-            if not line:
-                break
-            lines.append(line)
+        end = time.time() + self.timeout
+        quiet = None
+        with self._log_cond:
+            while time.time() < end and (quiet is None or time.time() < quiet):
+                self._log_cond.wait(timeout=0.05)
+                fresh = [line for seq, _, line in self._log if seq > seq0]
+                if fresh:
+                    seq0 = self._log_seq
+                    lines.extend(fresh)
+                    quiet = time.time() + 0.5
         return "\n".join(lines)
 
     def speed(self, rpm: int) -> str:
         return self._send(f"SPEED {rpm}")
 
     def stop(self) -> str:
-        return self._send("STOP")
+        resp = self._send("STOP")
+        if self.position is not None and resp.startswith("OK"):
+            self.position.enabled = False
+        return resp
 
     def resume(self) -> str:
-        return self._send("RESUME")
+        resp = self._send("RESUME")
+        if self.position is not None and resp.startswith("OK"):
+            self.position.enabled = True
+        return resp
 
     def release(self) -> str:
         return self._send("RELEASE")
 
+    def _move(self, cmd: str, a_steps: Optional[int] = None, b_steps: Optional[int] = None,
+              c_steps: Optional[int] = None) -> str:
+        """Send a motion command, keeping the position model (if any) in step."""
+        steps = {"A": a_steps, "B": b_steps}
+        counted = {}
+        if self.position is not None:
+            for axis, want in steps.items():
+                if want is not None:
+                    clamped, counted[axis] = self.position.reserve(axis, want)
+                    if clamped != want and self.verbose:
+                        print(f"[POS] {axis} {want} clamped to {clamped} by soft limit")
+                    steps[axis] = clamped
+        args = " ".join(str(v) for v in (steps["A"], steps["B"], c_steps) if v is not None)
+        resp = self._send(f"{cmd} {args}")
+        if self.position is None or resp.startswith("OK"):
+            return resp
+        if resp.startswith("ERR"):
+            for axis, n in counted.items():  # rejected: the motors never moved
+                self.position.revert(axis, n)
+        elif counted:
+            # No reply: the move may or may not have run, so neither count nor revert can be trusted.
+            self.position.mark_uncertain()
+            print(f"[POS] no reply to {cmd} {args}; position uncertain until `home`")
+        return resp
+
     def step_a(self, steps: int) -> str:
-        return self._send(f"A {steps}")
+        return self._move("A", a_steps=steps)
 
     def step_b(self, steps: int) -> str:
-        return self._send(f"B {steps}")
+        return self._move("B", b_steps=steps)
 
     def step_c(self, steps: int) -> str:
         return self._send(f"C {steps}")
 
     def step_ab(self, a_steps: int, b_steps: int) -> str:
-        return self._send(f"AB {a_steps} {b_steps}")
+        return self._move("AB", a_steps, b_steps)
 
     def step_abc(self, a_steps: int, b_steps: int, c_steps: int) -> str:
-        return self._send(f"ABC {a_steps} {b_steps} {c_steps}")
+        return self._move("ABC", a_steps, b_steps, c_steps)
+
+    def goto(self, a_pos: Optional[int] = None, b_pos: Optional[int] = None) -> str:
+        """Move pan/tilt to absolute step positions (relative to home), within soft limits."""
+        if self.position is None:
+            raise RuntimeError("goto needs a position model")
+        if self.position.uncertain:
+            return "ERR GOTO position uncertain, re-home first"
+        da = self.position.delta_to("A", a_pos) if a_pos is not None else 0
+        db = self.position.delta_to("B", b_pos) if b_pos is not None else 0
+        if da == 0 and db == 0:
+            return "OK AB"
+        return self.step_ab(da, db)
 
     def target(self) -> str:
         return self._send("TARGET")
@@ -115,79 +514,261 @@ class StepperClient:
         return self._send("DEMO ON" if on else "DEMO OFF")
 
 
-def _track_face(ns, client: StepperClient):
+class LatestSlot:
+    """Single-item mailbox: writers overwrite, readers always get the newest item."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._closed = False
+
+    def put(self, item) -> None:
+        with self._cond:
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, last_seq: int = 0, timeout: Optional[float] = None):
+        """Wait for an item newer than last_seq; returns (seq, item) or (last_seq, None) on timeout/close."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != last_seq or self._closed, timeout=timeout)
+            if self._seq == last_seq:
+                return last_seq, None
+            return self._seq, self._item
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class RateMeter:
+    """Exponentially smoothed events-per-second counter."""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.rate = 0.0
+        self._last: Optional[float] = None
+
+    def tick(self, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        if self._last is not None:
+            dt = now - self._last
+            if dt > 0:
+                inst = 1.0 / dt
+                self.rate = inst if self.rate == 0.0 else self.rate + self.alpha * (inst - self.rate)
+        self._last = now
+        return self.rate
+
+
+def _acquire_camera(ns, copy: bool = True):
+    """Shared handle on --cam via the camera manager, exiting with a message if it won't open."""
+    size = None
+    if ns.cam_size:
+        try:
+            w, h = (int(v) for v in ns.cam_size.lower().split("x"))
+            size = (w, h)
+        except ValueError:
+            sys.exit(f"--cam-size must look like 1280x720, not {ns.cam_size}")
+    cap = camera_manager.acquire(ns.cam, ns.cam_api, copy=copy, reprobe=ns.reprobe_camera, size=size)
+    if cap is None:
+        sys.exit(f"Failed to open camera {ns.cam} with api {ns.cam_api}")
+    return cap
+
+
+def _load_detector(ns, name: Optional[str] = None):
+    """Build the face detector backend selected on the command line, exiting with a message on failure."""
+    try:
+        return make_detector(name or ns.detector, model=ns.detector_model if name is None else None,
+                             proto=ns.dnn_proto, confidence=ns.dnn_confidence)
+    except ValueError as e:
+        sys.exit(str(e))
+    except cv2.error as e:
+        sys.exit(f"Failed to load {name or ns.detector} detector: {e}")
+
+
+def _face_finder(ns, detector):
+    """Build the per-frame face locator: plain detection, or detect-then-track when --detect-every > 1."""
+    finder = FaceFinder(detector, scale=ns.detect_scale, roi_margin=ns.roi_margin,
+                        max_misses=ns.roi_misses, min_face=ns.min_face)
+    if ns.detect_every <= 1:
+        return finder
+    try:
+        tracker = make_tracker(ns.tracker)
+    except ValueError as e:
+        sys.exit(str(e))
+    return DetectThenTrack(finder, tracker, detect_every=ns.detect_every)
+
+
+def _face_steps(ns, face, frame_shape):
+    """Convert a face box into clamped (step_x, step_y) bursts towards the frame centre."""
+    if face is None:
+        return 0, 0
+    h, w = frame_shape[:2]
+    x, y, fw, fh = face
+    err_x = x + fw / 2.0 - w / 2.0
+    err_y = y + fh / 2.0 - h / 2.0
+    step_x = int(max(-ns.max_step, min(ns.max_step, err_x * ns.step_scale)))
+    step_y = int(max(-ns.max_step, min(ns.max_step, err_y * ns.step_scale)))
+    if ns.invert_x:
+        step_x = -step_x
+    if ns.invert_y:
+        step_y = -step_y
+    return step_x, step_y
+
+
+def _track_face(ns, client: StepperClient, ring: Optional[FrameRing] = None, cap=None, detector=None) -> dict:
+    """Face tracking as a capture -> detect -> actuate pipeline.
+
+    Capture and detection each run in their own thread and hand frames downstream
+    through a LatestSlot, so stale frames are dropped instead of queued. Actuation is
+    StepperClient's motion worker (move_ab), which merges corrections issued while a
+    move is executing. The loop rate is bounded by the slowest stage rather than the
+    sum of all of them. If a FrameRing is given, every captured frame is offered to it
+    so kill-cam clips can include pre-roll.
+
+    `cap` and `detector` override the camera and detector built from ns (bench-track uses
+    this for synthetic sources). Tracking stops on 'q' or when a finite source runs out;
+    returns a summary of rates, control latency and motion counts.
+    """
     if cv2 is None:
         sys.exit("OpenCV not installed. Install with: pip install opencv-python")
     if ns.rpm and ns.rpm > 0:
         client.speed(int(ns.rpm))
 
-    api_map = {
-        "auto": getattr(cv2, "CAP_ANY", 0),
-        "dshow": getattr(cv2, "CAP_DSHOW", 700),
-        "msmf": getattr(cv2, "CAP_MSMF", 1400),
-        "v4l2": getattr(cv2, "CAP_V4L2", 200),
-        "avfoundation": getattr(cv2, "CAP_AVFOUNDATION", 1200),
-        "gstreamer": getattr(cv2, "CAP_GSTREAMER", 1800),
-    }
-    cam_src = ns.cam
-    try:
-        cam_src = int(ns.cam)
-    except ValueError:
-        pass
-    cap = cv2.VideoCapture(cam_src, api_map.get(ns.cam_api, api_map["auto"]))
-    if not cap.isOpened():
-        sys.exit(f"Failed to open camera {ns.cam} with api {ns.cam_api}")
+    if cap is None:
+        cap = _acquire_camera(ns, copy=False)  # capture thread never draws on frames
 
-    cascade_path = getattr(cv2.data, "haarcascades", None)
-    face_model = cascade_path + "haarcascade_frontalface_default.xml" if cascade_path else None
-    if not face_model:
-        sys.exit("Could not locate haarcascade_frontalface_default.xml")
-    face_cascade = cv2.CascadeClassifier(face_model)
-    if face_cascade.empty():
-        sys.exit("Failed to load Haar cascade")
+    if detector is None:
+        detector = _load_detector(ns)
 
-    print("Tracking... press 'q' to quit")
-    try:
-        while True:
+    frames = LatestSlot()   # (frame, t_capture)
+    results = LatestSlot()  # (frame, face, step_x, step_y, roi, source)
+    stop = threading.Event()
+    stats = {"captured": 0, "detected": 0}
+    control_ms: List[float] = []  # capture -> move_ab, per command issued
+    detect_rate = RateMeter()
+    finder = _face_finder(ns, detector)
+    controller = PanTiltController(ns.step_scale, ns.max_step, kp=ns.kp, ki=ns.ki, kd=ns.kd, deadband=ns.deadband,
+                                   feed_forward=ns.feed_forward, min_interval=ns.min_interval,
+                                   invert_x=ns.invert_x, invert_y=ns.invert_y)
+    ctl_lock = threading.Lock()
+
+    def move_done(a_steps: int, b_steps: int, resp: str):
+        if resp.startswith("OK"):
+            with ctl_lock:
+                controller.sent(a_steps, -b_steps, time.time())
+
+    client.on_move_done = move_done
+    traj_file = None
+    if ns.log_trajectory:
+        traj_file = open(ns.log_trajectory, "w", newline="")
+        traj_file.write("t,x,y,w,h\n")
+
+    def capture_loop():
+        while not stop.is_set():
             ok, frame = cap.read()
             if not ok or frame is None:
+                if getattr(cap, "finished", False):
+                    stop.set()  # synthetic/replay source ran out
+                    break
                 time.sleep(0.01)
                 continue
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(
-                gray, scaleFactor=1.2, minNeighbors=5, minSize=(ns.min_face, ns.min_face)
-            )
+            t_cap = time.time()
+            frames.put((frame, t_cap))
+            if ring is not None:
+                ring.push(frame, t_cap)
+            stats["captured"] += 1
+
+    def detect_loop():
+        seq = 0
+        while not stop.is_set():
+            seq, item = frames.get(seq, timeout=0.5)
+            if item is None:
+                continue
+            frame, t_cap = item
+            face = finder.find(frame)
             h, w = frame.shape[:2]
-            cx_tgt, cy_tgt = w / 2.0, h / 2.0
+            center = None
+            if face is not None:
+                x, y, fw, fh = face
+                center = (x + fw / 2.0, y + fh / 2.0)
             step_x = step_y = 0
-            if len(faces) > 0:
-                x, y, fw, fh = max(faces, key=lambda f: f[2] * f[3])
-                cx = x + fw / 2.0
-                cy = y + fh / 2.0
-                err_x = cx - cx_tgt
-                err_y = cy - cy_tgt
-                step_x = int(max(-ns.max_step, min(ns.max_step, err_x * ns.step_scale)))
-                step_y = int(max(-ns.max_step, min(ns.max_step, err_y * ns.step_scale)))
-                if ns.invert_x:
-                    step_x = -step_x
-                if ns.invert_y:
-                    step_y = -step_y
-                if not ns.no_display:
-                    cv2.rectangle(frame, (x, y), (x + fw, y + fh), (0, 255, 0), 2)
-                    cv2.circle(frame, (int(cx), int(cy)), 4, (0, 0, 255), -1)
-            if step_x != 0 or step_y != 0:
-                client.step_ab(step_x, -step_y)  # negate Y so positive err_y drives up if wiring matches
-            if not ns.no_display:
-                cv2.drawMarker(frame, (int(cx_tgt), int(cy_tgt)), (255, 255, 0), cv2.MARKER_CROSS, 20, 2)
-                cv2.putText(frame, f"err=({step_x},{step_y})", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
-                            (0, 255, 255), 1, cv2.LINE_AA)
-                cv2.imshow("FaceTrack", frame)
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord("q"):
-                    break
-            else:
-                time.sleep(0.03)
+            # Corrections queue mid-move and move_ab merges them. Only frames captured after the
+            # last move finished show where the face really is, so only they feed the velocity estimate.
+            settled = not client.move_busy and t_cap >= client.last_move_done
+            with ctl_lock:
+                cmd = controller.update(center, (w, h), t_cap, settled=settled)
+                if traj_file and center is not None and settled:
+                    wx, wy = controller.world_estimate(center)
+                    traj_file.write(f"{t_cap:.3f},{wx:.1f},{wy:.1f},{w},{h}\n")
+            if cmd is not None:
+                step_x, step_y = cmd
+                # The stepper client is the actuator stage: it coalesces anything queued mid-move.
+                client.move_ab(step_x, -step_y, merge=ns.coalesce)  # negate Y so positive err_y drives up
+                control_ms.append((time.time() - t_cap) * 1000.0)
+            detect_rate.tick()
+            results.put((frame, face, step_x, step_y, finder.roi, getattr(finder, "source", None)))
+            stats["detected"] += 1
+
+    workers = [
+        threading.Thread(target=capture_loop, name="track-capture", daemon=True),
+        threading.Thread(target=detect_loop, name="track-detect", daemon=True),
+    ]
+    for t in workers:
+        t.start()
+
+    print("Tracking... press 'q' to quit")
+    t_start = time.time()
+    t_report = t_start + ns.fps_report if ns.fps_report > 0 else None
+    try:
+        seq = 0
+        while not stop.is_set():
+            if t_report is not None and time.time() >= t_report:
+                print(f"[TRACK] detect {detect_rate.rate:.1f} fps")
+                t_report += ns.fps_report
+            if ns.no_display:
+                time.sleep(0.1)
+                continue
+            seq, item = results.get(seq, timeout=0.5)
+            if item is None:
+                continue
+            frame, face, step_x, step_y, roi, source = item
+            frame = frame.copy()
+            h, w = frame.shape[:2]
+            if roi is not None and (roi[2] - roi[0] < w or roi[3] - roi[1] < h):
+                cv2.rectangle(frame, (roi[0], roi[1]), (roi[2], roi[3]), (255, 0, 255), 1)
+            if face is not None:
+                x, y, fw, fh = face
+                box_color = (0, 200, 255) if source == "track" else (0, 255, 0)
+                cv2.rectangle(frame, (x, y), (x + fw, y + fh), box_color, 2)
+                cv2.circle(frame, (int(x + fw / 2.0), int(y + fh / 2.0)), 4, (0, 0, 255), -1)
+            cv2.drawMarker(frame, (int(w / 2.0), int(h / 2.0)), (255, 255, 0), cv2.MARKER_CROSS, 20, 2)
+            cv2.putText(frame, f"err=({step_x},{step_y}) {detect_rate.rate:.1f} fps", (10, 20),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1, cv2.LINE_AA)
+            cv2.imshow("FaceTrack", frame)
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord("q"):
+                break
     finally:
+        stop.set()
+        for slot in (frames, results):
+            slot.close()
+        for t in workers:
+            t.join(timeout=2.0)
+        elapsed = max(time.time() - t_start, 1e-6)
+        if traj_file:
+            traj_file.close()
+        client.on_move_done = None
+        ms = client.motion_stats
+        print(f"[TRACK] capture {stats['captured'] / elapsed:.1f} fps, detect {stats['detected'] / elapsed:.1f} fps, "
+              f"{ms['sent']} moves sent ({ms['coalesced']} coalesced, {ms['failed']} failed) in {elapsed:.1f}s")
+        if isinstance(finder, DetectThenTrack):
+            print(f"[TRACK] cascade runs {finder.detections}, tracker updates {finder.tracked}")
+        summary = {"elapsed": elapsed, "capture_fps": stats["captured"] / elapsed,
+                   "detect_fps": stats["detected"] / elapsed, "control_ms": sorted(control_ms),
+                   "motion": dict(ms)}
         try:
             cap.release()
         except Exception:
@@ -197,6 +778,7 @@ def _track_face(ns, client: StepperClient):
                 cv2.destroyAllWindows()
             except Exception:
                 pass
+    return summary
 
 
 def _target_once(ns, client: StepperClient):
@@ -206,33 +788,13 @@ def _target_once(ns, client: StepperClient):
     if ns.rpm and ns.rpm > 0:
         client.speed(int(ns.rpm))
 
-    api_map = {
-        "auto": getattr(cv2, "CAP_ANY", 0),
-        "dshow": getattr(cv2, "CAP_DSHOW", 700),
-        "msmf": getattr(cv2, "CAP_MSMF", 1400),
-        "v4l2": getattr(cv2, "CAP_V4L2", 200),
-        "avfoundation": getattr(cv2, "CAP_AVFOUNDATION", 1200),
-        "gstreamer": getattr(cv2, "CAP_GSTREAMER", 1800),
-    }
-    cam_src = ns.cam
-    try:
-        cam_src = int(ns.cam)
-    except ValueError:
-        pass
-    cap = cv2.VideoCapture(cam_src, api_map.get(ns.cam_api, api_map["auto"]))
-    if not cap.isOpened():
-        sys.exit(f"Failed to open camera {ns.cam} with api {ns.cam_api}")
+    cap = _acquire_camera(ns)
 
-    cascade_path = getattr(cv2.data, "haarcascades", None)
-    face_model = cascade_path + "haarcascade_frontalface_default.xml" if cascade_path else None
-    if not face_model:
-        sys.exit("Could not locate haarcascade_frontalface_default.xml")
-    face_cascade = cv2.CascadeClassifier(face_model)
-    if face_cascade.empty():
-        sys.exit("Failed to load Haar cascade")
+    detector = _load_detector(ns)
 
     face_found = False
     step_x = step_y = 0
+    finder = _face_finder(ns, detector)
     t_end = time.time() + ns.target_timeout
     try:
         while time.time() < t_end:
@@ -240,13 +802,10 @@ def _target_once(ns, client: StepperClient):
             if not ok or frame is None:
                 time.sleep(0.01)
                 continue
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(
-                gray, scaleFactor=1.2, minNeighbors=5, minSize=(ns.min_face, ns.min_face)
-            )
+            face = finder.find(frame)
             h, w = frame.shape[:2]
             cx_tgt, cy_tgt = w / 2.0, h / 2.0
-            if len(faces) == 0:
+            if face is None:
                 if not ns.no_display:
                     cv2.drawMarker(frame, (int(cx_tgt), int(cy_tgt)), (255, 255, 0), cv2.MARKER_CROSS, 20, 2)
                     cv2.putText(frame, "No face", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
@@ -255,17 +814,10 @@ def _target_once(ns, client: StepperClient):
                     cv2.waitKey(1)
                 continue
 
-            x, y, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+            x, y, fw, fh = face
             cx = x + fw / 2.0
             cy = y + fh / 2.0
-            err_x = cx - cx_tgt
-            err_y = cy - cy_tgt
-            step_x = int(max(-ns.max_step, min(ns.max_step, err_x * ns.step_scale)))
-            step_y = int(max(-ns.max_step, min(ns.max_step, err_y * ns.step_scale)))
-            if ns.invert_x:
-                step_x = -step_x
-            if ns.invert_y:
-                step_y = -step_y
+            step_x, step_y = _face_steps(ns, face, frame.shape)
             face_found = True
 
             if not ns.no_display:
@@ -304,62 +856,202 @@ def _target_once(ns, client: StepperClient):
     return resp
 
 
+def _bench_detect(ns, video: str) -> int:
+    """Run each detector backend over a recorded video and print speed/agreement stats."""
+    if cv2 is None:
+        sys.exit("OpenCV not installed. Install with: pip install opencv-python")
+    names = [n.strip().lower() for n in ns.detectors.split(",") if n.strip()]
+    detectors = {}
+    for name in names:
+        if name not in DETECTORS:
+            sys.exit(f"Unknown detector {name} (choose from {', '.join(DETECTORS)})")
+        try:
+            detectors[name] = make_detector(name, proto=ns.dnn_proto, confidence=ns.dnn_confidence)
+        except (ValueError, cv2.error) as e:
+            print(f"[BENCH] skipping {name}: {e}")
+    if not detectors:
+        sys.exit("No detector backends available")
+    reference = ns.bench_reference or next(iter(detectors))
+    if reference not in detectors:
+        sys.exit(f"Reference detector {reference} is not among the loaded backends")
+
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        sys.exit(f"Failed to open video {video}")
+
+    def frames():
+        while True:
+            ok, frame = cap.read()
+            if not ok or frame is None:
+                return
+            yield frame
+
+    print(f"[BENCH] {video}: {', '.join(detectors)} (reference {reference})")
+    try:
+        stats = bench_detectors(detectors, frames(), ns.min_face, reference, max_frames=ns.bench_frames)
+    finally:
+        cap.release()
+
+    print(f"{'detector':<8} {'frames':>6} {'fps':>7} {'p50ms':>7} {'p90ms':>7} {'p99ms':>7} {'maxms':>7} {'hit%':>6} {'agree%':>7}")
+    for name, st in stats.items():
+        print(f"{name:<8} {st['frames']:>6} {st['fps']:>7.1f} {st['p50_ms']:>7.1f} {st['p90_ms']:>7.1f} "
+              f"{st['p99_ms']:>7.1f} {st['max_ms']:>7.1f} {st['hit_rate'] * 100:>6.1f} {st['agreement'] * 100:>7.1f}")
+    return 0
+
+
+def _start_sim(ns):
+    # Imported here: the emulator needs a POSIX pty, and the turret host usually runs on Windows.
+    from firmware_sim import FirmwareSim
+    sim = FirmwareSim(rpm=ns.rpm, time_scale=ns.sim_time_scale).start()
+    print(f"[SIM] firmware emulator on {sim.port}")
+    return sim
+
+
+def _bench_serial(ns, count: int) -> int:
+    """Latency and throughput of the host serial stack against the firmware (or its emulator)."""
+    sim = _start_sim(ns) if ns.sim else None
+    client = StepperClient(port=sim.port if sim else ns.port, baud=ns.baud, timeout=ns.timeout,
+                           max_inflight=ns.max_inflight, protocol=ns.protocol)
+    rows = []
+
+    def timed(name: str, send) -> None:
+        lat, failed = [], 0
+        for i in range(count):
+            t0 = time.perf_counter()
+            if not send(i).startswith("OK"):
+                failed += 1
+            lat.append((time.perf_counter() - t0) * 1000.0)
+        lat.sort()
+        rows.append((name, count, count / (sum(lat) / 1000.0), percentile(lat, 50), percentile(lat, 90),
+                     percentile(lat, 99), failed))
+
+    try:
+        print(client.speed(ns.rpm))
+        d = lambda i: 1 if i % 2 == 0 else -1  # alternate so the gimbal ends where it started
+        # SPEED never moves, so it measures pure transport + loop() overhead.
+        timed("speed", lambda i: client.speed(ns.rpm))
+        timed("ab 1 1", lambda i: client.step_ab(d(i), d(i)))
+
+        # Pipelined: keep up to --max-inflight commands queued in the firmware's RX buffer.
+        t0 = time.perf_counter()
+        futs = [client.submit(f"AB {d(i)} {d(i)}") for i in range(count)]
+        failed = 0
+        for fut in futs:
+            try:
+                failed += not fut.result(timeout=ns.timeout).startswith("OK")
+            except Exception:
+                failed += 1
+        elapsed = time.perf_counter() - t0
+        rows.append((f"pipelined x{client.max_inflight}", count, count / elapsed, 0.0, 0.0, 0.0, failed))
+
+        # Tracker-style stream of corrections: move_ab coalesces whatever arrives mid-move.
+        before = dict(client.motion_stats)
+        t0 = time.perf_counter()
+        for i in range(count):
+            client.move_ab(d(i) * 5, 0, merge="sum")
+            time.sleep(0.002)
+        client.wait_motion_idle(timeout=ns.timeout)
+        elapsed = time.perf_counter() - t0
+        sent = client.motion_stats["sent"] - before["sent"]
+        rows.append(("move_ab", count, count / elapsed, 0.0, 0.0, 0.0, client.motion_stats["failed"] - before["failed"]))
+        print(f"[BENCH] move_ab: {count} requests -> {sent} serial moves "
+              f"({client.motion_stats['coalesced'] - before['coalesced']} coalesced)")
+    finally:
+        client.close()
+        if sim:
+            print(f"[SIM] {sim.stats['commands']} commands, {sim.stats['frames']} frames, "
+                  f"{sim.stats['overrun_bytes']} bytes lost to RX overrun")
+            sim.close()
+
+    target = "emulator" if sim else ns.port
+    print(f"\nserial bench against {target} ({ns.protocol}, {ns.rpm} rpm)")
+    print(f"{'test':<14} {'n':>5} {'cmd/s':>8} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7} {'failed':>6}")
+    for name, n, rate, p50, p90, p99, failed in rows:
+        print(f"{name:<14} {n:>5} {rate:>8.1f} {p50:>7.2f} {p90:>7.2f} {p99:>7.2f} {failed:>6}")
+    return 0
+
+
+def _test_source(ns, client: StepperClient, sim=None):
+    """Camera stand-in for --cam synth:<path> / replay:<video>, following the turret's pointing; None for real cameras."""
+    if sim is not None:
+        pointing = lambda: (sim.steps["A"], sim.steps["B"])  # what the (emulated) motors actually did
+    elif client.position is not None:
+        pointing = lambda: (client.position.pos["A"], client.position.pos["B"])
+    else:
+        pointing = None
+    try:
+        return open_source(ns.cam, fps=ns.synth_fps, duration=ns.synth_duration, pointing=pointing,
+                           px_per_step=ns.px_per_step or 1.0 / ns.step_scale, sprite=ns.sprite)
+    except (ValueError, RuntimeError) as e:
+        sys.exit(str(e))
+
+
+def _bench_track(ns, source: str) -> int:
+    """Run the full capture -> detect -> control -> StepperClient loop on a synthetic or replayed camera."""
+    if cv2 is None:
+        sys.exit("OpenCV not installed. Install with: pip install opencv-python")
+    if os.path.isfile(source) and not source.lower().endswith(".csv"):
+        ns.cam = f"replay:{source}"
+    else:
+        ns.cam = f"synth:{source}"
+    sim = _start_sim(ns) if ns.sim else None
+    # No position model: the bench must not touch the persisted pose or be clipped by soft limits.
+    client = StepperClient(port=sim.port if sim else ns.port, baud=ns.baud, timeout=ns.timeout,
+                           max_inflight=ns.max_inflight, protocol=ns.protocol)
+    cam = _test_source(ns, client, sim)
+    if sim is None and hasattr(cam, "history"):
+        print("[BENCH] no emulator: the synthetic view won't follow the turret (open loop)")
+    try:
+        summary = _track_face(ns, client, cap=cam, detector=SpriteDetector() if ns.truth_detector else None)
+    finally:
+        client.close()
+        if sim:
+            sim_stats = dict(sim.stats)
+            sim.close()
+
+    lat = summary["control_ms"]
+    ms = summary["motion"]
+    print(f"\ntracking bench: {ns.cam} ({'sprite colour' if ns.truth_detector else ns.detector} detector, "
+          f"{ns.protocol}, {summary['elapsed']:.1f}s)")
+    print(f"  capture {summary['capture_fps']:.1f} fps, detect {summary['detect_fps']:.1f} fps")
+    print(f"  control latency (capture -> move) p50 {percentile(lat, 50):.1f} ms, p90 {percentile(lat, 90):.1f} ms, "
+          f"p99 {percentile(lat, 99):.1f} ms over {len(lat)} commands")
+    print(f"  moves: {ms['requested']} requested, {ms['sent']} sent, {ms['coalesced']} coalesced, {ms['failed']} failed")
+    if sim:
+        print(f"  firmware: {sim_stats['commands']} commands, {sim_stats['frames']} frames, "
+              f"{sim_stats['busy_s']:.2f}s moving")
+
+    errors = cam.errors() if hasattr(cam, "errors") else []
+    if errors:
+        vals = sorted(e for _, e in errors)
+        print(f"  tracking error: mean {sum(vals) / len(vals):.1f} px, p50 {percentile(vals, 50):.1f}, "
+              f"p90 {percentile(vals, 90):.1f}, max {vals[-1]:.1f}")
+        print("  error over time (mean px per 0.5 s):")
+        buckets: Dict[int, List[float]] = {}
+        for t, e in errors:
+            buckets.setdefault(int(t / 0.5), []).append(e)
+        print("   " + " ".join(f"{sum(v) / len(v):.0f}" for _, v in sorted(buckets.items())))
+    return 0
+
+
 def _record_clip(cam: str, cam_api: str, duration: float = 5.0, fps: int = 20, ext: str = "mp4") -> Optional[str]:
     """Record a short clip from the specified camera; returns path or None."""
     if cv2 is None:
         print("[SERVER] OpenCV not installed; cannot record clip")
         return None
 
-    api_map = {
-        "auto": getattr(cv2, "CAP_ANY", 0),
-        "dshow": getattr(cv2, "CAP_DSHOW", 700),
-        "msmf": getattr(cv2, "CAP_MSMF", 1400),
-        "v4l2": getattr(cv2, "CAP_V4L2", 200),
-        "avfoundation": getattr(cv2, "CAP_AVFOUNDATION", 1200),
-        "gstreamer": getattr(cv2, "CAP_GSTREAMER", 1800),
-    }
-    cam_src = cam
-    try:
-        cam_src = int(cam)
-    except ValueError:
-        pass
-
-    def open_with_fallback():
-        preferred = [api_map.get(cam_api, api_map["auto"])]
-        # Common fallbacks to avoid blank captures on Windows.
-        # Skip MSMF to reduce noisy grabFrame warnings on some drivers.
-        for api_key in ("dshow", "auto"):
-            val = api_map.get(api_key)
-            if val is not None and val not in preferred:
-                preferred.append(val)
-        for backend in preferred:
-            cap_try = cv2.VideoCapture(cam_src, backend)
-            if not cap_try.isOpened():
-                cap_try.release()
-                continue
-            ok, frm = cap_try.read()
-            if ok and frm is not None and frm.mean() > 1.0:
-                return cap_try, frm
-            cap_try.release()
-        return None, None
-
-    cap, frame = open_with_fallback()
-    if cap is None or frame is None:
-        print(f"[SERVER] Failed to open camera {cam} with api {cam_api} (and fallbacks)")
+    cap = camera_manager.acquire(cam, cam_api, copy=False)  # shared with anything else using the camera
+    if cap is None:
+        return None
+    ok, frame = cap.read()
+    if not ok or frame is None:
+        print(f"[SERVER] Camera {cam} delivered no frames")
+        cap.release()
         return None
 
     # Get frame size
     h, w = frame.shape[:2]
-    ext = (ext or "avi").lower()
-    if ext == "mp4":
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        suffix = "mp4"
-    else:
-        fourcc = cv2.VideoWriter_fourcc(*"XVID")
-        suffix = "avi"
-    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-    filename = f"{ts}-shot.{suffix}"
-    writer = cv2.VideoWriter(filename, fourcc, fps, (w, h))
+    writer, filename = open_writer((w, h), fps, ext)
     end = time.time() + duration
 
     # Write the first frame
@@ -377,107 +1069,151 @@ def _record_clip(cam: str, cam_api: str, duration: float = 5.0, fps: int = 20, e
     return filename
 
 
-def _handle_server_messages(sock: socket.socket, client: StepperClient, stop_event: threading.Event, rec_cfg: Optional[dict] = None):
-    """Background listener for server messages."""
-    buf = b""
-    while not stop_event.is_set():
-        try:
-            data = sock.recv(1024)
-        except OSError:
-            break
-        if not data:
-            break
-        buf += data
-
-        def handle_msg(msg: str):
-            if not msg:
-                return False
-            print(f"[SERVER] recv: {msg}")
-            if msg.upper().__contains__("NO CREDS"):
-                rec_thread = None
-                video_path_holder = {"path": None}
-                if rec_cfg:
-                    rec_thread = threading.Thread(
-                        target=lambda holder: holder.update({"path": _record_clip(
-                            rec_cfg.get("cam", "0"),
-                            rec_cfg.get("cam_api", "auto"),
-                            rec_cfg.get("duration", 10.0),
-                            10, # static fps, change this according to 
-                            rec_cfg.get("ext", "mp4"),
-                        )}),
-                        args=(video_path_holder,),
-                        daemon=True,
-                    )
-                    rec_thread.start()
-                print('[STATUS] recording started, arming shot')
-                time.sleep(0.5)
-                print('[STATUS] shooting')
-                client.step_c(-500)
-                if rec_thread:
-                    rec_thread.join(timeout=rec_cfg.get("duration", 7.0) + 2.0)
-                    video_path = video_path_holder.get("path")
-                    if video_path:
-                        try:
-                            send_video_to_subscribers(video_path, caption="NO CREDS event")
-                        except Exception as e:
-                            print(f"[WARN] Failed to send video: {e}")
-                client.step_c(240)
-                stop_event.set()
-                return True
-            return False
-
-        # Process newline-delimited messages
-        while b"\n" in buf:
-            line, buf = buf.split(b"\n", 1)
-            msg = line.decode(errors="ignore").strip()
-            if handle_msg(msg):
-                return
+def _start_clip_queue(ns) -> Optional[ClipQueue]:
+    """Background transcode/upload queue for kill-cam clips, resuming anything left from a previous run."""
+    if ns.no_clip_queue:
+        return None
+    def sender(path: str, caption: Optional[str], chat_ids: List[str]) -> List[str]:
+        with instrument.span("clip_upload", chats=len(chat_ids)) as sp:
+            delivered = deliver_video(path, caption, chat_ids)
+            sp.set(delivered=len(delivered))
+        return delivered
 
-        # Process short packets without newline
-        if buf and b"\n" not in buf:
-            msg = buf.decode(errors="ignore").strip()
-            buf = b""
-            if handle_msg(msg):
-                return
-    stop_event.set()
-
-
-def start_server(host: str, port: int, client: StepperClient, rec_cfg: Optional[dict] = None):
-    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    srv.bind((host, port))
-    srv.listen(1)
-    print(f"[SERVER] Listening on {host}:{port} ...")
-    conn, addr = srv.accept()
-    print(f"[SERVER] Client connected from {addr[0]}:{addr[1]}")
-    stop_event = threading.Event()
-    threading.Thread(target=_handle_server_messages, args=(conn, client, stop_event, rec_cfg), daemon=True).start()
-    return srv, conn, stop_event
-
-
-def start_server_async(host: str, port: int, client: StepperClient, rec_cfg: Optional[dict] = None):
-    """Start a listener in a background thread so tracking can run concurrently."""
-    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    srv.bind((host, port))
-    srv.listen(1)
-    stop_event = threading.Event()
-    conn_holder = {"conn": None}
-
-    def accept_and_handle():
-        print(f"[SERVER] Listening on {host}:{port} ...")
+    return ClipQueue(sender, SUBSCRIBER_CHAT_IDS, spool_dir=ns.clip_spool,
+                     do_transcode=not ns.no_transcode).start()
+
+
+def _finish_clips(rec_cfg: Optional[dict], timeout: float = 30.0) -> None:
+    """On shutdown, let in-flight recordings reach the queue and give uploads a chance to finish."""
+    if not rec_cfg:
+        return
+    for t in rec_cfg.get("recorders", []):
+        t.join(timeout=rec_cfg.get("duration", 7.0) + 2.0)
+    clips = rec_cfg.get("clips")
+    if clips is not None and clips.pending:
+        print(f"[CLIPQ] waiting up to {timeout:.0f}s for {clips.pending} upload(s); Ctrl+C leaves them queued")
         try:
-            conn, addr = srv.accept()
-        except OSError:
-            return
-        conn_holder["conn"] = conn
-        print(f"[SERVER] Client connected from {addr[0]}:{addr[1]}")
-        threading.Thread(target=_handle_server_messages, args=(conn, client, stop_event, rec_cfg), daemon=True).start()
-        stop_event.wait()
+            clips.wait_idle(timeout)
+        except KeyboardInterrupt:
+            pass
+        clips.stop()
+
+
+def _fire_shot(client: StepperClient, rec_cfg: Optional[dict], cid: Optional[str] = None) -> None:
+    """NO CREDS reaction: start the clip, sweep motor C to fire, and rearm."""
+    with instrument.span("fire", cid=cid):
+        _fire_shot_inner(client, rec_cfg, cid)
+
+
+def _fire_shot_inner(client: StepperClient, rec_cfg: Optional[dict], cid: Optional[str]) -> None:
+    video_path_holder = {"path": None}
+    ring = rec_cfg.get("ring") if rec_cfg else None
+    clips = rec_cfg.get("clips") if rec_cfg else None
+
+    def record(holder):
+        with instrument.span("clip_record", cid=cid, ring=ring is not None) as sp:
+            if ring is not None:
+                # Tracker is feeding the ring: pre-roll is already buffered, no camera to open.
+                path = record_from_ring(ring, rec_cfg.get("duration", 7.0), rec_cfg.get("ext", "mp4"))
+            else:
+                path = _record_clip(
+                    rec_cfg.get("cam", "0"),
+                    rec_cfg.get("cam_api", "auto"),
+                    rec_cfg.get("duration", 10.0),
+                    10, # static fps, change this according to 
+                    rec_cfg.get("ext", "mp4"),
+                )
+            if not path:
+                sp.fail("no clip")
+        holder["path"] = path
+        if path and clips is not None:
+            clips.enqueue(path, caption="NO CREDS event")
+
+    rec_thread = None
+    if rec_cfg:
+        rec_thread = threading.Thread(target=record, args=(video_path_holder,), daemon=True)
+        rec_thread.start()
+        recorders = rec_cfg.setdefault("recorders", [])
+        recorders[:] = [t for t in recorders if t.is_alive()] + [rec_thread]
+    print('[STATUS] recording started, arming shot')
+    if ring is None and not (rec_cfg or {}).get("warm"):
+        time.sleep(0.5)  # give the freshly opened camera a head start
+    print('[STATUS] shooting')
+    with instrument.span("fire_sweep", cid=cid):
+        client.step_c(-500)
+    if rec_thread and clips is None:
+        rec_thread.join(timeout=rec_cfg.get("duration", 7.0) + 2.0)
+        video_path = video_path_holder.get("path")
+        if video_path:
+            try:
+                send_video_to_subscribers(video_path, caption="NO CREDS event")
+            except Exception as e:
+                print(f"[WARN] Failed to send video: {e}")
+    # With a clip queue the recorder finishes and enqueues on its own; rearm right away.
+    client.step_c(240)
+
+
+def start_event_server(ns, client: StepperClient, rec_cfg: Optional[dict] = None) -> Tuple[EventServer, FireQueue]:
+    """
+    Listen for gateway events on ns.tcp_host:ns.tcp_port until closed. Any number of clients
+    may connect; NO CREDS events go through a rate-limited fire queue so the listener (and
+    the tracker) never block on a shot.
+    """
+    fire_queue = FireQueue(lambda event: _fire_shot(client, rec_cfg, instrument.untag(event)[1]),
+                           cooldown=ns.fire_cooldown, max_pending=ns.fire_backlog)
+
+    def on_message(msg: str, addr) -> None:
+        print(f"[SERVER] recv from {addr[0]}: {msg}")
+        if "NO CREDS" in msg.upper():
+            _, cid = instrument.untag(msg)
+            instrument.event("no_creds_received", cid, peer=addr[0])
+            if not fire_queue.submit(msg):
+                instrument.inc("fire_dropped_total")
+
+    server = EventServer(ns.tcp_host, ns.tcp_port, on_message).start()
+    return server, fire_queue
+
 
-    thread = threading.Thread(target=accept_and_handle, daemon=True)
-    thread.start()
-    return srv, conn_holder, stop_event, thread
+def _stop_event_server(server: EventServer, fire_queue: FireQueue, rec_cfg: Optional[dict]) -> None:
+    server.close()
+    fire_queue.close(timeout=15.0)  # let a shot in progress finish its sweep and rearm
+    print(f"[FIRE] {fire_queue.stats['fired']} fired, {fire_queue.stats['dropped']} dropped")
+    _finish_clips(rec_cfg)
+
+
+def _repl_command(client: StepperClient, line: str) -> str:
+    """
+    Run one typed REPL command through the StepperClient helper for it, so STOP/RESUME and
+    moves keep the position model in step with the hardware. Anything else goes out raw.
+    """
+    toks = line.split()
+    cmd, args = toks[0].upper(), toks[1:]
+    try:
+        vals = [int(v) for v in args]
+    except ValueError:
+        vals = None
+    moves = {"A": client.step_a, "B": client.step_b, "C": client.step_c, "AB": client.step_ab,
+             "ABC": client.step_abc}
+    if cmd in moves and vals:
+        try:
+            return moves[cmd](*vals)
+        except TypeError:
+            pass  # wrong arg count: let the firmware answer ERR
+    elif cmd in ("STOP", "S") and not args:
+        return client.stop()
+    elif cmd in ("RESUME", "R") and not args:
+        return client.resume()
+    elif cmd == "DEMO" and len(args) <= 1:
+        state = args[0].upper() if args else None
+        if state in (None, "ON", "1", "OFF", "0"):
+            return client.demo(None if state is None else state in ("ON", "1"))
+    elif cmd == "SPEED" and vals and len(vals) == 1:
+        return client.speed(vals[0])
+    elif cmd == "RELEASE" and not args:
+        return client.release()
+    elif cmd == "TARGET" and not args:
+        return client.target()
+    return client._send(line)
 
 
 def main(argv=None) -> int:
@@ -497,28 +1233,109 @@ def main(argv=None) -> int:
         ]
     p = argparse.ArgumentParser(description="Control ULN2003 28BYJ-48 steppers over Arduino serial")
     p.add_argument("command", type=lambda s: s.lower(), choices=[
-        "help", "speed", "stop", "resume", "release", "a", "b", "c", "ab", "abc", "demo", "target", "track", "listen", "repl"
+        "help", "speed", "stop", "resume", "release", "a", "b", "c", "ab", "abc", "demo", "target", "track", "listen", "repl",
+        "bench-detect", "bench-serial", "bench-track", "home", "goto", "where", "limits",
     ], help="Command to run")
     p.add_argument("args", nargs="*", help="Command arguments")
     p.add_argument("--port", default="COM5", help="Serial port (default: COM5)")
     p.add_argument("--baud", type=int, default=115200, help="Baud rate (default: 115200)")
     p.add_argument("--timeout", type=float, default=10.0, help="Response timeout seconds (default: 10)")
+    p.add_argument("--protocol", choices=["ascii", "binary"], default="ascii",
+                   help="Serial command encoding; binary needs the framed-command firmware (default ascii)")
+    p.add_argument("--max-inflight", type=int, default=4,
+                   help="Commands allowed in flight before waiting for replies (default 4)")
+    p.add_argument("--position-file", default=POSITION_PATH,
+                   help="Where the pan/tilt position model is persisted (default turret_position.json)")
+    p.add_argument("--no-position", action="store_true", help="Disable position tracking and soft limits")
     p.add_argument("-v", "--verbose", action="store_true", help="Verbose I/O logging")
+    p.add_argument("--sim", action="store_true",
+                   help="Run against the built-in firmware emulator (firmware_sim.py) instead of --port")
+    p.add_argument("--sim-time-scale", type=float, default=1.0,
+                   help="Emulator delay multiplier: 1 = real firmware timing, 0 = instant moves (default 1)")
     # Tracking options
     p.add_argument("--cam", default="0", help="Camera index or path for face tracking (default 0)")
     p.add_argument("--cam-api", default="auto", choices=["auto", "dshow", "msmf", "v4l2", "avfoundation", "gstreamer"],
                    help="OpenCV capture backend for tracking")
+    p.add_argument("--camera-cache", default=camera_manager.DEFAULT_CACHE,
+                   help="Where the working camera backend is remembered (default camera_cache.json)")
+    p.add_argument("--reprobe-camera", action="store_true",
+                   help="Ignore the cached camera backend and probe again")
+    p.add_argument("--cam-size", default=None, help="Request a capture resolution, e.g. 1280x720 (remembered in the cache)")
     p.add_argument("--rpm", type=int, default=12, help="Stepper RPM to set before tracking (default 12)")
     p.add_argument("--step-scale", type=float, default=0.05, help="Steps per pixel error (default 0.05)")
     p.add_argument("--max-step", type=int, default=25, help="Max step burst per update (default 25)")
+    p.add_argument("--kp", type=float, default=1.0, help="Tracking proportional gain (default 1.0)")
+    p.add_argument("--ki", type=float, default=0.0, help="Tracking integral gain (default 0)")
+    p.add_argument("--kd", type=float, default=0.0, help="Tracking derivative gain (default 0)")
+    p.add_argument("--deadband", type=float, default=6.0, help="Pixel error treated as on-target (default 6)")
+    p.add_argument("--feed-forward", type=float, default=0.0,
+                   help="Seconds of lead applied to estimated face velocity (default 0)")
+    p.add_argument("--min-interval", type=float, default=0.0,
+                   help="Minimum seconds between tracking moves (default 0)")
+    p.add_argument("--coalesce", choices=["sum", "latest"], default="latest",
+                   help="How tracking corrections queued during a move are merged (default latest)")
+    p.add_argument("--log-trajectory", default=None,
+                   help="Write face positions (t,x,y,w,h CSV) for replay with aim_control.py")
     p.add_argument("--min-face", type=int, default=60, help="Minimum face size in pixels (default 60)")
+    p.add_argument("--detector", default="haar", choices=list(DETECTORS),
+                   help="Face detector backend (default haar)")
+    p.add_argument("--detector-model", default=None,
+                   help="Override model file for --detector (cascade XML or res10 caffemodel)")
+    p.add_argument("--dnn-proto", default=None, help="deploy.prototxt for the DNN detector (default models/)")
+    p.add_argument("--dnn-confidence", type=float, default=0.5, help="DNN detector confidence threshold (default 0.5)")
+    p.add_argument("--detectors", default=",".join(DETECTORS),
+                   help="Comma-separated backends for bench-detect (default haar,lbp,dnn)")
+    p.add_argument("--bench-reference", default=None,
+                   help="Backend used as ground truth for bench-detect agreement (default first loaded)")
+    p.add_argument("--bench-frames", type=int, default=0, help="Limit bench-detect to N frames (default all)")
+    p.add_argument("--detect-scale", type=float, default=1.0,
+                   help="Downscale factor applied before face detection, e.g. 0.5 (default 1.0 = full res)")
+    p.add_argument("--roi-margin", type=float, default=0.0,
+                   help="Search only this many face sizes around the last face (default 0 = full frame)")
+    p.add_argument("--roi-misses", type=int, default=5,
+                   help="Consecutive ROI misses before falling back to full-frame search (default 5)")
+    p.add_argument("--detect-every", type=int, default=1,
+                   help="Run the face detector every K frames and track in between (default 1 = detect every frame)")
+    p.add_argument("--synth-fps", type=float, default=30.0,
+                   help="Frame rate of synth:/replay: camera sources and bench-track (default 30)")
+    p.add_argument("--synth-duration", type=float, default=8.0,
+                   help="Length in seconds of scripted synth: trajectories (default 8)")
+    p.add_argument("--px-per-step", type=float, default=None,
+                   help="Image pixels per motor step for synth: sources (default 1/--step-scale)")
+    p.add_argument("--sprite", default=None, help="Face image to draw in synth: sources instead of the cartoon face")
+    p.add_argument("--truth-detector", action="store_true",
+                   help="With synth: sources, find the drawn face by colour instead of --detector (times the control loop alone)")
+    p.add_argument("--tracker", default="flow", choices=["flow", "kcf", "csrt", "mosse"],
+                   help="Tracker used between detections with --detect-every (default flow = LK optical flow)")
+    p.add_argument("--fps-report", type=float, default=5.0,
+                   help="Seconds between detection FPS reports while tracking (0 disables)")
     p.add_argument("--target-timeout", type=float, default=3.0, help="Seconds to search for a face in TARGET (default 3)")
     p.add_argument("--invert-x", action="store_true", help="Invert pan direction")
     p.add_argument("--invert-y", action="store_true", help="Invert tilt direction")
     p.add_argument("--no-display", action="store_true", help="Disable window during tracking")
     p.add_argument("--record-ext", choices=["avi", "mp4"], default="mp4", help="Recording format for NO CREDS clips")
+    p.add_argument("--preroll", type=float, default=3.0,
+                   help="Seconds of tracking video kept before a NO CREDS shot (default 3)")
+    p.add_argument("--postroll", type=float, default=7.0,
+                   help="Seconds recorded after a NO CREDS shot while tracking (default 7)")
+    p.add_argument("--record-fps", type=float, default=15.0,
+                   help="Frame rate of kill-cam clips cut from the tracking feed (default 15)")
+    p.add_argument("--clip-spool", default=DEFAULT_SPOOL,
+                   help="Directory for the persistent kill-cam upload queue (default host/clip_spool)")
+    p.add_argument("--no-clip-queue", action="store_true",
+                   help="Send clips inline before rearming instead of through the background queue")
+    p.add_argument("--no-transcode", action="store_true",
+                   help="Upload clips as recorded instead of re-encoding them with ffmpeg")
     p.add_argument("--tcp-host", default="0.0.0.0", help="TCP bind host for listen command")
     p.add_argument("--tcp-port", type=int, default=9000, help="TCP bind port for listen command")
+    p.add_argument("--fire-cooldown", type=float, default=5.0,
+                   help="Minimum seconds between NO CREDS shots (default 5)")
+    p.add_argument("--fire-backlog", type=int, default=2,
+                   help="NO CREDS events allowed to wait for the turret; extras are dropped (default 2)")
+    p.add_argument("--metrics-jsonl", default=os.environ.get("SMG_METRICS_JSONL"),
+                   help="Append spans/events (fire, clip record/upload) as JSON lines to this file")
+    p.add_argument("--metrics-port", type=int, default=int(os.environ.get("SMG_METRICS_PORT") or 0) or None,
+                   help="Serve Prometheus-text metrics on this port at /metrics")
     p.add_argument(
         "--listen-while-track",
         action="store_true",
@@ -526,8 +1343,42 @@ def main(argv=None) -> int:
         help="Start TCP listener while tracking (enabled by default)",
     )
     ns = p.parse_args(argv)
+    camera_manager.configure(ns.camera_cache)
+    instrument.configure("turret", jsonl=ns.metrics_jsonl, port=ns.metrics_port,
+                         host=os.environ.get("SMG_METRICS_HOST", "127.0.0.1"))
+    if not 0.0 < ns.detect_scale <= 1.0:
+        p.error("--detect-scale must be in (0, 1]")
+
+    if ns.command == "bench-detect":
+        if len(ns.args) != 1:
+            p.error("bench-detect requires 1 arg: <video>")
+        return _bench_detect(ns, ns.args[0])
+    if ns.command == "bench-track":
+        if len(ns.args) != 1:
+            p.error("bench-track requires 1 arg: <step|sine|trajectory.csv|video>")
+        return _bench_track(ns, ns.args[0])
+    if ns.command == "bench-serial":
+        if len(ns.args) > 1:
+            p.error("bench-serial takes at most 1 arg: [count]")
+        return _bench_serial(ns, int(ns.args[0]) if ns.args else 50)
 
-    client = StepperClient(port=ns.port, baud=ns.baud, timeout=ns.timeout, verbose=ns.verbose)
+    position = None if ns.no_position else PositionModel(ns.position_file)
+    if ns.command in ("where", "limits", "home", "goto") and position is None:
+        p.error(f"{ns.command} needs position tracking (drop --no-position)")
+    if ns.command in ("where", "limits"):
+        if ns.command == "limits":
+            if len(ns.args) != 3:
+                p.error("limits requires 3 args: <a|b> <min> <max>")
+            try:
+                position.set_limits(ns.args[0].upper(), int(ns.args[1]), int(ns.args[2]))
+            except ValueError as e:
+                p.error(str(e))
+        print(position.describe())
+        return 0
+
+    sim = _start_sim(ns) if ns.sim else None
+    client = StepperClient(port=sim.port if sim else ns.port, baud=ns.baud, timeout=ns.timeout, verbose=ns.verbose,
+                           max_inflight=ns.max_inflight, position=position, protocol=ns.protocol)
     try:
         cmd = ns.command
         a = ns.args
@@ -541,7 +1392,7 @@ def main(argv=None) -> int:
                     break
                 if not line.strip():
                     continue
-                resp = client._send(line)
+                resp = _repl_command(client, line)
                 if resp:
                     print(resp)
             return 0
@@ -577,6 +1428,16 @@ def main(argv=None) -> int:
             if len(a) != 3:
                 p.error("abc requires 3 args: <a_steps> <b_steps> <c_steps>")
             print(client.step_abc(int(a[0]), int(a[1]), int(a[2])))
+        elif cmd == "home":
+            if len(a) != 0:
+                p.error("home takes no args")
+            position.set_home()
+            print(position.describe())
+        elif cmd == "goto":
+            if len(a) != 2:
+                p.error("goto requires 2 args: <a_pos> <b_pos>")
+            print(client.goto(int(a[0]), int(a[1])))
+            print(position.describe())
         elif cmd == "target":
             if len(a) != 0:
                 p.error("target takes no args")
@@ -593,60 +1454,40 @@ def main(argv=None) -> int:
         elif cmd == "listen":
             if len(a) != 0:
                 p.error("listen takes no args")
-            rec_cfg = {"cam": ns.cam, "cam_api": ns.cam_api, "duration": 10.0, "ext": ns.record_ext or "mp4"}
-            srv, conn, stop_event = start_server(ns.tcp_host, ns.tcp_port, client, rec_cfg)
+            # Hold the camera open for the session so a NO CREDS clip starts recording instantly.
+            warm = camera_manager.acquire(ns.cam, ns.cam_api, reprobe=ns.reprobe_camera)
+            rec_cfg = {"cam": ns.cam, "cam_api": ns.cam_api, "duration": 10.0, "ext": ns.record_ext or "mp4",
+                       "clips": _start_clip_queue(ns), "warm": warm is not None}
+            server, fire_queue = start_event_server(ns, client, rec_cfg)
             try:
                 while True:
                     time.sleep(0.5)
-                    if stop_event.is_set():
-                        break
             except KeyboardInterrupt:
                 print("\nStopping listener")
             finally:
-                stop_event.set()
-                try:
-                    conn.shutdown(socket.SHUT_RDWR)
-                except Exception:
-                    pass
-                try:
-                    conn.close()
-                except Exception:
-                    pass
-                try:
-                    srv.close()
-                except Exception:
-                    pass
+                _stop_event_server(server, fire_queue, rec_cfg)
+                if warm is not None:
+                    warm.release()
         elif cmd == "track":
-            srv = conn = stop_event = None
             server_ctx = None
+            ring = None
             if ns.listen_while_track:
-                rec_cfg = {"cam": ns.cam, "cam_api": ns.cam_api, "duration": 10.0, "ext": ns.record_ext or "mp4"}
-                srv, conn_holder, stop_event, _ = start_server_async(ns.tcp_host, ns.tcp_port, client, rec_cfg)
-                server_ctx = (srv, conn_holder, stop_event)
+                ring = FrameRing(preroll=ns.preroll, fps=ns.record_fps)
+                rec_cfg = {"ring": ring, "duration": ns.postroll, "ext": ns.record_ext or "mp4",
+                           "clips": _start_clip_queue(ns)}
+                server_ctx = start_event_server(ns, client, rec_cfg)
             try:
-                _track_face(ns, client)
+                _track_face(ns, client, ring=ring, cap=_test_source(ns, client, sim),
+                            detector=SpriteDetector() if ns.truth_detector else None)
             finally:
                 if server_ctx:
-                    stop_event.set()
-                    conn = conn_holder.get("conn")
-                    try:
-                        if conn:
-                            conn.shutdown(socket.SHUT_RDWR)
-                    except Exception:
-                        pass
-                    try:
-                        if conn:
-                            conn.close()
-                    except Exception:
-                        pass
-                    try:
-                        srv.close()
-                    except Exception:
-                        pass
+                    _stop_event_server(*server_ctx, rec_cfg)
         else:
             p.error("unknown command")
     finally:
         client.close()
+        if sim:
+            sim.close()
     return 0
 
 
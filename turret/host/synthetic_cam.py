@@ -0,0 +1,216 @@
+"""
+Reproducible video sources for exercising the tracker without a webcam.
+
+SyntheticCamera renders a face sprite moving along a scripted world trajectory (the same
+t,x,y samples aim_control replays) over a textured backdrop. If it is told where the
+turret is pointing, the view shifts accordingly, so the detect -> control -> StepperClient
+loop is closed through the rendered image and tracking error can be scored against the
+known face position. ReplayCamera plays a recorded file at a fixed rate.
+
+Both mimic the bits of cv2.VideoCapture the tracker uses (read/isOpened/release/get) and
+set `finished` once the source runs out.
+
+    python stepper_cli.py bench-track sine --sim --no-display
+    python stepper_cli.py track --cam synth:step --sim
+"""
+
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+from aim_control import interp, load_trajectory, synthetic_trajectory
+
+try:
+    import cv2
+    import numpy as np
+except Exception:
+    cv2 = None
+    np = None
+
+Pointing = Callable[[], Tuple[float, float]]  # (pan steps, tilt steps) as sent via move_ab
+
+# Drawn sprite colours (BGR). The skin tone is far from the grey backdrop in chroma, which
+# is what SpriteDetector keys on.
+SKIN = (120, 160, 225)
+FEATURES = (40, 40, 60)
+
+
+def draw_face(size: int):
+    """A simple cartoon face; Haar cascades pick it up at frontal scale, SpriteDetector always does."""
+    img = np.full((size, size, 3), 128, np.uint8)
+    c = size // 2
+    cv2.ellipse(img, (c, c), (int(size * 0.38), int(size * 0.48)), 0, 0, 360, SKIN, -1)
+    for ex in (c - size // 6, c + size // 6):
+        cv2.ellipse(img, (ex, int(size * 0.30)), (size // 10, size // 30), 0, 0, 360, FEATURES, -1)  # brow
+        cv2.circle(img, (ex, int(size * 0.40)), size // 16, FEATURES, -1)  # eye
+    cv2.line(img, (c, int(size * 0.45)), (c, int(size * 0.60)), FEATURES, max(1, size // 40))
+    cv2.ellipse(img, (c, int(size * 0.70)), (size // 6, size // 18), 0, 0, 360, FEATURES, -1)
+    mask = np.zeros((size, size), np.uint8)
+    cv2.ellipse(mask, (c, c), (int(size * 0.38), int(size * 0.48)), 0, 0, 360, 255, -1)
+    return img, mask
+
+
+class SyntheticCamera:
+    def __init__(self, samples: List[Tuple[float, float, float]], size: Tuple[int, int] = (640, 480),
+                 fps: float = 30.0, face_size: int = 110, sprite: Optional[str] = None,
+                 pointing: Optional[Pointing] = None, px_per_step: float = 20.0, realtime: bool = True,
+                 seed: int = 1):
+        if cv2 is None:
+            raise RuntimeError("OpenCV and numpy are required for the synthetic camera")
+        self.samples = samples
+        self.size = size
+        self.fps = fps
+        self.pointing = pointing
+        self.px_per_step = px_per_step
+        self.realtime = realtime
+        self.duration = samples[-1][0]
+        self.finished = False
+        self.history: List[Tuple[float, float, float]] = []  # (t, true face x, y) in image pixels
+        if sprite:
+            img = cv2.imread(sprite)
+            if img is None:
+                raise ValueError(f"Cannot read sprite {sprite}")
+            self.sprite = cv2.resize(img, (face_size, face_size))
+            self.mask = np.full((face_size, face_size), 255, np.uint8)
+        else:
+            self.sprite, self.mask = draw_face(face_size)
+        # Backdrop larger than the view so panning reveals texture (gives optical flow something to lock on).
+        w, h = size
+        rng = np.random.default_rng(seed)
+        bw, bh = w * 3, h * 3
+        noise = rng.integers(60, 200, (bh // 8, bw // 8), dtype=np.uint8)
+        backdrop = cv2.resize(noise, (bw, bh), interpolation=cv2.INTER_LINEAR)
+        self.backdrop = cv2.cvtColor(backdrop, cv2.COLOR_GRAY2BGR)
+        self._frame = 0
+        self._t0: Optional[float] = None
+
+    def isOpened(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        self.finished = True
+
+    def get(self, prop) -> float:
+        return {cv2.CAP_PROP_FPS: self.fps, cv2.CAP_PROP_FRAME_WIDTH: self.size[0],
+                cv2.CAP_PROP_FRAME_HEIGHT: self.size[1]}.get(prop, 0.0)
+
+    def set(self, prop, value) -> bool:
+        return False
+
+    def read(self):
+        if self.finished:
+            return False, None
+        t = self._frame / self.fps
+        if t > self.duration:
+            self.finished = True
+            return False, None
+        if self.realtime:
+            if self._t0 is None:
+                self._t0 = time.time()
+            wait = self._t0 + t - time.time()
+            if wait > 0:
+                time.sleep(wait)
+        self._frame += 1
+        return True, self._render(t)
+
+    def _render(self, t: float):
+        w, h = self.size
+        pan, tilt = self.pointing() if self.pointing else (0.0, 0.0)
+        # Gimbal offset in pixels, same convention as aim_control.replay (tilt is sent negated).
+        off_x, off_y = pan * self.px_per_step, -tilt * self.px_per_step
+        wx, wy = interp(self.samples, t)
+        fx, fy = wx - off_x, wy - off_y
+        self.history.append((t, fx, fy))
+
+        bh, bw = self.backdrop.shape[:2]
+        x0 = int(min(max(0, (bw - w) / 2 + off_x), bw - w))
+        y0 = int(min(max(0, (bh - h) / 2 + off_y), bh - h))
+        frame = self.backdrop[y0:y0 + h, x0:x0 + w].copy()
+
+        s = self.sprite.shape[0]
+        left, top = int(round(fx - s / 2)), int(round(fy - s / 2))
+        l, tp, r, b = max(0, left), max(0, top), min(w, left + s), min(h, top + s)
+        if l < r and tp < b:
+            roi = frame[tp:b, l:r]
+            spr = self.sprite[tp - top:b - top, l - left:r - left]
+            m = self.mask[tp - top:b - top, l - left:r - left] > 0
+            roi[m] = spr[m]
+        return frame
+
+    def errors(self) -> List[Tuple[float, float]]:
+        """(t, distance of the true face centre from the image centre) for every rendered frame."""
+        w, h = self.size
+        return [(t, ((x - w / 2.0) ** 2 + (y - h / 2.0) ** 2) ** 0.5) for t, x, y in self.history]
+
+
+class ReplayCamera:
+    """A recorded clip played back at a fixed frame rate (open loop: the turret can't move the view)."""
+
+    def __init__(self, path: str, fps: Optional[float] = None, realtime: bool = True):
+        if cv2 is None:
+            raise RuntimeError("OpenCV is required to replay video")
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Cannot open video {path}")
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.realtime = realtime
+        self.finished = False
+        self._next = None
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def release(self) -> None:
+        self.finished = True
+        self.cap.release()
+
+    def get(self, prop) -> float:
+        return self.fps if prop == cv2.CAP_PROP_FPS else self.cap.get(prop)
+
+    def set(self, prop, value) -> bool:
+        return False
+
+    def read(self):
+        ok, frame = self.cap.read()
+        if not ok:
+            self.finished = True
+            return False, None
+        if self.realtime:
+            now = time.time()
+            self._next = now if self._next is None else self._next
+            if self._next > now:
+                time.sleep(self._next - now)
+            self._next += 1.0 / self.fps
+        return True, frame
+
+
+class SpriteDetector:
+    """Finds the drawn face by its skin tone: a near-free, always-correct detector for benchmarking the control loop."""
+
+    def detect(self, image, min_size: int):
+        if image.ndim == 2:
+            return []
+        b, _, r = cv2.split(image)
+        mask = cv2.inRange(cv2.subtract(r, b), 60, 255)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        boxes = [tuple(int(v) for v in stats[i, :4]) for i in range(1, n)
+                 if stats[i, 2] >= min_size * 0.5 and stats[i, 3] >= min_size * 0.5]
+        return boxes
+
+
+def open_source(spec: str, size: Tuple[int, int] = (640, 480), fps: float = 30.0, duration: float = 8.0,
+                pointing: Optional[Pointing] = None, px_per_step: float = 20.0, sprite: Optional[str] = None):
+    """
+    Build a source from a --cam spec: "synth:step", "synth:sine", "synth:<trajectory.csv>" or
+    "replay:<video>". Returns None for anything else (a real camera index/path).
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "replay":
+        return ReplayCamera(arg, fps)
+    if kind != "synth":
+        return None
+    if os.path.isfile(arg):
+        samples, size = load_trajectory(arg)
+    else:
+        samples, size = synthetic_trajectory(arg or "sine", size, duration, fps)
+    return SyntheticCamera(samples, size, fps, pointing=pointing, px_per_step=px_per_step, sprite=sprite)
@@ -0,0 +1,178 @@
+"""
+Minimal local stand-in for the Telegram Bot API, for exercising killcambot without a network.
+
+Implements just getMe and sendVideo (upload or file_id). Uploads are charged a simulated
+transfer time so the gain from re-sending by file_id is visible, an optional per-second
+limit answers 429 + retry_after the way Telegram does, and --error-rate answers a share of
+sendVideo calls with a 5xx to exercise the client's retries.
+
+    python telegram_stub.py --port 8081 --upload-mbps 5
+    python killcambot.py clip.mp4 --api http://127.0.0.1:8081/bot --chats 1,2,3,4,5
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+
+def _parse_form(content_type: str, body: bytes) -> Tuple[Dict[str, str], Dict[str, bytes]]:
+    """Return (fields, files) from a urlencoded or multipart request body."""
+    if content_type.startswith("multipart/"):
+        msg = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        fields, files = {}, {}
+        for part in msg.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename() is not None:
+                files[name] = part.get_payload(decode=True) or b""
+            else:
+                fields[name] = part.get_content().strip()
+        return fields, files
+    return {k: v[0] for k, v in parse_qs(body.decode()).items()}, {}
+
+
+def _value(raw: str):
+    """Bot API form fields are JSON for numbers/objects but plain text for strings."""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+class StubState:
+    def __init__(self, latency: float, upload_mbps: float, rate_limit: float, error_rate: float = 0.0):
+        self.latency = latency
+        self.upload_mbps = upload_mbps
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.fail_next = 0  # answer this many upcoming sendVideo calls with a 5xx, then behave
+        self.lock = threading.Lock()
+        self.message_id = 0
+        self.window: list = []
+        self.stats = {"uploads": 0, "by_file_id": 0, "throttled": 0, "errors": 0, "bytes": 0}
+
+    def fail(self) -> bool:
+        """True if this call should get a 5xx (injected server error)."""
+        with self.lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+            elif not (self.error_rate > 0 and random.random() < self.error_rate):
+                return False
+            self.stats["errors"] += 1
+        return True
+
+    def admit(self) -> Optional[int]:
+        """None if the call may proceed, else seconds the client should wait (429)."""
+        if self.rate_limit <= 0:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            self.window = [t for t in self.window if now - t < 1.0]
+            if len(self.window) >= self.rate_limit:
+                self.stats["throttled"] += 1
+                return 1
+            self.window.append(now)
+        return None
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def _reply(self, payload: dict, code: int = 200):
+            data = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client gave up on this call (timeout, shutdown)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+            method = self.path.rsplit("/", 1)[-1]
+            fields, files = _parse_form(self.headers.get("Content-Type", ""), body)
+            time.sleep(state.latency)
+
+            if method == "getMe":
+                return self._reply({"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "stub",
+                                                           "username": "killcam_stub_bot"}})
+            if method != "sendVideo":
+                return self._reply({"ok": False, "error_code": 404, "description": "Not Found"}, 404)
+
+            wait = state.admit()
+            if wait is not None:
+                return self._reply({"ok": False, "error_code": 429,
+                                    "description": f"Too Many Requests: retry after {wait}",
+                                    "parameters": {"retry_after": wait}}, 429)
+            if state.fail():
+                return self._reply({"ok": False, "error_code": 502, "description": "Bad Gateway"}, 502)
+
+            chat_id = _value(fields.get("chat_id", "0"))
+            video = files.get("video")
+            if video is not None:
+                if state.upload_mbps > 0:
+                    time.sleep(len(video) * 8 / (state.upload_mbps * 1e6))
+                file_id = "stub-" + uuid.uuid4().hex
+                with state.lock:
+                    state.stats["uploads"] += 1
+                    state.stats["bytes"] += len(video)
+                kind = "upload"
+            else:
+                file_id = _value(fields.get("video", ""))
+                with state.lock:
+                    state.stats["by_file_id"] += 1
+                kind = "file_id"
+            with state.lock:
+                state.message_id += 1
+                message_id = state.message_id
+            print(f"[STUB] sendVideo chat={chat_id} via {kind} ({state.stats})")
+            self._reply({"ok": True, "result": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "group", "title": "stub"},
+                "video": {"file_id": file_id, "file_unique_id": file_id[-12:], "width": 640,
+                          "height": 480, "duration": 10},
+                "caption": fields.get("caption"),
+            }})
+
+    return Handler
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Local stub of the Telegram Bot API (getMe, sendVideo)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8081)
+    p.add_argument("--latency", type=float, default=0.05, help="Seconds added to every API call (default 0.05)")
+    p.add_argument("--upload-mbps", type=float, default=5.0,
+                   help="Simulated upload bandwidth for file uploads, 0 = instant (default 5)")
+    p.add_argument("--rate-limit", type=float, default=30.0,
+                   help="sendVideo calls per second before answering 429, 0 = unlimited (default 30)")
+    p.add_argument("--error-rate", type=float, default=0.0,
+                   help="Share of sendVideo calls answered with 502 Bad Gateway (default 0)")
+    ns = p.parse_args(argv)
+
+    state = StubState(ns.latency, ns.upload_mbps, ns.rate_limit, ns.error_rate)
+    srv = ThreadingHTTPServer((ns.host, ns.port), make_handler(state))
+    print(f"[STUB] Bot API stub on http://{ns.host}:{ns.port}/bot")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
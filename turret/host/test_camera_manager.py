@@ -0,0 +1,104 @@
+"""
+Backend cache and shared-capture checks for camera_manager.py. No camera needed:
+
+    python -m unittest test_camera_manager      # from turret/host
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from camera_manager import CameraCache, CameraManager, cv2, probe
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+def write_video(path, frames=12, size=(64, 48)):
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10.0, size)
+    for i in range(frames):
+        img = np.full((size[1], size[0], 3), 40 + 10 * i, np.uint8)
+        out.write(img)
+    out.release()
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "camera_cache.json")
+        self._quiet = contextlib.redirect_stdout(io.StringIO())
+        self._quiet.__enter__()
+
+    def tearDown(self):
+        self._quiet.__exit__(None, None, None)
+        shutil.rmtree(self.dir)
+
+    def test_entries_survive_a_restart(self):
+        CameraCache(self.path).put(0, {"api": "dshow", "width": 640})
+        cache = CameraCache(self.path)
+        self.assertEqual(cache.get("0"), {"api": "dshow", "width": 640})
+        cache.put("0", None)
+        self.assertIsNone(CameraCache(self.path).get("0"))
+
+    def test_unreadable_cache_is_ignored(self):
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        cache = CameraCache(self.path)
+        self.assertEqual(cache.entries, {})
+        cache.put("1", {"api": "v4l2"})
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"1": {"api": "v4l2"}})
+
+    def test_no_path_keeps_entries_in_memory(self):
+        cache = CameraCache(None)
+        cache.put("0", {"api": "auto"})
+        self.assertEqual(cache.get("0"), {"api": "auto"})
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+@unittest.skipIf(cv2 is None or np is None, "needs OpenCV and NumPy")
+class ProbeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.video = os.path.join(self.dir, "clip.avi")
+        write_video(self.video)
+        self._quiet = contextlib.redirect_stdout(io.StringIO())
+        self._quiet.__enter__()
+
+    def tearDown(self):
+        self._quiet.__exit__(None, None, None)
+        shutil.rmtree(self.dir)
+
+    def test_probe_reports_what_worked(self):
+        cap, frame, entry = probe(self.video)
+        self.addCleanup(cap.release)
+        self.assertEqual(frame.shape[:2], (48, 64))
+        self.assertEqual((entry["api"], entry["width"], entry["height"]), ("auto", 64, 48))
+
+    def test_probe_of_a_missing_source_fails(self):
+        self.assertEqual(probe(os.path.join(self.dir, "nope.avi")), (None, None, None))
+
+    def test_video_file_is_read_frame_by_frame(self):
+        manager = CameraManager(os.path.join(self.dir, "camera_cache.json"))
+        cap = manager.acquire(self.video)
+        self.addCleanup(cap.release)
+        self.assertEqual(manager._open, {})  # not shared, not cached
+        levels = []
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            levels.append(int(frame.mean()))
+        self.assertEqual(len(levels), 12)
+        self.assertEqual(levels, sorted(levels))
+        self.assertIsNone(manager.cache.get(self.video))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Delivery and spool persistence checks for clip_queue.py. No network or ffmpeg needed:
+
+    python -m unittest test_clip_queue      # from turret/host
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from clip_queue import ClipQueue
+
+CHATS = ["1", "2", "3"]
+
+
+class FakeSender:
+    """Records deliveries; chats in `failing` don't get the clip."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, path, caption, chat_ids):
+        with self.lock:
+            self.calls.append((os.path.basename(path), caption, list(chat_ids)))
+        return [c for c in chat_ids if c not in self.failing]
+
+
+class ClipQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.spool = os.path.join(self.dir, "spool")
+        self.clip = os.path.join(self.dir, "shot.avi")
+        with open(self.clip, "wb") as f:
+            f.write(b"not really a video")
+        self._quiet = contextlib.redirect_stdout(io.StringIO())
+        self._quiet.__enter__()
+
+    def tearDown(self):
+        self._quiet.__exit__(None, None, None)
+        shutil.rmtree(self.dir)
+
+    def queue(self, sender, **kw) -> ClipQueue:
+        q = ClipQueue(sender, CHATS, spool_dir=self.spool, do_transcode=False, backoff=0.01, **kw).start()
+        self.addCleanup(q.stop)
+        return q
+
+    def spooled(self, q: ClipQueue):
+        return [n for n in os.listdir(self.spool) if n.endswith(".json")]
+
+    def test_delivers_and_clears_the_spool(self):
+        sender = FakeSender()
+        q = self.queue(sender)
+        q.enqueue(self.clip, caption="boom")
+        self.assertTrue(q.wait_idle(5))
+        self.assertEqual(sender.calls, [("shot.avi", "boom", CHATS)])
+        self.assertEqual(self.spooled(q), [])
+        self.assertTrue(os.path.isfile(self.clip))
+
+    def test_retries_only_the_chats_that_failed(self):
+        sender = FakeSender(failing={"2"})
+        q = self.queue(sender, retries=3)
+
+        def recover(path, caption, chat_ids):
+            if len(sender.calls) == 2:
+                sender.failing.clear()
+            return sender(path, caption, chat_ids)
+
+        q.sender = recover
+        q.enqueue(self.clip)
+        self.assertTrue(q.wait_idle(5))
+        self.assertEqual([chats for _, _, chats in sender.calls], [CHATS, ["2"], ["2"]])
+        self.assertEqual(self.spooled(q), [])
+
+    def test_undelivered_job_survives_a_restart(self):
+        first = self.queue(FakeSender(failing={"3"}), retries=1)
+        first.enqueue(self.clip)
+        self.assertTrue(first.wait_idle(5))  # gave up for this run
+        self.assertEqual(len(self.spooled(first)), 1)
+
+        sender = FakeSender()
+        second = self.queue(sender)
+        self.assertTrue(second.wait_idle(5))
+        self.assertEqual([chats for _, _, chats in sender.calls], [["3"]])
+        self.assertEqual(self.spooled(second), [])
+
+    def test_unwritable_spool_still_delivers(self):
+        sender = FakeSender()
+        q = self.queue(sender)
+        shutil.rmtree(self.spool)  # spool gone (or disk full): every save fails
+        q.enqueue(self.clip)
+        self.assertTrue(q.wait_idle(5))
+        self.assertEqual([chats for _, _, chats in sender.calls], [CHATS])
+        self.assertEqual(q.pending, 0)
+
+    def test_missing_clip_is_dropped(self):
+        q = self.queue(FakeSender())
+        q.enqueue(os.path.join(self.dir, "gone.avi"))
+        self.assertTrue(q.wait_idle(5))
+        self.assertEqual(self.spooled(q), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Pre-roll ring buffer checks for clip_recorder.py. No camera needed:
+
+    python -m unittest test_clip_recorder      # from turret/host
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from clip_recorder import FrameRing, cv2, record_from_ring
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+class FrameRingTest(unittest.TestCase):
+    def test_keeps_only_the_preroll(self):
+        ring = FrameRing(preroll=2.0, fps=10.0)
+        for i in range(50):
+            ring.push(i, ts=100.0 + i * 0.1)
+        pre, tap = ring.open_tap()
+        self.assertEqual([f for _, f in pre], list(range(30, 50)))
+        ring.close_tap(tap)
+
+    def test_downsamples_to_the_recording_rate(self):
+        ring = FrameRing(preroll=10.0, fps=10.0)
+        for i in range(90):  # 30 fps camera
+            ring.push(i, ts=100.0 + i / 30.0)
+        pre, tap = ring.open_tap()
+        self.assertEqual(len(pre), 30)
+        ring.close_tap(tap)
+
+    def test_tap_gets_frames_after_the_snapshot_only(self):
+        ring = FrameRing(preroll=1.0, fps=10.0)
+        ring.push("old", ts=1.0)
+        pre, tap = ring.open_tap()
+        ring.push("new", ts=1.2)
+        ring.close_tap(tap)
+        ring.push("after", ts=1.4)
+        self.assertEqual([f for _, f in pre], ["old"])
+        self.assertEqual(tap.get_nowait()[1], "new")
+        self.assertTrue(tap.empty())
+
+
+@unittest.skipIf(cv2 is None or np is None, "needs OpenCV and NumPy")
+class RecordTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.dir)  # clips are written to the working directory
+        self._quiet = contextlib.redirect_stdout(io.StringIO())
+        self._quiet.__enter__()
+
+    def tearDown(self):
+        self._quiet.__exit__(None, None, None)
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def test_clip_has_preroll_and_live_frames(self):
+        ring = FrameRing(preroll=1.0, fps=20.0)
+        frame = np.zeros((48, 64, 3), np.uint8)
+        now = time.time()
+        for i in range(20):
+            ring.push(frame, ts=now - 1.0 + i * 0.05)
+
+        def live():
+            for _ in range(6):
+                time.sleep(0.05)
+                ring.push(frame)
+
+        feeder = threading.Thread(target=live)
+        feeder.start()
+        path = record_from_ring(ring, postroll=0.5, ext="avi")
+        feeder.join()
+        self.assertIsNotNone(path)
+        cap = cv2.VideoCapture(path)
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        self.assertGreaterEqual(frames, 21)
+
+    def test_empty_ring_writes_nothing(self):
+        self.assertIsNone(record_from_ring(FrameRing(), postroll=0.1))
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Event listener and fire queue checks for event_server.py. No hardware needed:
+
+    python -m unittest test_event_server      # from turret/host
+"""
+
+import contextlib
+import io
+import socket
+import threading
+import time
+import unittest
+
+from event_server import EventServer, FireQueue
+
+
+class QuietTestCase(unittest.TestCase):
+    def setUp(self):
+        self._quiet = contextlib.redirect_stdout(io.StringIO())
+        self._quiet.__enter__()
+
+    def tearDown(self):
+        self._quiet.__exit__(None, None, None)
+
+
+class FireQueueTest(QuietTestCase):
+    def test_fires_in_order_with_cooldown(self):
+        fired = []
+        q = FireQueue(lambda e: fired.append((e, time.time())), cooldown=0.2, max_pending=3)
+        self.addCleanup(q.close)
+        for e in ("a", "b", "c"):
+            self.assertTrue(q.submit(e))
+        deadline = time.time() + 3
+        while len(fired) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([e for e, _ in fired], ["a", "b", "c"])
+        gaps = [t1 - t0 for (_, t0), (_, t1) in zip(fired, fired[1:])]
+        self.assertTrue(all(g >= 0.19 for g in gaps), gaps)
+
+    def test_drops_when_backlog_is_full(self):
+        gate = threading.Event()
+        fired = []
+
+        def fire(e):
+            gate.wait(2)
+            fired.append(e)
+
+        q = FireQueue(fire, cooldown=0.0, max_pending=2)
+        self.addCleanup(q.close)
+        q.submit("firing")
+        time.sleep(0.05)  # the worker has taken it
+        self.assertTrue(q.submit("1"))
+        self.assertTrue(q.submit("2"))
+        self.assertFalse(q.submit("3"))
+        self.assertEqual(q.stats["dropped"], 1)
+        gate.set()
+        time.sleep(0.1)
+        self.assertEqual(fired, ["firing", "1", "2"])
+
+    def test_failed_shot_does_not_stop_the_queue(self):
+        fired = []
+
+        def fire(e):
+            if e == "bad":
+                raise RuntimeError("jammed")
+            fired.append(e)
+
+        q = FireQueue(fire, cooldown=0.0)
+        self.addCleanup(q.close)
+        q.submit("bad")
+        q.submit("good")
+        time.sleep(0.1)
+        self.assertEqual(fired, ["good"])
+        self.assertEqual(q.stats["fired"], 1)
+
+    def test_close_drops_leftovers(self):
+        gate = threading.Event()
+        fired = []
+        q = FireQueue(lambda e: (gate.wait(2), fired.append(e)), cooldown=0.0, max_pending=2)
+        q.submit("firing")
+        time.sleep(0.05)
+        q.submit("leftover")
+        closer = threading.Thread(target=q.close)
+        closer.start()
+        time.sleep(0.05)
+        gate.set()
+        closer.join(3)
+        self.assertEqual(fired, ["firing"])
+
+
+class EventServerTest(QuietTestCase):
+    def setUp(self):
+        super().setUp()
+        self.got = []
+        self.cond = threading.Condition()
+        self.server = EventServer("127.0.0.1", 0, self.on_message)
+        self.server.port = self._free_port()
+        self.server.start()
+        self.addCleanup(self.server.close)
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    def on_message(self, msg, addr):
+        with self.cond:
+            self.got.append(msg)
+            self.cond.notify_all()
+
+    def wait_for(self, n: int):
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.got) >= n, timeout=2)
+        return self.got
+
+    def connect(self) -> socket.socket:
+        s = socket.create_connection(("127.0.0.1", self.server.port))
+        self.addCleanup(s.close)
+        return s
+
+    def test_lines_and_bare_packets(self):
+        s = self.connect()
+        s.sendall(b"NO CREDS\nNO CREDS #ab12\n")
+        self.wait_for(2)
+        s.sendall(b"NO CREDS")
+        self.assertEqual(self.wait_for(3), ["NO CREDS", "NO CREDS #ab12", "NO CREDS"])
+
+    def test_many_clients_and_reconnects(self):
+        a, b = self.connect(), self.connect()
+        a.sendall(b"from a\n")
+        b.sendall(b"from b\n")
+        self.wait_for(2)
+        a.close()
+        c = self.connect()
+        c.sendall(b"from c\n")
+        self.assertEqual(sorted(self.wait_for(3)), ["from a", "from b", "from c"])
+        deadline = time.time() + 2
+        while self.server.clients != 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.server.clients, 2)
+
+
+    def test_heartbeat_is_answered_and_not_an_event(self):
+        s = self.connect()
+        s.sendall(b"PING\n")
+        self.assertEqual(s.recv(16), b"PONG\n")
+        s.sendall(b"PING\nNO CREDS\n")
+        self.assertEqual(self.wait_for(1), ["NO CREDS"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+Detection and tracking checks for face_detect.py on synthetic frames. No camera needed:
+
+    python -m unittest test_face_detect      # from turret/host
+"""
+
+import unittest
+
+from face_detect import (DetectThenTrack, FaceFinder, FlowTracker, bench_detectors, cv2, iou, largest,
+                         make_detector, percentile)
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+def textured(shape=(480, 640), seed=0):
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, shape, dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (5, 5), 0)
+
+
+class FakeFinder:
+    """Detector stand-in that returns `box` (or None) and counts calls."""
+
+    max_misses = 3
+
+    def __init__(self, box):
+        self.box = box
+        self.misses = 0
+        self.roi = None
+        self.hints = []
+
+    def find(self, frame):
+        self.misses = 0 if self.box else self.misses + 1
+        return self.box
+
+    def hint(self, box):
+        self.hints.append(box)
+
+    def reset(self):
+        self.misses = 0
+
+
+class FakeTracker:
+    def __init__(self):
+        self.lost = False
+
+    def init(self, gray, box):
+        self.box = box
+        return True
+
+    def update(self, gray):
+        return None if self.lost else self.box
+
+
+class BrightSpot:
+    """Detector stand-in: the bounding box of the bright pixels, if big enough."""
+
+    def __init__(self):
+        self.searched = []
+
+    def detect(self, img, min_size):
+        self.searched.append(img.shape[:2])
+        ys, xs = np.nonzero(img[..., 0] > 128)
+        if len(xs) == 0:
+            return []
+        box = (int(xs.min()), int(ys.min()), int(xs.max() - xs.min() + 1), int(ys.max() - ys.min() + 1))
+        return [box] if min(box[2], box[3]) >= min_size else []
+
+
+def frame_with_face(x, y, size=80, shape=(480, 640)):
+    img = np.zeros(shape + (3,), np.uint8)
+    img[y:y + size, x:x + size] = 255
+    return img
+
+
+class GeometryTest(unittest.TestCase):
+    def test_iou(self):
+        self.assertEqual(iou((0, 0, 10, 10), (0, 0, 10, 10)), 1.0)
+        self.assertEqual(iou((0, 0, 10, 10), (20, 20, 10, 10)), 0.0)
+        self.assertAlmostEqual(iou((0, 0, 10, 10), (5, 0, 10, 10)), 50 / 150)
+        self.assertEqual(iou((0, 0, 0, 0), (0, 0, 0, 0)), 0.0)
+
+    def test_largest(self):
+        self.assertIsNone(largest([]))
+        self.assertEqual(largest([(0, 0, 5, 5), (9, 9, 6, 6), (1, 1, 2, 9)]), (9, 9, 6, 6))
+
+    def test_percentile_nearest_rank(self):
+        vals = list(range(1, 101))
+        self.assertEqual(percentile(vals, 50), 50)
+        self.assertEqual(percentile(vals, 99), 99)
+        self.assertEqual(percentile(vals, 100), 100)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_unknown_detector(self):
+        with self.assertRaises(ValueError):
+            make_detector("sift")
+
+
+@unittest.skipIf(cv2 is None or np is None, "needs OpenCV and NumPy")
+class FaceFinderTest(unittest.TestCase):
+    def test_downscaled_detection_reports_full_resolution(self):
+        finder = FaceFinder(BrightSpot(), scale=0.5, min_face=40)
+        x, y, w, h = finder.find(frame_with_face(200, 100))
+        self.assertLessEqual(abs(x - 200) + abs(y - 100), 4)
+        self.assertLessEqual(abs(w - 80) + abs(h - 80), 4)
+
+    def test_roi_follows_the_last_face_and_resets_after_misses(self):
+        det = BrightSpot()
+        finder = FaceFinder(det, roi_margin=1.0, max_misses=2, min_face=40)
+        finder.find(frame_with_face(200, 100))
+        self.assertEqual(finder.find(frame_with_face(210, 110)), (210, 110, 80, 80))
+        self.assertEqual(det.searched[-1], (240, 240))  # face plus one face size either side
+        empty = np.zeros((480, 640, 3), np.uint8)
+        finder.find(empty)
+        finder.find(empty)
+        finder.find(empty)
+        self.assertEqual(det.searched[-1], (480, 640))  # back to full-frame search
+
+    def test_bench_agreement(self):
+        frames = [frame_with_face(100, 100), np.zeros((480, 640, 3), np.uint8)]
+
+        class Blind:
+            def detect(self, img, min_size):
+                return []
+
+        stats = bench_detectors({"spot": BrightSpot(), "blind": Blind()}, frames, 40, reference="spot")
+        self.assertEqual(stats["spot"]["hit_rate"], 0.5)
+        self.assertEqual(stats["spot"]["agreement"], 1.0)
+        self.assertEqual(stats["blind"]["agreement"], 0.5)
+
+
+@unittest.skipIf(cv2 is None or np is None, "needs OpenCV and NumPy")
+class FlowTrackerTest(unittest.TestCase):
+    def test_follows_a_shifted_patch(self):
+        img = textured()
+        tracker = FlowTracker()
+        self.assertTrue(tracker.init(img, (200, 150, 100, 100)))
+        moved = np.roll(img, shift=(-4, 6), axis=(0, 1))
+        x, y, w, h = tracker.update(moved)
+        self.assertLessEqual(abs(x - 206), 1)
+        self.assertLessEqual(abs(y - 146), 1)
+        self.assertEqual((w, h), (100, 100))
+
+    def test_refuses_a_featureless_box(self):
+        tracker = FlowTracker()
+        self.assertFalse(tracker.init(np.zeros((480, 640), np.uint8), (200, 150, 100, 100)))
+        self.assertIsNone(tracker.update(np.zeros((480, 640), np.uint8)))
+
+
+@unittest.skipIf(cv2 is None or np is None, "needs OpenCV and NumPy")
+class DetectThenTrackTest(unittest.TestCase):
+    frame = np.zeros((48, 64, 3), np.uint8) if np is not None else None
+
+    def test_detects_every_n_frames_and_tracks_between(self):
+        finder = FakeFinder((10, 10, 20, 20))
+        dtt = DetectThenTrack(finder, FakeTracker(), detect_every=3)
+        sources = []
+        for _ in range(9):
+            self.assertEqual(dtt.find(self.frame), (10, 10, 20, 20))
+            sources.append(dtt.source)
+        self.assertEqual(sources, ["detect", "track", "track"] * 3)
+        self.assertEqual((dtt.detections, dtt.tracked), (3, 6))
+
+    def test_lost_track_falls_back_to_detection(self):
+        tracker = FakeTracker()
+        dtt = DetectThenTrack(FakeFinder((10, 10, 20, 20)), tracker, detect_every=5)
+        dtt.find(self.frame)
+        tracker.lost = True
+        dtt.find(self.frame)
+        self.assertEqual(dtt.source, "detect")
+        self.assertEqual(dtt.detections, 2)
+
+    def test_coasts_on_the_tracker_through_a_few_misses(self):
+        finder = FakeFinder((10, 10, 20, 20))
+        dtt = DetectThenTrack(finder, FakeTracker(), detect_every=1)
+        dtt.find(self.frame)
+        finder.box = None
+        for _ in range(4):  # misses alternate with tracked frames
+            self.assertEqual(dtt.find(self.frame), (10, 10, 20, 20))
+            self.assertEqual(dtt.source, "track")
+        self.assertIsNone(dtt.find(self.frame))  # third miss: give up
+        self.assertEqual(finder.misses, FakeFinder.max_misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+VideoSender checks against the local Bot API stub (telegram_stub.py). No network needed:
+
+    python -m unittest test_killcambot      # from turret/host
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer
+
+try:
+    from killcambot import VideoSender
+except ImportError:  # python-telegram-bot not installed
+    VideoSender = None
+from telegram_stub import StubState, make_handler
+
+CHATS = ["101", "102", "103"]
+
+
+@unittest.skipIf(VideoSender is None, "needs python-telegram-bot")
+class VideoSenderTest(unittest.TestCase):
+    def setUp(self):
+        self._quiet = contextlib.redirect_stdout(io.StringIO())
+        self._quiet.__enter__()
+        self.addCleanup(self._quiet.__exit__, None, None, None)  # after the stub and sender have stopped
+        self.dir = tempfile.mkdtemp()
+        self.clip = os.path.join(self.dir, "shot.mp4")
+        with open(self.clip, "wb") as f:
+            f.write(os.urandom(4096))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def start(self, rate_limit: float = 0.0) -> VideoSender:
+        self.state = StubState(latency=0.0, upload_mbps=0.0, rate_limit=rate_limit)
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(self.state))
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        self.addCleanup(srv.server_close)
+        self.addCleanup(srv.shutdown)
+        sender = VideoSender(token="123:stub", base_url=f"http://127.0.0.1:{srv.server_port}/bot",
+                             retry_backoff=0.01)
+        self.addCleanup(sender.close)
+        return sender
+
+    def test_uploads_once_then_fans_out_by_file_id(self):
+        sender = self.start()
+        self.assertEqual(sorted(sender.send(self.clip, "boom", CHATS, timeout=30)), CHATS)
+        self.assertEqual((self.state.stats["uploads"], self.state.stats["by_file_id"]), (1, 2))
+
+        # The same clip again goes out by file_id only.
+        self.assertEqual(sorted(sender.send(self.clip, None, CHATS, timeout=30)), CHATS)
+        self.assertEqual((self.state.stats["uploads"], self.state.stats["by_file_id"]), (1, 5))
+
+    def test_rate_limited_sends_are_retried(self):
+        sender = self.start(rate_limit=2)
+        self.assertEqual(sorted(sender.send(self.clip, None, CHATS + ["104"], timeout=30)), CHATS + ["104"])
+        self.assertGreater(self.state.stats["throttled"], 0)
+
+    def test_server_errors_are_retried(self):
+        sender = self.start()
+        self.state.fail_next = 2  # the upload fails twice with 502, then goes through
+        self.assertEqual(sorted(sender.send(self.clip, None, CHATS, timeout=30)), CHATS)
+        self.assertEqual(self.state.stats["errors"], 2)
+        self.assertEqual(self.state.stats["uploads"], 1)
+
+    def test_send_gives_up_after_its_timeout(self):
+        sender = self.start()
+        sender.send(self.clip, None, CHATS[:1], timeout=30)  # session up
+        self.state.latency = 0.5
+        t0 = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            sender.send(self.clip, None, CHATS, timeout=0.2)
+        self.assertLess(time.monotonic() - t0, 0.45)
+        self.state.latency = 0.0
+        time.sleep(0.5)  # let the stub finish the calls the sender abandoned
+
+    def test_missing_clip_sends_nothing(self):
+        sender = self.start()
+        self.assertEqual(sender.send(os.path.join(self.dir, "gone.mp4"), None, CHATS, timeout=30), [])
+        self.assertEqual(self.state.stats["uploads"], 0)
+
+    def test_close_stops_the_loop(self):
+        sender = self.start()
+        sender.send(self.clip, None, CHATS[:1], timeout=30)
+        sender.close()
+        self.assertFalse(sender._thread.is_alive())
+        self.assertTrue(sender._loop.is_closed())
+        sender.close()  # a second close is harmless
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tracking pipeline helper checks for stepper_cli.py. No hardware or camera needed:
+
+    python -m unittest test_stepper_cli      # from turret/host
+"""
+
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from stepper_cli import LatestSlot, RateMeter, _face_steps
+
+
+class LatestSlotTest(unittest.TestCase):
+    def test_reader_gets_only_the_newest_item(self):
+        slot = LatestSlot()
+        for frame in ("f1", "f2", "f3"):
+            slot.put(frame)
+        seq, item = slot.get(0, timeout=1)
+        self.assertEqual(item, "f3")
+        self.assertEqual(slot.get(seq, timeout=0.05), (seq, None))  # nothing newer yet
+
+    def test_get_waits_for_a_new_item(self):
+        slot = LatestSlot()
+        threading.Timer(0.05, slot.put, args=("late",)).start()
+        t0 = time.monotonic()
+        self.assertEqual(slot.get(0, timeout=2)[1], "late")
+        self.assertLess(time.monotonic() - t0, 1.0)
+
+    def test_close_wakes_readers(self):
+        slot = LatestSlot()
+        threading.Timer(0.05, slot.close).start()
+        t0 = time.monotonic()
+        self.assertEqual(slot.get(0, timeout=2), (0, None))
+        self.assertLess(time.monotonic() - t0, 1.0)
+
+
+class FaceStepsTest(unittest.TestCase):
+    ns = SimpleNamespace(max_step=20, step_scale=0.1, invert_x=False, invert_y=False)
+
+    def test_steps_towards_the_centre(self):
+        self.assertEqual(_face_steps(self.ns, (400, 100, 40, 40), (480, 640)), (10, -12))
+        self.assertEqual(_face_steps(self.ns, None, (480, 640)), (0, 0))
+
+    def test_clamped_and_inverted(self):
+        ns = SimpleNamespace(max_step=5, step_scale=0.1, invert_x=True, invert_y=False)
+        self.assertEqual(_face_steps(ns, (600, 440, 40, 40), (480, 640)), (-5, 5))
+
+
+class RateMeterTest(unittest.TestCase):
+    def test_converges_on_the_event_rate(self):
+        meter = RateMeter(alpha=0.2)
+        self.assertEqual(meter.tick(0.0), 0.0)
+        for i in range(1, 100):
+            rate = meter.tick(i / 20.0)
+        self.assertAlmostEqual(rate, 20.0, places=3)
+
+    def test_smooths_a_single_stall(self):
+        meter = RateMeter(alpha=0.1)
+        for i in range(50):
+            meter.tick(i / 30.0)
+        self.assertGreater(meter.tick(49 / 30.0 + 1.0), 25.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
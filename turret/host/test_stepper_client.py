@@ -0,0 +1,211 @@
+"""
+StepperClient checks against a fake firmware on a pseudo-terminal. No hardware needed (Linux/macOS):
+
+    python -m unittest test_stepper_client      # from turret/host
+"""
+
+import contextlib
+import io
+import os
+import select
+import threading
+import time
+import tty
+import unittest
+from unittest import mock
+
+from firmware_sim import FirmwareSim
+from stepper_cli import StepperClient
+from turret_position import PositionModel
+
+
+class FakeFirmware:
+    """Answers each command line with "OK <CMD>" after `delay` seconds, in order, like the turret firmware."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.silent = False  # swallow commands without replying
+        self.drop = 0  # swallow just the next `drop` commands
+        self.reject = set()  # commands answered with "ERR <CMD>"
+        self.received = []
+        self._closed = threading.Event()
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        # Stop the reader before closing: a reused fd number would hand it the next test's pty.
+        self._closed.set()
+        self._thread.join(1.0)
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def emit(self, line: str) -> None:
+        os.write(self._master, (line + "\r\n").encode())
+
+    def _loop(self) -> None:
+        buf = b""
+        while not self._closed.is_set():
+            if not select.select([self._master], [], [], 0.05)[0]:
+                continue
+            try:
+                data = os.read(self._master, 1024)
+            except OSError:
+                return
+            if not data:
+                return
+            buf += data
+            while b"\n" in buf:
+                raw, buf = buf.split(b"\n", 1)
+                line = raw.decode().strip()
+                self.received.append(line)
+                if self.silent or self.drop:
+                    self.drop = max(0, self.drop - 1)
+                    continue
+                time.sleep(self.delay)
+                cmd = line.split()[0].upper()
+                self.emit(("ERR " if cmd in self.reject else "OK ") + cmd)
+
+
+class StepperClientTestCase(unittest.TestCase):
+    def connect(self, delay: float = 0.0, **kw) -> StepperClient:
+        self.fw = FakeFirmware(delay)
+        self.addCleanup(self.fw.close)
+        with mock.patch("time.sleep"):  # skip the wait for an Uno reset
+            client = StepperClient(self.fw.port, **kw)
+        self.addCleanup(client.close)
+        return client
+
+
+class PipelineTest(StepperClientTestCase):
+    def test_replies_resolve_in_command_order(self):
+        client = self.connect(delay=0.02, timeout=2.0, max_inflight=4)
+        futs = [client.submit(cmd) for cmd in ("A 5", "B -5", "TARGET", "SPEED 10")]
+        self.assertEqual([f.result(2.0) for f in futs], ["OK A", "OK B", "OK TARGET", "OK SPEED"])
+        self.assertEqual(self.fw.received, ["A 5", "B -5", "TARGET", "SPEED 10"])
+
+    def test_unsolicited_lines_go_to_the_log(self):
+        client = self.connect(timeout=2.0)
+        self.fw.emit("READY")
+        self.assertEqual(client.step_a(3), "OK A")
+        self.assertIn("READY", client.recent_log())
+
+    def test_submit_fails_when_inflight_is_full(self):
+        client = self.connect(timeout=0.2, max_inflight=2)
+        self.fw.silent = True
+        futs = [client.submit("A 1") for _ in range(3)]
+        self.assertIsInstance(futs[2].exception(1.0), TimeoutError)
+        self.assertFalse(futs[0].done())
+
+    def test_lost_reply_resyncs_instead_of_shifting_later_replies(self):
+        client = self.connect(timeout=0.3, max_inflight=1)
+        self.fw.drop = 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(client.step_a(1), "")
+        self.assertEqual(client.step_b(2), "OK B")  # the slot is free again and B gets its own reply
+        self.assertEqual(client.speed(5), "OK SPEED")
+
+    def test_late_reply_is_logged_not_matched(self):
+        client = self.connect(delay=0.4, timeout=0.3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(client.step_a(1), "")
+        self.fw.delay = 0.0
+        self.assertEqual(client.step_b(2), "OK B")
+        self.assertIn("OK A", client.recent_log())
+
+
+class MotionTest(StepperClientTestCase):
+    def test_corrections_during_a_move_are_summed(self):
+        client = self.connect(delay=0.2, timeout=2.0)
+        client.move_ab(10, 0)
+        time.sleep(0.05)  # the first move is now executing
+        for _ in range(4):
+            client.move_ab(1, 2)
+        self.assertTrue(client.wait_motion_idle(3.0))
+        self.assertEqual(self.fw.received, ["AB 10 0", "AB 4 8"])
+        self.assertEqual(client.motion_stats["coalesced"], 3)
+        self.assertEqual(client.motion_stats["sent"], 2)
+
+    def test_latest_merge_keeps_the_newest_correction(self):
+        client = self.connect(delay=0.2, timeout=2.0)
+        client.move_ab(10, 0)
+        time.sleep(0.05)
+        for a in (1, 2, 3):
+            client.move_ab(a, -a, merge="latest")
+        self.assertTrue(client.wait_motion_idle(3.0))
+        self.assertEqual(self.fw.received, ["AB 10 0", "AB 3 -3"])
+
+    def test_cancelled_out_corrections_send_nothing(self):
+        client = self.connect(delay=0.2, timeout=2.0)
+        client.move_ab(10, 0)
+        time.sleep(0.05)
+        client.move_ab(5, 5)
+        client.move_ab(-5, -5)
+        self.assertTrue(client.wait_motion_idle(3.0))
+        self.assertEqual(self.fw.received, ["AB 10 0"])
+
+
+class PositionTest(StepperClientTestCase):
+    def test_moves_are_clamped_and_counted(self):
+        pos = PositionModel(path=None)
+        pos.set_limits("A", -50, 50)
+        client = self.connect(timeout=2.0, position=pos)
+        self.assertEqual(client.step_a(40), "OK A")
+        self.assertEqual(client.step_a(40), "OK A")
+        self.assertEqual(self.fw.received, ["A 40", "A 10"])
+        self.assertEqual(pos.pos["A"], 50)
+        self.assertEqual(client.goto(a_pos=-20), "OK AB")
+        self.assertEqual(pos.pos["A"], -20)
+
+    def test_rejected_move_is_reverted(self):
+        pos = PositionModel(path=None)
+        client = self.connect(timeout=2.0, position=pos)
+        self.fw.reject = {"B"}
+        self.assertEqual(client.step_b(30), "ERR B")
+        self.assertEqual(pos.pos["B"], 0)
+        self.assertFalse(pos.uncertain)
+
+    def test_unanswered_move_needs_a_re_home(self):
+        pos = PositionModel(path=None)
+        client = self.connect(timeout=0.3, position=pos)
+        self.fw.drop = 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(client.step_a(30), "")
+        self.assertTrue(pos.uncertain)
+        self.assertEqual(pos.pos["A"], 30)  # left as commanded, but no longer trusted
+        self.assertTrue(client.goto(a_pos=0).startswith("ERR"))
+        self.assertEqual(self.fw.received, ["A 30"])
+        pos.set_home()
+        self.assertEqual(client.goto(a_pos=10), "OK AB")
+
+
+class FirmwareSimTest(unittest.TestCase):
+    """The same session over both wire protocols, against the firmware emulator."""
+
+    def session(self, protocol: str) -> None:
+        sim = FirmwareSim(time_scale=0).start()
+        self.addCleanup(sim.close)
+        with mock.patch("time.sleep"):
+            client = StepperClient(sim.port, timeout=2.0, protocol=protocol)
+        self.addCleanup(client.close)
+        futs = [client.submit(cmd) for cmd in ("A 10", "AB 3 -4", "SPEED 20", "C 2")]
+        self.assertEqual([f.result(2.0) for f in futs], ["OK A", "OK AB", "OK SPEED", "OK C"])
+        self.assertEqual(client.stop(), "OK STOP")
+        self.assertEqual(client.step_a(5), "OK A")  # ACKed but ignored while stopped
+        self.assertEqual(client.target(), "ERR TARGET STOPPED")
+        self.assertEqual(sim.steps, {"A": 13, "B": -4, "C": 2})
+
+    def test_ascii(self):
+        self.session("ascii")
+
+    def test_binary(self):
+        self.session("binary")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Binary command/reply codec checks for stepper_cli.py. No hardware needed:
+
+    python -m unittest test_stepper_protocol      # from turret/host
+"""
+
+import struct
+import unittest
+
+from stepper_cli import BIN_OPS, BIN_REPLY, BIN_SYNC, crc8, decode_reply, encode_command, encode_frame
+
+
+def reply(seq: int, status: int) -> bytes:
+    return bytes([BIN_REPLY, seq, status, crc8(bytes([seq, status]))])
+
+
+class Crc8Test(unittest.TestCase):
+    def test_check_value(self):
+        self.assertEqual(crc8(b"123456789"), 0xF4)  # CRC-8/SMBUS (poly 0x07, init 0)
+        self.assertEqual(crc8(b""), 0)
+
+    def test_detects_single_bit_errors(self):
+        frame = encode_frame(BIN_OPS["AB"], 7, 100, -100)
+        for i in range(1, len(frame) - 1):
+            for bit in range(8):
+                body = bytearray(frame[1:-1])
+                body[i - 1] ^= 1 << bit
+                self.assertNotEqual(crc8(bytes(body)), frame[-1])
+
+
+class EncodeTest(unittest.TestCase):
+    def test_round_trip(self):
+        frame, name = encode_command("AB -300 42", seq=257)
+        self.assertEqual(name, "AB")
+        self.assertEqual(len(frame), 10)
+        self.assertEqual(frame[0], BIN_SYNC)
+        self.assertEqual(crc8(frame[1:-1]), frame[-1])
+        self.assertEqual(struct.unpack("<BBhhh", frame[1:-1]), (BIN_OPS["AB"], 1, -300, 42, 0))
+
+    def test_aliases_and_case(self):
+        self.assertEqual(encode_command("s", 0)[1], "STOP")
+        self.assertEqual(encode_command("resume", 0)[1], "RESUME")
+        self.assertEqual(encode_command("speed 12", 0)[0], encode_frame(BIN_OPS["SPEED"], 0, 12))
+
+    def test_commands_without_a_binary_form(self):
+        for line in ("", "HELP", "DEMO ON", "A", "A 1 2", "A x", "A 40000", "AB 1 -32769"):
+            self.assertIsNone(encode_command(line, 0), line)
+
+
+class DecodeTest(unittest.TestCase):
+    def test_round_trip(self):
+        for seq in (0, 1, 128, 255):
+            for status in range(5):
+                self.assertEqual(decode_reply(reply(seq, status)), (seq, status))
+
+    def test_rejects_malformed(self):
+        good = reply(3, 0)
+        for bad in (good[:3], b"\xa5" + good[1:], good[:3] + bytes([good[3] ^ 1])):
+            with self.assertRaises(ValueError):
+                decode_reply(bad)
+
+
+if __name__ == "__main__":
+    unittest.main()
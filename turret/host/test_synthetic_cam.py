@@ -0,0 +1,47 @@
+"""
+Synthetic camera checks for synthetic_cam.py. No camera needed:
+
+    python -m unittest test_synthetic_cam      # from turret/host
+"""
+
+import unittest
+
+from synthetic_cam import SpriteDetector, SyntheticCamera, cv2, open_source
+
+
+@unittest.skipIf(cv2 is None, "needs OpenCV and NumPy")
+class SyntheticCameraTest(unittest.TestCase):
+    def test_detector_finds_the_face_where_it_was_drawn(self):
+        cam = SyntheticCamera([(0.0, 200.0, 150.0), (1.0, 400.0, 300.0)], realtime=False)
+        det = SpriteDetector()
+        for _ in range(10):
+            ok, frame = cam.read()
+            self.assertTrue(ok)
+            x, y, w, h = max(det.detect(frame, 60), key=lambda b: b[2] * b[3])
+            _, fx, fy = cam.history[-1]
+            self.assertLessEqual(abs(x + w / 2 - fx), 3)
+            self.assertLessEqual(abs(y + h / 2 - fy), 3)
+
+    def test_pointing_shifts_the_view(self):
+        pointing = [0.0, 0.0]
+        cam = SyntheticCamera([(0.0, 320.0, 240.0), (1.0, 320.0, 240.0)], realtime=False,
+                              pointing=lambda: tuple(pointing), px_per_step=10.0)
+        cam.read()
+        pointing[:] = [5.0, 2.0]  # pan right, tilt up
+        cam.read()
+        self.assertEqual(cam.history[-1][1:], (270.0, 260.0))
+        self.assertAlmostEqual(cam.errors()[0][1], 0.0)
+
+    def test_source_ends_after_the_trajectory(self):
+        cam = open_source("synth:step", fps=10.0, duration=1.0)
+        cam.realtime = False
+        frames = 0
+        while cam.read()[0]:
+            frames += 1
+        self.assertEqual(frames, 10)
+        self.assertTrue(cam.finished)
+        self.assertIsNone(open_source("0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Soft-limit and persistence checks for turret_position.py. No hardware needed:
+
+    python -m unittest test_turret_position      # from turret/host
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from turret_position import PositionModel
+
+
+class PositionModelTest(unittest.TestCase):
+    def model(self) -> PositionModel:
+        m = PositionModel(path=None)
+        m.set_limits("A", -100, 100)
+        m.set_limits("B", -20, 20)
+        return m
+
+    def test_reserve_clamps_to_soft_limits(self):
+        m = self.model()
+        self.assertEqual(m.reserve("A", 80), (80, 80))
+        self.assertEqual(m.reserve("A", 80), (20, 20))
+        self.assertEqual(m.reserve("A", 5), (0, 0))
+        self.assertEqual(m.reserve("B", -50), (-20, -20))
+        self.assertEqual(m.pos, {"A": 100, "B": -20})
+
+    def test_clamp_does_not_count(self):
+        m = self.model()
+        self.assertEqual(m.clamp("A", 500), 100)
+        self.assertEqual(m.pos["A"], 0)
+        self.assertEqual(m.clamp("C", 500), 500)  # the trigger axis has no limits
+
+    def test_revert_undoes_a_rejected_move(self):
+        m = self.model()
+        m.reserve("A", 30)
+        m.reserve("A", 40)
+        m.revert("A", 40)
+        self.assertEqual(m.pos["A"], 30)
+
+    def test_revert_after_stop_still_undoes_the_counted_part(self):
+        m = self.model()
+        _, counted = m.reserve("A", 30)
+        m.enabled = False  # STOP pipelined behind the move that is then rejected
+        m.revert("A", counted)
+        self.assertEqual(m.pos["A"], 0)
+
+    def test_stopped_firmware_moves_nothing(self):
+        m = self.model()
+        m.enabled = False
+        self.assertEqual(m.reserve("A", 30), (30, 0))
+        self.assertEqual(m.pos["A"], 0)
+
+    def test_delta_to_absolute_position(self):
+        m = self.model()
+        m.reserve("A", 30)
+        self.assertEqual(m.delta_to("A", -10), -40)
+        self.assertEqual(m.delta_to("A", 1000), 70)
+
+    def test_bad_limits_rejected(self):
+        with self.assertRaises(ValueError):
+            self.model().set_limits("A", 10, -10)
+
+    def test_position_survives_restart(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, "pos.json")
+        m = PositionModel(path)
+        m.set_home()
+        m.reserve("A", 42)
+        m.save(force=True)
+        again = PositionModel(path)
+        self.assertEqual(again.pos["A"], 42)
+        self.assertTrue(again.homed)
+
+    def test_uncertain_until_re_homed(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, "pos.json")
+        m = PositionModel(path)
+        m.set_home()
+        m.mark_uncertain()
+        again = PositionModel(path)
+        self.assertTrue(again.uncertain)
+        self.assertIn("re-home", again.describe())
+        again.set_home()
+        self.assertFalse(PositionModel(path).uncertain)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Host-side position model for the turret's pan (A) and tilt (B) axes.
+
+The firmware only takes relative step counts and keeps no state, so the host counts
+commanded steps (undoing any the firmware rejects) from a calibrated home, clamps
+moves to soft limits, and persists
+the result to a small JSON file so it survives restarts of the CLI. (The Uno resets
+when the port opens but the motors don't move, so the physical position carries over.)
+
+Position is only as good as the step count: a RELEASE/STOP lets the gimbal sag, and
+missed steps aren't detected. A move that got no reply may or may not have run, so it
+marks the position uncertain until the next home. Re-run `stepper_cli.py home` after
+re-centring by hand.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(HOST_DIR, "turret_position.json")
+AXES = ("A", "B")
+# Conservative defaults: half a turn of pan either way, a small tilt range.
+DEFAULT_LIMITS = {"A": (-1024, 1024), "B": (-300, 300)}
+
+
+class PositionModel:
+    def __init__(self, path: Optional[str] = DEFAULT_PATH, save_interval: float = 1.0):
+        """path=None keeps the model in memory only; saves are throttled to one per save_interval."""
+        self.path = path
+        self.save_interval = save_interval
+        self.pos: Dict[str, int] = {axis: 0 for axis in AXES}
+        self.limits: Dict[str, Tuple[int, int]] = dict(DEFAULT_LIMITS)
+        self.homed = False
+        self.uncertain = False  # a move went unanswered; the count can't be trusted until re-homed
+        self.enabled = True  # firmware ignores moves after STOP until RESUME, but still ACKs them
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+        self.load()
+
+    def load(self) -> None:
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.pos = {axis: int(data.get("pos", {}).get(axis, 0)) for axis in AXES}
+            for axis, lim in data.get("limits", {}).items():
+                if axis in AXES:
+                    self.limits[axis] = (int(lim[0]), int(lim[1]))
+            self.homed = bool(data.get("homed", False))
+            self.uncertain = bool(data.get("uncertain", False))
+        except (OSError, ValueError, TypeError, IndexError) as e:
+            print(f"[POS] ignoring unreadable {self.path}: {e}")
+
+    def save(self, force: bool = False) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            if not force and (not self._dirty or time.time() - self._last_save < self.save_interval):
+                return
+            data = {"pos": dict(self.pos), "limits": {a: list(l) for a, l in self.limits.items()},
+                    "homed": self.homed, "uncertain": self.uncertain, "saved": time.time()}
+            self._dirty = False
+            self._last_save = time.time()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)  # atomic, so a crash never leaves a half-written file
+
+    def set_home(self) -> None:
+        """Declare the current physical pointing as (0, 0)."""
+        with self._lock:
+            self.pos = {axis: 0 for axis in AXES}
+            self.homed = True
+            self.uncertain = False
+            self._dirty = True
+        self.save(force=True)
+
+    def set_limits(self, axis: str, lo: int, hi: int) -> None:
+        if axis not in AXES or lo > hi:
+            raise ValueError(f"bad limits for {axis}: {lo}..{hi}")
+        with self._lock:
+            self.limits[axis] = (lo, hi)
+            self._dirty = True
+        self.save(force=True)
+
+    def clamp(self, axis: str, delta: int) -> int:
+        """Largest part of `delta` that keeps `axis` within its soft limits."""
+        if axis not in AXES:
+            return delta
+        lo, hi = self.limits[axis]
+        with self._lock:
+            target = max(lo, min(hi, self.pos[axis] + delta))
+            return target - self.pos[axis]
+
+    def delta_to(self, axis: str, target: int) -> int:
+        lo, hi = self.limits[axis]
+        with self._lock:
+            return max(lo, min(hi, target)) - self.pos[axis]
+
+    def reserve(self, axis: str, delta: int) -> Tuple[int, int]:
+        """
+        Clamp `delta` to the soft limits and count it straight away, before the ACK, so
+        moves pipelined behind it are clamped against where the gimbal will end up.
+        Returns (delta to send, delta counted); nothing is counted while stopped.
+        """
+        if axis not in AXES:
+            return delta, 0
+        lo, hi = self.limits[axis]
+        with self._lock:
+            delta = max(lo, min(hi, self.pos[axis] + delta)) - self.pos[axis]
+            counted = delta if self.enabled else 0
+            if counted:
+                self.pos[axis] += counted
+                self._dirty = True
+        self.save()
+        return delta, counted
+
+    def revert(self, axis: str, counted: int) -> None:
+        """Undo a reservation (the counted part) whose command the firmware rejected."""
+        if axis not in AXES or counted == 0:
+            return
+        with self._lock:
+            self.pos[axis] -= counted
+            self._dirty = True
+        self.save()
+
+    def mark_uncertain(self) -> None:
+        """A move went unanswered and may or may not have run: distrust the count until set_home()."""
+        with self._lock:
+            if self.uncertain:
+                return
+            self.uncertain = True
+            self._dirty = True
+        self.save(force=True)
+
+    def describe(self) -> str:
+        lims = ", ".join(f"{a} [{lo}, {hi}]" for a, (lo, hi) in self.limits.items())
+        state = "uncertain, re-home" if self.uncertain else "homed" if self.homed else "not homed"
+        return f"A={self.pos['A']} B={self.pos['B']} ({state}; limits {lims})"
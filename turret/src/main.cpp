@@ -34,6 +34,19 @@ Stepper stepperC(STEPS_PER_REV, C_IN1, C_IN3, C_IN2, C_IN4);
 static bool enabled = true;       // 'S' to stop, 'R' to resume
 static bool demo_mode = false;    // 'DEMO ON/OFF'
 
+// Binary command frames (sent by the host instead of an ASCII line):
+//   [0xA5, opcode, seq, a_lo, a_hi, b_lo, b_hi, c_lo, c_hi, crc8]
+// step counts are little-endian int16, crc8 (poly 0x07) covers opcode..c_hi.
+// Reply: [0xA6, seq, status, crc8(seq, status)]. 0xA5/0xA6 never appear in ASCII output.
+static const uint8_t BIN_SYNC = 0xA5;
+static const uint8_t BIN_REPLY = 0xA6;
+static const uint8_t BIN_FRAME_LEN = 9; // bytes after the sync byte
+enum BinOp : uint8_t {
+  OP_A = 0x01, OP_B = 0x02, OP_C = 0x03, OP_AB = 0x04, OP_ABC = 0x05,
+  OP_SPEED = 0x10, OP_STOP = 0x11, OP_RESUME = 0x12, OP_RELEASE = 0x13, OP_TARGET = 0x14, OP_PING = 0x15
+};
+enum BinStatus : uint8_t { ST_OK = 0, ST_ERR_CRC = 1, ST_ERR_OP = 2, ST_ERR_ARG = 3, ST_ERR_STOPPED = 4 };
+
 // De-energize the coils to stop holding torque and heat
 void releaseCoils() {
   digitalWrite(A_IN1, LOW);
@@ -93,6 +106,60 @@ static void printHelp() {
   Serial.println(F(" R | RESUME          - resume motion"));
   Serial.println(F(" RELEASE             - release coils (no hold)"));
   Serial.println(F(" DEMO ON|OFF         - toggle demo sweep mode"));
+  Serial.println(F(" 0xA5 frame          - binary command (see BIN_SYNC in main.cpp)"));
+}
+
+static uint8_t crc8(const uint8_t *data, uint8_t len) {
+  uint8_t crc = 0;
+  for (uint8_t i = 0; i < len; ++i) {
+    crc ^= data[i];
+    for (uint8_t b = 0; b < 8; ++b) crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+  }
+  return crc;
+}
+
+static void binReply(uint8_t seq, uint8_t status) {
+  uint8_t out[4] = { BIN_REPLY, seq, status, 0 };
+  out[3] = crc8(out + 1, 2);
+  Serial.write(out, sizeof(out));
+}
+
+static int16_t readI16(const uint8_t *p) {
+  return (int16_t)((uint16_t)p[0] | ((uint16_t)p[1] << 8));
+}
+
+// Called with the sync byte still in the buffer.
+static void handleBinaryFrame() {
+  Serial.read(); // sync
+  uint8_t buf[BIN_FRAME_LEN];
+  if (Serial.readBytes(buf, BIN_FRAME_LEN) != BIN_FRAME_LEN) return; // truncated frame, host will time out
+  uint8_t op = buf[0];
+  uint8_t seq = buf[1];
+  if (crc8(buf, BIN_FRAME_LEN - 1) != buf[BIN_FRAME_LEN - 1]) { binReply(seq, ST_ERR_CRC); return; }
+  long a = readI16(buf + 2), b = readI16(buf + 4), c = readI16(buf + 6);
+  switch (op) {
+    case OP_A: stepMotor(stepperA, a * A_DIR); break;
+    case OP_B: stepMotor(stepperB, b * B_DIR); break;
+    case OP_C: stepMotor(stepperC, c * C_DIR); break;
+    case OP_AB: stepAll(a, b, 0); break;
+    case OP_ABC: stepAll(a, b, c); break;
+    case OP_SPEED:
+      if (a <= 0) { binReply(seq, ST_ERR_ARG); return; }
+      stepperA.setSpeed(a); stepperB.setSpeed(a); stepperC.setSpeed(a);
+      break;
+    case OP_STOP: enabled = false; releaseCoils(); break;
+    case OP_RESUME: enabled = true; break;
+    case OP_RELEASE: releaseCoils(); break;
+    case OP_TARGET:
+      if (!enabled) { binReply(seq, ST_ERR_STOPPED); return; }
+      stepMotor(stepperC, -150);
+      delay(1000);
+      stepMotor(stepperC, 150);
+      break;
+    case OP_PING: break;
+    default: binReply(seq, ST_ERR_OP); return;
+  }
+  binReply(seq, ST_OK);
 }
 
 static bool parseLong(const String &tok, long &out) {
@@ -119,8 +186,10 @@ void setup() {
 }
 
 void loop() {
-  // Handle line-based serial commands
-  if (Serial.available()) {
+  // Binary frames start with a non-ASCII sync byte; everything else is a text line
+  if (Serial.available() && Serial.peek() == BIN_SYNC) {
+    handleBinaryFrame();
+  } else if (Serial.available()) {
     String line = Serial.readStringUntil('\n');
     line.trim();
     if (line.length()) {